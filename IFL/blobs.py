@@ -0,0 +1,56 @@
+"""
+Content-addressed store of large strings
+
+The same file text is easily held many times over: read again and again,
+preloaded, cached, kept in frames of the recursive chat loop. Interning
+hands out one string object per unique content, the message history, the
+file cache and the request encoder then all share it. The store is a dict
+keyed by the strings themselves, a lookup hashes and compares content, not
+identity. Strings can't be weakly referenced, so the owners (message history
+and file cache) are passed to prune() to drop everything else.
+"""
+
+def message_texts(messages):
+    """Contents and tool call arguments of messages, what intern_message interns"""
+    for message in messages:
+        yield message.get("content")
+        for call in message.get("tool_calls") or []:
+            yield (call.get("function") or {}).get("arguments")
+
+class BlobStore:
+    def __init__(self, min_chars=1024):
+        self.min_chars = min_chars
+        self._blobs = {}
+        self.hits = 0
+        self.saved_chars = 0
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def intern(self, text):
+        """The stored string equal to text, text itself when it is new or small"""
+        if not isinstance(text, str) or len(text) < self.min_chars:
+            return text
+        stored = self._blobs.setdefault(text, text)
+        if stored is not text:
+            self.hits += 1
+            self.saved_chars += len(text)
+        return stored
+
+    def intern_message(self, message):
+        """Intern the content and tool call arguments of a message in place"""
+        message["content"] = self.intern(message.get("content"))
+        for call in message.get("tool_calls") or []:
+            function = call.get("function") or {}
+            if "arguments" in function:
+                function["arguments"] = self.intern(function["arguments"])
+        return message
+
+    def prune(self, owned):
+        """Drop stored strings that are not among owned, returns how many were dropped"""
+        ## Owners hold the interned objects themselves, identity is enough
+        owned = {id(text) for text in owned if isinstance(text, str)}
+        unused = [text for text in self._blobs if id(text) not in owned]
+        for text in unused:
+            del self._blobs[text]
+        return len(unused)
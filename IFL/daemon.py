@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import queue
+import signal
+import socket
+import hashlib
+import shutil
+import threading
+
+from IFL.settings import cache_dir
+
+"""
+Daemon mode: one warm process serving many short ifl invocations
+
+`ifl --daemon` keeps the provider clients (and their open connections), the
+file cache and the module level matcher state alive, listening on a Unix
+socket. A plain `ifl` first tries to forward its command line to the daemon
+and only streams the output back, prompts are answered on the client side. A session gets the client's
+environment where it matters: the .env of the client's directory and its
+exported API keys; API key variables the config names and the client
+doesn't have are unset, never taken from the daemon's own environment.
+Ctrl-C on the client sends an interrupt, which stops the response being
+streamed as it would locally; a second one leaves the session.
+
+Protocol: newline delimited JSON frames in both directions.
+    client -> daemon: {"type": "run", "argv", "cwd", "columns", "lines", "env"}
+                      {"type": "answer", "value"} / {"type": "interrupt"}
+    daemon -> client: {"type": "out", "data"}
+                      {"type": "input", "info"} / {"type": "confirm", "info", "by_exit"}
+                      {"type": "busy"} / {"type": "exit", "code"}
+"""
+
+def socket_path():
+    return os.environ.get("IFL_SOCKET") or os.path.join(cache_dir(), "daemon.sock")
+
+def client_env():
+    """Variables a session takes from the client: .env of its cwd, exported *_API_KEY ones win"""
+    from dotenv import dotenv_values, find_dotenv
+    path = find_dotenv(usecwd=True)
+    env = {k: v for k, v in (dotenv_values(path) if path else {}).items() if v is not None}
+    env.update({k: v for k, v in os.environ.items() if k.endswith("_API_KEY")})
+    return env
+
+def api_key_names(config):
+    """Environment variables holding the API keys of the configured models"""
+    return sorted(set(section["api_key"] for section in config["Model"].values()
+                      if isinstance(section, dict) and section.get("api_key")))
+
+def _set_sigint(handler):
+    """Install a SIGINT handler, returns the previous one. Only the main thread may"""
+    if threading.current_thread() is not threading.main_thread():
+        return handler
+    return signal.signal(signal.SIGINT, handler)
+
+def send_frame(conn, frame):
+    conn.sendall((json.dumps(frame) + "\n").encode('utf-8'))
+
+def read_frame(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    return json.loads(line)
+
+class _SocketWriter:
+    """File-like stdout replacement sending everything to the client"""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, data):
+        if data:
+            send_frame(self.conn, {"type": "out", "data": data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+def forward(argv, path=None):
+    """
+    Run the command line on a listening daemon
+
+    Returns the exit code, or None when no daemon is available (or it is busy)
+    so the caller runs the task locally.
+    """
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+
+    out = sys.stdout
+    size = shutil.get_terminal_size()
+    ## Ctrl-C raises KeyboardInterrupt while frames are awaited, prompts keep the usual handling
+    handler = _set_sigint(signal.default_int_handler)
+    interrupted = False
+    try:
+        reader = conn.makefile('r', encoding='utf-8')
+        send_frame(conn, {"type": "run", "argv": argv, "cwd": os.getcwd(),
+                          "columns": size.columns, "lines": size.lines, "env": client_env()})
+        while True:
+            try:
+                frame = read_frame(reader)
+            except KeyboardInterrupt:
+                if interrupted:
+                    print("\nInterrupt signal received, program exiting...")
+                    return 0
+                interrupted = True
+                send_frame(conn, {"type": "interrupt"})
+                continue
+            kind = frame["type"]
+            if kind == "out":
+                out.write(frame["data"])
+                out.flush()
+            elif kind in ("input", "confirm"):
+                interrupted = False
+                _set_sigint(handler)
+                try:
+                    if kind == "input":
+                        from IFL.utils import content_from_input
+                        value = content_from_input(frame["info"])
+                    else:
+                        from IFL.utils import confirm_from_input
+                        try:
+                            value = confirm_from_input(frame["info"], frame["by_exit"])
+                        except SystemExit:
+                            value = "exit"
+                finally:
+                    _set_sigint(signal.default_int_handler)
+                send_frame(conn, {"type": "answer", "value": value})
+            elif kind == "exit":
+                return frame["code"]
+            elif kind == "busy":
+                return None
+    except ConnectionError:
+        print("Daemon connection lost")
+        return 1
+    finally:
+        _set_sigint(handler)
+        conn.close()
+
+class _Channel:
+    """
+    Frames from the client while its session runs
+
+    A thread reads them all: answers queue up for the prompts, an interrupt
+    sets the event the agent's stream guard checks. When the client goes
+    away the stream is stopped and a waiting prompt fails.
+    """
+    def __init__(self, reader):
+        self.reader = reader
+        self.answers = queue.Queue()
+        self.interrupt = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                frame = read_frame(self.reader)
+                if frame.get("type") == "interrupt":
+                    self.interrupt.set()
+                else:
+                    self.answers.put(frame)
+        except (ConnectionError, OSError, ValueError):
+            self.answers.put(None)
+            self.interrupt.set()
+
+    def answer(self):
+        frame = self.answers.get()
+        if frame is None:
+            raise ConnectionError("connection closed")
+        return frame["value"]
+
+class Daemon:
+    def __init__(self, path=None):
+        from IFL.filecache import FileCache
+        from IFL.blobs import BlobStore
+        self.path = path or socket_path()
+        self.blobs = BlobStore()
+        self.file_cache = FileCache(blobs=self.blobs)
+        self.providers = {}
+        ## chdir and stdout are process wide, so sessions run one at a time
+        self.lock = threading.Lock()
+
+    def provider(self, config):
+        from IFL.provider.modules_factory import create_provider
+        selected = config["Model"]["selected"]
+        ## Clients with other keys get providers of their own
+        keys = hashlib.sha1(json.dumps([os.environ.get(name) for name in api_key_names(config)])
+                            .encode('utf-8')).hexdigest()
+        key = json.dumps([selected, config["Model"][selected], keys], sort_keys=True)
+        if key not in self.providers:
+            self.providers[key] = create_provider(config)
+        return self.providers[key]
+
+    def handle(self, conn):
+        try:
+            reader = conn.makefile('r', encoding='utf-8')
+            request = read_frame(reader)
+            if not self.lock.acquire(blocking=False):
+                send_frame(conn, {"type": "busy"})
+                return
+            try:
+                code = self.run(conn, _Channel(reader), request)
+            finally:
+                self.lock.release()
+            send_frame(conn, {"type": "exit", "code": code})
+        except (ConnectionError, OSError, ValueError):
+            ## Client went away, the session is dropped
+            pass
+        finally:
+            conn.close()
+
+    def run(self, conn, channel, request):
+        from IFL.ifl import IFL, get_args_from_command, load_settings, run_agent
+
+        class RemoteIFL(IFL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                ## The client's Ctrl-C stops the stream like a local one
+                self.guard.cancel = channel.interrupt
+
+            def input_content(self, info):
+                send_frame(conn, {"type": "input", "info": info})
+                return channel.answer()
+
+            def input_confirm(self, info, byExit = True):
+                send_frame(conn, {"type": "confirm", "info": info, "by_exit": byExit})
+                value = channel.answer()
+                if value == "exit":
+                    sys.exit(0)
+                return value
+
+        saved_cwd = os.getcwd()
+        saved_stdout = sys.stdout
+        env = request.get("env") or {}
+        saved_env = {k: os.environ.get(k) for k in ("COLUMNS", "LINES", *env)}
+        try:
+            os.chdir(request["cwd"])
+            os.environ["COLUMNS"] = str(request["columns"])
+            os.environ["LINES"] = str(request["lines"])
+            os.environ.update(env)
+            sys.stdout = _SocketWriter(conn)
+
+            args = get_args_from_command(request["argv"])
+            config = load_settings(args)
+            for name in api_key_names(config):
+                if name not in env:
+                    saved_env.setdefault(name, os.environ.get(name))
+                    os.environ.pop(name, None)
+            agent = RemoteIFL(config, auto_yes=args.yes,
+                              llm=self.provider(config), file_cache=self.file_cache,
+                              blobs=self.blobs)
+            run_agent(agent, args)
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 0
+        except ConnectionError:
+            raise
+        except Exception as e:
+            print(f"Program execution error: {e}")
+            return 1
+        finally:
+            sys.stdout = saved_stdout
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+            os.chdir(saved_cwd)
+            ## Contents only the finished session held
+            self.blobs.prune(self.file_cache.texts())
+
+    def serve(self):
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        server.listen(8)
+        print(f"ifl daemon listening on {self.path}")
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+def serve(path=None):
+    Daemon(path).serve()
@@ -0,0 +1,110 @@
+from difflib import SequenceMatcher
+
+def line_opcodes(old_lines, new_lines):
+    """
+    Opcodes turning old_lines into new_lines, like SequenceMatcher.get_opcodes()
+
+    The common head and tail are cut off first, only the changed middle is
+    diffed and lines are compared as small integer ids instead of strings.
+    """
+    n_old, n_new = len(old_lines), len(new_lines)
+    prefix = 0
+    limit = min(n_old, n_new)
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix and
+           old_lines[n_old - 1 - suffix] == new_lines[n_new - 1 - suffix]):
+        suffix += 1
+
+    codes = []
+    if prefix:
+        codes.append(('equal', 0, prefix, 0, prefix))
+
+    old_mid = old_lines[prefix:n_old - suffix]
+    new_mid = new_lines[prefix:n_new - suffix]
+    if old_mid or new_mid:
+        ids = {}
+        old_ids = [ids.setdefault(line, len(ids)) for line in old_mid]
+        new_ids = [ids.setdefault(line, len(ids)) for line in new_mid]
+        matcher = SequenceMatcher(None, old_ids, new_ids, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            codes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+
+    if suffix:
+        codes.append(('equal', n_old - suffix, n_old, n_new - suffix, n_new))
+    return codes
+
+def group_opcodes(codes, n=3):
+    """Hunks of opcodes with n lines of context, as SequenceMatcher.get_grouped_opcodes()"""
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    codes = list(codes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+def diff_stats(codes):
+    added = sum(j2 - j1 for tag, _, _, j1, j2 in codes if tag in ('replace', 'insert'))
+    removed = sum(i2 - i1 for tag, i1, i2, _, _ in codes if tag in ('replace', 'delete'))
+    return added, removed
+
+def _hunk_range(start, end):
+    ## An empty side names the line before it, 0 at the top of the file, as diff -u does
+    return f"{start + 1 if end > start else start},{end - start}"
+
+def diff_lines(old_lines, new_lines, codes, context=3):
+    """Yield unified diff lines hunk by hunk, so long diffs are only built as they are shown"""
+    for group in group_opcodes(codes, context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        yield f"@@ -{_hunk_range(i1, i2)} +{_hunk_range(j1, j2)} @@"
+        for tag, a1, a2, b1, b2 in group:
+            if tag == 'equal':
+                for line in old_lines[a1:a2]:
+                    yield " " + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in old_lines[a1:a2]:
+                    yield "-" + line
+            if tag in ('replace', 'insert'):
+                for line in new_lines[b1:b2]:
+                    yield "+" + line
+
+class TextDiff:
+    """Line diff of two texts, with lazily generated unified diff pages"""
+    def __init__(self, old_text, new_text, context=3):
+        self.old_lines = old_text.splitlines()
+        self.new_lines = new_text.splitlines()
+        self.codes = line_opcodes(self.old_lines, self.new_lines)
+        self.added, self.removed = diff_stats(self.codes)
+        self.context = context
+
+    def unchanged(self):
+        return self.added == 0 and self.removed == 0
+
+    def pages(self, page_lines):
+        """Yield lists of at most page_lines diff lines"""
+        page = []
+        for line in diff_lines(self.old_lines, self.new_lines, self.codes, self.context):
+            page.append(line)
+            if len(page) >= page_lines:
+                yield page
+                page = []
+        if page:
+            yield page
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+
+class FileCache:
+    """
+    Cache of text file contents, validated against file mtime and size
+
+    Entries are keyed by absolute path and silently re-read when the file on
+    disk changes, so callers can always treat read() as the source of truth.
+    The cache is bounded by total characters, least recently used first out.
+    It may be shared by threads, file contents are read outside the lock.
+    """
+    def __init__(self, max_chars=64 * 1024 * 1024, blobs=None):
+        self.max_chars = max_chars
+        ## Optional BlobStore, cached texts then share memory with equal message contents
+        self.blobs = blobs
+        self.total_chars = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def _fresh(self, key, stat):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        mtime_ns, size, text = entry
+        if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_chars -= len(entry[2])
+
+    def peek(self, path, count=False):
+        """Return cached text if it is still fresh, never touching file content, count: a found text is a hit"""
+        key = self._key(path)
+        if key not in self._entries:
+            return None
+        try:
+            stat = os.stat(key)
+        except OSError:
+            with self._lock:
+                self._drop(key)
+            return None
+        with self._lock:
+            text = self._fresh(key, stat)
+            if count and text is not None:
+                self.hits += 1
+            return text
+
+    def read(self, path):
+        """Return file text, from cache when fresh, otherwise from disk"""
+        key = self._key(path)
+        stat = os.stat(key)
+        with self._lock:
+            text = self._fresh(key, stat)
+            if text is not None:
+                self.hits += 1
+                return text
+            self.misses += 1
+
+        with open(key, 'r', encoding='utf-8') as file:
+            text = file.read()
+        return self.put(path, text, stat)
+
+    def put(self, path, text, stat=None):
+        """Cache text of path, returns the text as stored"""
+        key = self._key(path)
+        if stat is None:
+            stat = os.stat(key)
+        with self._lock:
+            self._drop(key)
+            if len(text) > self.max_chars:
+                return text
+            if self.blobs is not None:
+                text = self.blobs.intern(text)
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, text)
+            self.total_chars += len(text)
+            while self.total_chars > self.max_chars:
+                _, (_, _, old) = self._entries.popitem(last=False)
+                self.total_chars -= len(old)
+            return text
+
+    def invalidate(self, path):
+        with self._lock:
+            self._drop(self._key(path))
+
+    def texts(self):
+        """Cached contents, fresh or not"""
+        with self._lock:
+            return [text for _, _, text in self._entries.values()]
+
+    def snapshot(self):
+        """Fresh cached contents as {absolute path: text}"""
+        result = {}
+        with self._lock:
+            for key in list(self._entries.keys()):
+                try:
+                    stat = os.stat(key)
+                except OSError:
+                    self._drop(key)
+                    continue
+                text = self._fresh(key, stat)
+                if text is not None:
+                    result[key] = text
+        return result
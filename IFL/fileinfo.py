@@ -0,0 +1,155 @@
+import os
+import codecs
+
+from IFL.utils import file_view
+
+"""
+Inspection of files before their content goes to the model
+
+The first block of a file is sniffed for binary content, a NUL byte or
+bytes that aren't UTF-8. A file over the byte limit is never read whole:
+blocks from its start and its end are read and shown as head and tail
+lines with the file size. A text within the byte limit but with too many
+lines or a too long line (a minified bundle) is sampled the same way.
+"""
+
+class FileInfo:
+    def __init__(self, path, size, binary=False, reason=None):
+        self.path = path
+        self.size = size
+        self.binary = binary
+        ## Why the file can't be shown whole, None when it can
+        self.reason = reason
+
+def is_binary(block, final=False):
+    """True when block has a NUL byte or isn't UTF-8, a character cut at the end is fine"""
+    if b'\0' in block:
+        return True
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(block, final=final)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+class FileInspector:
+    def __init__(self, settings):
+        self.max_bytes = settings.get("max_bytes", 1024 * 1024)
+        self.max_lines = settings.get("max_lines", 5000)
+        self.max_line_chars = settings.get("max_line_chars", 2000)
+        self.head_lines = settings.get("head_lines", 200)
+        self.tail_lines = settings.get("tail_lines", 50)
+        self.sniff_bytes = settings.get("sniff_bytes", 8192)
+        self.sample_bytes = settings.get("sample_bytes", 64 * 1024)
+        self.line_numbers = settings.get("line_numbers", True)
+
+    def inspect(self, path):
+        """FileInfo of path, reading its first block only"""
+        size = os.stat(path).st_size
+        with open(path, 'rb') as file:
+            block = file.read(self.sniff_bytes)
+        if is_binary(block, final=len(block) >= size):
+            return FileInfo(path, size, binary=True, reason="binary or not UTF-8")
+        if size > self.max_bytes:
+            return FileInfo(path, size, reason=f"{size} bytes, over the limit of {self.max_bytes}")
+        return FileInfo(path, size)
+
+    def check_text(self, text):
+        """Reason a read text can't be shown whole, None when it can"""
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return f"{size} bytes, over the limit of {self.max_bytes}"
+        lines = text.splitlines()
+        if len(lines) > self.max_lines:
+            return f"{len(lines)} lines, over the limit of {self.max_lines}"
+        longest = max(map(len, lines), default=0)
+        if longest > self.max_line_chars:
+            return f"a line of {longest} chars, over the limit of {self.max_line_chars}"
+        return None
+
+    def _clip(self, line):
+        if len(line) <= self.max_line_chars:
+            return line
+        return line[:self.max_line_chars] + f" ... [{len(line) - self.max_line_chars} more chars]"
+
+    def _read_samples(self, path, size):
+        """
+        Head and tail lines from blocks at both ends of the file
+
+        Returns:
+            tuple: (head, tail, total, exact), total is the line count, only
+            estimated from the sampled blocks when exact is False
+        """
+        with open(path, 'rb') as file:
+            if size <= 2 * self.sample_bytes:
+                lines = file.read().decode('utf-8', errors='replace').splitlines()
+                return (lines[:self.head_lines], lines[max(self.head_lines, len(lines) - self.tail_lines):],
+                        len(lines), True)
+            head = file.read(self.sample_bytes)
+            file.seek(size - self.sample_bytes)
+            tail = file.read(self.sample_bytes)
+        head_lines = head.decode('utf-8', errors='replace').splitlines()
+        tail_lines = tail.decode('utf-8', errors='replace').splitlines()
+        ## Average line length of the samples, the middle is never read
+        total = round(size * (len(head_lines) + len(tail_lines)) / (len(head) + len(tail)))
+        ## Lines cut by a block edge are dropped, unless nothing else is left
+        if len(head_lines) > 1:
+            head_lines.pop()
+        if len(tail_lines) > 1:
+            tail_lines.pop(0)
+        return head_lines[:self.head_lines], tail_lines[-self.tail_lines:], total, False
+
+    def sample_view(self, file_name, info, text=None):
+        """
+        ReadFile result of a file that can't be shown whole
+
+        Args:
+            info: FileInfo of the file
+            text: full content when it was read, otherwise samples are read from the file
+        """
+        if info.binary:
+            return (f"[file: {file_name} | bytes: {info.size} | {info.reason}]\n"
+                    "The content is not shown, this is not a UTF-8 text file.")
+        if text is not None:
+            lines = text.splitlines()
+            total, exact = len(lines), True
+            head = lines[:self.head_lines]
+            tail = lines[max(len(head), total - self.tail_lines):]
+        else:
+            head, tail, total, exact = self._read_samples(info.path, info.size)
+
+        shown_total = total if exact else f"~{total}"
+        parts = [f"[file: {file_name} | bytes: {info.size} | lines: {shown_total} | sampled: {info.reason}]"]
+        for i, line in enumerate(head, 1):
+            line = self._clip(line)
+            parts.append(f"{i}\t{line}" if self.line_numbers else line)
+        if exact:
+            ## Real line numbers are known
+            tail_start = total - len(tail) + 1
+            if tail_start > len(head) + 1:
+                parts.append("... lines omitted ...")
+        else:
+            tail_start = -len(tail)
+            parts.append(f"... lines omitted, the last {len(tail)} lines follow, numbered from the end ...")
+        for i, line in enumerate(tail, tail_start):
+            line = self._clip(line)
+            parts.append(f"{i}\t{line}" if self.line_numbers else line)
+        parts.append("Only the head and tail of the file are shown, use SearchCode to find other parts.")
+        return "\n".join(parts)
+
+    def view(self, file_name, file_cache):
+        """ReadFile result of file_name, the full text is read only when it is within the limits"""
+        text = file_cache.peek(file_name, count=True)
+        if text is None:
+            info = self.inspect(file_name)
+            if info.reason is not None:
+                return self.sample_view(file_name, info)
+            try:
+                text = file_cache.read(file_name)
+            except UnicodeDecodeError:
+                info.binary, info.reason = True, "not UTF-8"
+                return self.sample_view(file_name, info)
+        reason = self.check_text(text)
+        if reason is None:
+            return file_view(file_name, text, self.line_numbers)
+        size = len(text.encode('utf-8'))
+        return self.sample_view(file_name, FileInfo(file_name, size, reason=reason), text)
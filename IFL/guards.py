@@ -0,0 +1,136 @@
+import queue
+import threading
+
+"""
+Guards stopping a runaway streamed response
+
+A response is stopped when its output grows past a length limit, or when
+its thinking or answer ends in the same text repeated over and over, a
+model caught in a loop. Checks run on the text as it streams, so the
+request is closed as soon as a guard trips instead of running to its
+timeout. Tool call arguments have a limit of their own, a written file
+may be long.
+"""
+
+class Aborted(BaseException):
+    """
+    Stops a stream from inside it, e.g. from the on_arguments callback
+
+    A BaseException like KeyboardInterrupt, so the providers' error handling
+    (which turns every Exception into an LLM error) lets it through.
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+class StreamGuard:
+    def __init__(self, settings):
+        self.enabled = settings.get("enabled", True)
+        self.max_chars = settings.get("max_chars", 200000)
+        self.max_thinking_chars = settings.get("max_thinking_chars", 60000)
+        self.max_arguments_chars = settings.get("max_arguments_chars", 2000000)
+        self.repeats = settings.get("repeats", 10)
+        self.min_period = settings.get("min_period", 4)
+        self.max_period = settings.get("max_period", 400)
+        self.min_span = settings.get("min_span", 400)
+        self.check_every = settings.get("check_every", 256)
+        ## Set from another thread to stop the stream as Ctrl-C does, e.g. by a daemon
+        ## whose client was interrupted. Cleared when the next stream starts
+        self.cancel = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.cancel.clear()
+        self.chars = 0
+        self.tails = {}
+        self.unchecked = {}
+        self.kind_chars = {}
+
+    def feed(self, kind, text):
+        """
+        Count streamed text of kind (Thinking, Answer, Arguments), raise Aborted
+        when a guard trips, KeyboardInterrupt when the stream was cancelled
+        """
+        if self.cancel.is_set():
+            self.cancel.clear()
+            raise KeyboardInterrupt
+        if not self.enabled or not text:
+            return
+        self.kind_chars[kind] = self.kind_chars.get(kind, 0) + len(text)
+        if kind == "Arguments":
+            ## Written file contents may be long and repeat themselves legitimately
+            if self.max_arguments_chars and self.kind_chars[kind] > self.max_arguments_chars:
+                raise Aborted(f"tool arguments longer than {self.max_arguments_chars} chars")
+            return
+        self.chars += len(text)
+        if self.max_chars and self.chars > self.max_chars:
+            raise Aborted(f"output longer than {self.max_chars} chars")
+        if kind == "Thinking" and self.max_thinking_chars and self.kind_chars[kind] > self.max_thinking_chars:
+            raise Aborted(f"thinking longer than {self.max_thinking_chars} chars")
+
+        keep = self.max_period * self.repeats
+        tail = (self.tails.get(kind, "") + text)[-keep:]
+        self.tails[kind] = tail
+        self.unchecked[kind] = self.unchecked.get(kind, 0) + len(text)
+        if self.unchecked[kind] >= self.check_every:
+            self.unchecked[kind] = 0
+            period = repeated_period(tail, self.repeats, self.min_period, self.max_period, self.min_span)
+            if period:
+                raise Aborted(f"the same {period} chars repeated {self.repeats} times")
+
+def watch(stream, cancel, poll=0.1):
+    """
+    Iterate stream in a thread of its own, raising KeyboardInterrupt once cancel is set
+
+    For streams consumed off the main thread, where no Ctrl-C breaks a blocking
+    read: the event is polled while the provider waits for its first token or
+    stalls. A stream left behind is closed with its next item.
+    """
+    items = queue.Queue()
+    gone = threading.Event()
+
+    def pump():
+        try:
+            for item in stream:
+                if gone.is_set():
+                    break
+                items.put((True, item))
+            items.put((False, None))
+        except BaseException as e:
+            items.put((False, e))
+        finally:
+            stream.close()
+
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            try:
+                more, value = items.get(timeout=poll)
+            except queue.Empty:
+                if cancel.is_set():
+                    cancel.clear()
+                    raise KeyboardInterrupt
+                continue
+            if more:
+                yield value
+            elif value is None:
+                return
+            else:
+                raise value
+    finally:
+        gone.set()
+
+def repeated_period(text, repeats, min_period, max_period, min_span):
+    """Length of a unit text ends with `repeats` times in a row, 0 when there is none"""
+    for period in range(min_period, max_period + 1):
+        if period * repeats > len(text):
+            break
+        if period * repeats < min_span:
+            continue
+        unit = text[-period:]
+        if not unit.strip():
+            ## Runs of blanks are indentation, not a loop
+            continue
+        if text.endswith(unit * repeats):
+            return period
+    return 0
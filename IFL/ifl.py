@@ -3,28 +3,98 @@ import sys
 import json
 import uuid
 import signal
-import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from abc import ABC
-import yaml
 import argparse
-from dotenv import load_dotenv
 
 from IFL.provider.modules_factory import create_provider
-from IFL.utils import ( apply_patch, readfile_with_linenumber, content_from_input,
+from IFL.settings import load_config
+from IFL.filecache import FileCache
+from IFL.blobs import BlobStore, message_texts
+from IFL.fileinfo import FileInspector
+from IFL.prefetch import Prefetcher
+from IFL.policy import RoundPolicy
+from IFL.guards import StreamGuard, Aborted, watch
+from IFL.search import search_code
+from IFL.workspace import resolve_inputs, list_files, git_changes, git_diff
+from IFL.session import Session
+from IFL.diffview import TextDiff
+from IFL.patch import apply_unified_diff, replace_lines, content_hash
+from IFL.multiedit import plan_edits, commit_edits
+from IFL.verify import Verifier
+from IFL.runner import CommandRunner
+from IFL.render import Frame, truncate_lines
+from IFL.staging import StagedFile
+from IFL.utils import ( do_search_replace, content_from_input,
                         lined_print, framed_print, confirm_from_input )
 
 class IFL(ABC):
-    def __init__(self, config, auto_yes=False):
+    def __init__(self, config, auto_yes=False, llm=None, file_cache=None, blobs=None):
         self.config = config
         self.current_round = 0
         self.max_rounds = config.get("MaxRounds", 10)
         self.tools = config["AllTools"]
-        self.llm = create_provider(config)
+        ## A daemon hands over its warm provider and file cache
+        self.llm = llm if llm is not None else create_provider(config)
         self.auto_yes = auto_yes
+        ## One copy of every large content, shared by messages and file cache
+        self.blobs = blobs if blobs is not None else BlobStore()
+        self.file_cache = file_cache if file_cache is not None else FileCache(blobs=self.blobs)
+        self.interned_messages = 0
+        self.inspector = FileInspector(config.get("ReadFile", {}))
+        self.prefetcher = Prefetcher(config.get("Prefetch", {}), self.file_cache)
+        self.policy = RoundPolicy(config.get("Reasoning", {}), config)
+        self.guard = StreamGuard(config.get("Guards", {}))
+        self.verifier = Verifier(config.get("Verify", {}))
+        self.runner = CommandRunner(config.get("RunCommand", {}))
+        ## WriteFile content streamed to disk during the last response
+        self.staged = None
+        ## (reason, by_user) when the last response was stopped before its end
+        self.stopped = None
+        self.session = None
+
+    ## User interaction, overridden when the terminal is on the other side of a socket
+    def input_content(self, info):
+        return content_from_input(info)
+
+    def input_confirm(self, info, byExit = True):
+        return confirm_from_input(info, byExit)
+
+    def start_session(self, task):
+        settings = self.config.get("Session", {})
+        if not settings.get("enabled", True):
+            return
+        meta = {
+            "task": task,
+            "model": self.config["Model"]["selected"],
+            "cwd": os.getcwd()
+        }
+        self.session = Session.create(settings.get("dir", ".ifl/sessions"), meta,
+                                      settings.get("blob_min_chars", 1024))
+        print(f"Session id: {self.session.session_id}")
+
+    ## Continue a saved session, with a fresh budget of MaxRounds
+    def resume(self, session_id, task=None):
+        settings = self.config.get("Session", {})
+        self.session, allMessages, last_round = Session.load(
+            settings.get("dir", ".ifl/sessions"), session_id, settings.get("blob_min_chars", 1024))
+        self.current_round = last_round
+        self.max_rounds += last_round
+        print(f"Resuming session {session_id} after round {last_round}")
+
+        if task is not None and task.strip() != "":
+            allMessages.append({
+                'role': "user",
+                'content': task
+            })
+        self.chat_loop(allMessages)
 
     ## Fitter operation, meaning precise, semi-automatic operation
-    def fitter(self, task, preload_files, preload_dir = False):
+    def fitter(self, task, preload_files, preload_dir = False, preload_changed = False):
+        self.start_session(task)
+
         ## Initial message queue
         allMessages = [
             {
@@ -53,8 +123,7 @@ class IFL(ABC):
                 'content': self.config["PreloadTemplate"],
                 'tool_calls': [fcall]
             })
-            result = subprocess.run(['tree', '--gitignore'], capture_output=True, text=True)
-            file_list = result.stdout if result.returncode == 0 else result.stderr
+            file_list = list_files()
             call_result = {
                 'role' : 'tool',
                 'tool_call_id': callid,
@@ -62,58 +131,130 @@ class IFL(ABC):
             }
             allMessages.append(call_result)
 
-            ## Preload input file content
-        for infile in preload_files:
-            if not os.path.exists(infile):
-                raise Exception(f"Cannot open file: {infile}")
+        ## Preload what is in flight: git status, diff and the changed files
+        if preload_changed:
+            allMessages.extend(self.changed_messages())
 
-            # Check if file is within current directory or its subdirectories
-            abs_infile = os.path.abspath(infile)
-            abs_cwd = os.path.abspath(os.getcwd())
-            if not abs_infile.startswith(abs_cwd):
-                raise Exception(f"File must be within current directory: {infile}")
+        ## Preload input files, packed into one tool result
+        if preload_files:
+            allMessages.extend(self.preload_messages(preload_files))
 
-            argument = {
-                "file_name" : infile
-            }
-            callid = str(uuid.uuid4())[:6]
-            fcall = {
-                "type": "function",
-                "id":  callid,
-                "function": {
-                    "name": "ReadFile",
-                    "arguments": json.dumps(argument)
-                }
+        ## Messages are ready
+        self.chat_loop(allMessages)
+
+
+    def preload_messages(self, patterns):
+        """A simulated ReadFile call with the views of all files named by patterns"""
+        settings = self.config.get("Preload", {})
+        files = resolve_inputs(patterns)
+        max_files = settings.get("max_files", 500)
+        if len(files) > max_files:
+            raise Exception(f"Too many input files: {len(files)}, over the limit of {max_files}")
+        return self.read_messages(files, " ".join(patterns))
+
+    def read_messages(self, files, label):
+        """A simulated ReadFile call, labelled label, with the views of files"""
+        settings = self.config.get("Preload", {})
+        ## Reading is mostly waiting on the disk, threads overlap it
+        workers = max(1, min(settings.get("workers", 8), len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            views = list(pool.map(self.read_file_view, files))
+
+        callid = str(uuid.uuid4())[:6]
+        fcall = {
+            "type": "function",
+            "id":  callid,
+            "function": {
+                "name": "ReadFile",
+                "arguments": json.dumps({"file_name": label})
             }
-            ## Simulate an assistant message for a function call
-            allMessages.append({
+        }
+        ## Every view starts with its own [file: ...] header
+        content = "\n".join(view if view.endswith("\n") else view + "\n" for view in views)
+        return [
+            {
                 'role': "assistant",
                 'content': self.config["PreloadTemplate"],
                 'tool_calls': [fcall]
-            })
-
-            ## Simulate the result of a function call
-            file_content = readfile_with_linenumber(infile, False)
-            call_result = {
+            },
+            {
                 'role' : 'tool',
                 'tool_call_id': callid,
-                'content': file_content
+                'content': content
             }
-            allMessages.append(call_result)
+        ]
 
-        ## Messages are ready
-        self.chat_loop(allMessages)
+    def changed_messages(self):
+        """A simulated RunCommand call with git status and diff, then the changed files"""
+        changes = git_changes()
+        if changes is None:
+            raise Exception("--changed needs a git checkout")
+        if not changes:
+            return []
 
+        callid = str(uuid.uuid4())[:6]
+        command = "git status --short -- . && git diff HEAD -- ."
+        fcall = {
+            "type": "function",
+            "id":  callid,
+            "function": {
+                "name": "RunCommand",
+                "arguments": json.dumps({"command": command})
+            }
+        }
+        settings = self.config.get("Preload", {})
+        status = [f"{status} {path}" for status, path in changes]
+        diff = git_diff().splitlines()
+        diff = truncate_lines(diff, settings.get("diff_max_lines", 2000))
+        ## Deleted files are only in the status and the diff
+        files = [path for status, path in changes if 'D' not in status and os.path.isfile(path)]
+        max_files = settings.get("max_files", 500)
+        if len(files) > max_files:
+            note = f"{len(files) - max_files} more changed files not preloaded, over the limit of {max_files}"
+            framed_print("Preload", note, "warning")
+            diff.append(f"[{note}]")
+            files = files[:max_files]
+        messages = [
+            {
+                'role': "assistant",
+                'content': self.config["PreloadTemplate"],
+                'tool_calls': [fcall]
+            },
+            {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': f"$ {command}\n" + "\n".join(status + diff) + "\n"
+            }
+        ]
+        ## Known paths, not patterns: a name like pages/[id].tsx is no glob here
+        if files:
+            messages.extend(self.read_messages(files, " ".join(files)))
+        return messages
 
     def chat_loop(self, allMessages):
+        ## Messages added since the last round share storage with equal contents
+        if self.interned_messages > len(allMessages):
+            self.interned_messages = 0
+        for message in allMessages[self.interned_messages:]:
+            self.blobs.intern_message(message)
+        self.interned_messages = len(allMessages)
+        ## Contents neither the messages nor the file cache hold anymore are released
+        self.blobs.prune(list(message_texts(allMessages)) + self.file_cache.texts())
+
+        ## Persist what the previous rounds added, so an exit at any point can be resumed
+        if self.session is not None:
+            self.session.sync(allMessages, self.current_round)
+
         self.current_round += 1
         lined_print(f"Calling LLM (round {self.current_round})")
 
         if self.current_round > self.max_rounds:
             print(f"Maximum rounds {self.max_rounds} reached, exiting")
+            if self.session is not None:
+                print(f"Continue with: ifl --resume {self.session.session_id}")
             sys.exit(0)
 
-        thinking, talking, fcall = self.llm.response(allMessages, self.tools)
+        thinking, talking, fcall = self.call_llm(allMessages)
 
         new_message = {
             'role': "assistant",
@@ -122,24 +263,21 @@ class IFL(ABC):
             'tool_calls': [fcall] if fcall is not None else None
         }
 
-        ## Display LLM response messages
-        if thinking is not None and thinking.strip() != "":
-            framed_print("Thinking", thinking, "info")
-
-        if talking is not None and talking.strip() != "":
-            framed_print("Answer", talking, "info")
+        ## Response stopped by Ctrl-C or a guard, its partial output is kept
+        if self.stopped is not None:
+            return self.handle_stopped(new_message, allMessages)
 
         ## If no tool call
         if fcall is None:
             if not self.auto_yes:
-                confirm = confirm_from_input(f"Model did not invoke tool call, exit? (y/n)", False)
+                confirm = self.input_confirm(f"Model did not invoke tool call, exit? (y/n)", False)
             else:
                 confirm = True
             if confirm:
                 sys.exit(0)
                 return
             else:
-                response = content_from_input("Continue input: ")
+                response = self.input_content("Continue input: ")
                 if response.strip() == "":
                     print("Input cannot be empty, exiting")
                     sys.exit(0)
@@ -160,6 +298,18 @@ class IFL(ABC):
         if fcall["function"]["name"] == "ModifyFile":
             return self.handle_modify_file(fcall, new_message, allMessages)
 
+        ## Modify several files at once
+        if fcall["function"]["name"] == "ModifyFiles":
+            return self.handle_modify_files(fcall, new_message, allMessages)
+
+        ## Patch file with unified diff hunks
+        if fcall["function"]["name"] == "PatchFile":
+            return self.handle_patch_file(fcall, new_message, allMessages)
+
+        ## Replace a line range
+        if fcall["function"]["name"] == "ReplaceLines":
+            return self.handle_replace_lines(fcall, new_message, allMessages)
+
         ## Write file
         if fcall["function"]["name"] == "WriteFile":
             return self.handle_write_file(fcall, new_message, allMessages)
@@ -168,6 +318,18 @@ class IFL(ABC):
         if fcall["function"]["name"] == "ReadFile":
             return self.handle_read_file(fcall, new_message, allMessages)
 
+        ## Search code
+        if fcall["function"]["name"] == "SearchCode":
+            return self.handle_search_code(fcall, new_message, allMessages)
+
+        ## Run shell command
+        if fcall["function"]["name"] == "RunCommand":
+            return self.handle_run_command(fcall, new_message, allMessages)
+
+        ## Output of a command job
+        if fcall["function"]["name"] == "CommandOutput":
+            return self.handle_command_output(fcall, new_message, allMessages)
+
         ## Unsupported tool, make another call
         framed_print("Unsupported tool", f'{fcall}\nRetrying...', "warning")
         response = f"Error: unsupported tool: {fcall["function"]["name"]}"
@@ -180,16 +342,186 @@ class IFL(ABC):
         allMessages.append(call_result)
         return self.chat_loop(allMessages)
 
+    def call_llm(self, allMessages):
+        """Stream one model response, thinking and answer are shown while they arrive"""
+        if self.staged is not None:
+            self.staged.discard()
+            self.staged = None
+        self.prefetcher.end_round()
+
+        ## A watched stream calls on_arguments from its own thread, which may outlive the round
+        lock = threading.Lock()
+        finished = False
+
+        def on_arguments(name, delta):
+            with lock:
+                if finished:
+                    raise Aborted("the response was closed")
+                self.guard.feed("Arguments", delta)
+                if name != "WriteFile":
+                    return
+                if self.staged is None:
+                    directory = self.config.get("WriteFile", {}).get("staging_dir", ".ifl/staging")
+                    self.staged = StagedFile(directory)
+                self.staged.feed(delta)
+
+        parts = {"Thinking": [], "Answer": []}
+        frame = None
+        fcall = None
+        self.guard.reset()
+        ## Thinking and token budgets follow the type of the round
+        options = self.policy.options(allMessages)
+        stream = self.llm.response_stream(allMessages, self.tools, on_arguments=on_arguments, options=options)
+        ## Ctrl-C while streaming stops only this response, signal handlers belong to the main thread
+        handler = None
+        if threading.current_thread() is threading.main_thread():
+            handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+        else:
+            ## e.g. a daemon session: no Ctrl-C breaks a blocked read here, the cancel event is polled
+            stream = watch(stream, self.guard.cancel)
+        try:
+            for thinking, talking, call in stream:
+                for title, text in (("Thinking", thinking), ("Answer", talking)):
+                    if text is None:
+                        continue
+                    parts[title].append(text)
+                    ## Files named while streaming are read into the cache in the background
+                    self.prefetcher.feed(text)
+                    if frame is not None and frame.title == title:
+                        frame.append(text)
+                    elif "".join(parts[title]).strip() != "":
+                        ## Blank leading output doesn't open a frame
+                        if frame is not None:
+                            frame.close()
+                        frame = Frame(title, "info")
+                        frame.append("".join(parts[title]).lstrip("\n"))
+                    self.guard.feed(title, text)
+                if call is not None:
+                    fcall = call
+        except KeyboardInterrupt:
+            self.stopped = ("interrupted by the user", True)
+        except Aborted as e:
+            self.stopped = (e.reason, False)
+        except Exception:
+            ## The provider failed mid-stream, a file it was writing is incomplete
+            if self.staged is not None:
+                self.staged.discard()
+                self.staged = None
+            raise
+        finally:
+            ## Closing the generator closes the HTTP stream
+            stream.close()
+            if handler is not None:
+                signal.signal(signal.SIGINT, handler)
+            with lock:
+                finished = True
+        if frame is not None:
+            frame.close()
+        self.prefetcher.flush()
+        if self.staged is not None:
+            self.staged.close()
+        if self.stopped is not None:
+            ## A tool call cut short is dropped, with the file it was writing
+            fcall = None
+            if self.staged is not None:
+                self.staged.discard()
+                self.staged = None
+
+        thinking = "".join(parts["Thinking"]) if parts["Thinking"] else None
+        talking = "".join(parts["Answer"]) if parts["Answer"] else None
+        return thinking, talking, fcall
+
+    def handle_stopped(self, new_message, allMessages):
+        """Go on after a stopped response: user feedback after Ctrl-C, a note to the model after a guard"""
+        reason, by_user = self.stopped
+        self.stopped = None
+        framed_print("Response stopped", reason, "warning")
+        if by_user:
+            response = self.input_content("Enter feedback: ")
+            if response.strip() == "":
+                print("Input cannot be empty, exiting")
+                sys.exit(0)
+                return
+            content = self.config["InterruptTemplate"].replace("{__USER_RESPOSNE__}", response)
+        else:
+            content = self.config["GuardTemplate"].replace("{__REASON__}", reason)
+
+        new_message['content'] = new_message['content'] or ""
+        allMessages.append(new_message)
+        allMessages.append({
+            'role': 'user',
+            'content': content
+        })
+        return self.chat_loop(allMessages)
+
+    def metrics(self):
+        """Counters of this session"""
+        return {
+            "rounds": self.current_round,
+            "file_cache": {"hits": self.file_cache.hits, "misses": self.file_cache.misses},
+            "prefetch": self.prefetcher.metrics(),
+            "round_types": dict(self.policy.counts),
+        }
+
+    def report_metrics(self):
+        """Print the session counters and keep them in the transcript"""
+        metrics = self.metrics()
+        if self.session is not None:
+            self.session.record("metrics", metrics)
+        prefetch = metrics["prefetch"]
+        cache = metrics["file_cache"]
+        lined_print(f"{metrics['rounds']} rounds | file cache {cache['hits']}/{cache['hits'] + cache['misses']} hits"
+                    f" | prefetch {prefetch['hit_rate']} of ReadFile ({prefetch['hits']}/{prefetch['reads']})")
+
+    ## File content as the model sees it, with line numbers and content hash
+    def read_file_view(self, file_name):
+        ## Binary and oversized files are sampled, never read whole
+        return self.blobs.intern(self.inspector.view(file_name, self.file_cache))
+
+    def verify_changes(self, contents):
+        """Run the configured checks on written files, returns text for the tool result"""
+        passed, report = self.verifier.verify(contents)
+        if not report:
+            return ""
+        if passed:
+            return "\n" + report
+        framed_print("Verify", report, "warning", max_lines=self.review_page_lines())
+        return "\nThe change was written, but checks failed, fix the problems below:\n" + report
+
+    def review_page_lines(self):
+        return self.config.get("Review", {}).get("page_lines", 120)
+
+    ## Show only the changed hunks of a change, page by page on request
+    def review_diff(self, title, old_text, new_text):
+        settings = self.config.get("Review", {})
+        diff = TextDiff(old_text, new_text, settings.get("context_lines", 3))
+        title = f"{title} (+{diff.added} -{diff.removed})"
+        if diff.unchanged():
+            note = "No line changes" if old_text == new_text else "Only line endings or the final newline change"
+            framed_print(title, note, "success")
+            return diff
+
+        pages = diff.pages(self.review_page_lines())
+        page = next(pages)
+        while True:
+            framed_print(title, "\n".join(page), "success")
+            page = next(pages, None)
+            if page is None:
+                break
+            if self.auto_yes or not self.input_confirm("Diff continues, show next page? (y/n)", False):
+                print("... diff truncated")
+                break
+        return diff
+
     def handle_list_file(self, fcall, new_message, allMessages):
         framed_print(f"Tool (ListFile)", "", "success")
         if not self.auto_yes:
-            confirm = confirm_from_input(f"Confirm list current folder ? (y/n)")
+            confirm = self.input_confirm(f"Confirm list current folder ? (y/n)")
         else:
             confirm = True
 
         if confirm == True:
-            result = subprocess.run(['tree', '--gitignore'], capture_output=True, text=True)
-            response = result.stdout if result.returncode == 0 else result.stderr
+            response = list_files()
             call_result = {
                 'role' : 'tool',
                 'tool_call_id': fcall["id"],
@@ -200,7 +532,7 @@ class IFL(ABC):
             return self.chat_loop(allMessages)
 
         ## User input feedback, continue next round call
-        response = content_from_input("Enter feedback: ")
+        response = self.input_content("Enter feedback: ")
         response = self.config["RefuseTemplate"].replace("{__USER_RESPOSNE__}", response)
         call_result = {
             'role' : 'tool',
@@ -212,15 +544,32 @@ class IFL(ABC):
         return self.chat_loop(allMessages)
 
     def handle_modify_file(self, fcall, new_message, allMessages):
+        def edit(original, arguments):
+            return do_search_replace(original, arguments["modify_blocks"])
+        return self.handle_edit_file(fcall, new_message, allMessages, "ModifyFile", edit, "modify_blocks")
+
+    def handle_patch_file(self, fcall, new_message, allMessages):
+        def edit(original, arguments):
+            return apply_unified_diff(original, arguments["diff"])
+        return self.handle_edit_file(fcall, new_message, allMessages, "PatchFile", edit, "diff")
+
+    def handle_replace_lines(self, fcall, new_message, allMessages):
+        def edit(original, arguments):
+            return replace_lines(original, arguments["file_hash"], int(arguments["start_line"]),
+                                 int(arguments["end_line"]), arguments["content"])
+        return self.handle_edit_file(fcall, new_message, allMessages, "ReplaceLines", edit, "content")
+
+    ## Shared flow of the editing tools: apply in memory, review the diff, then write
+    def handle_edit_file(self, fcall, new_message, allMessages, tool_name, edit, display_key):
         try:
             callid = fcall["id"]
             arguments = fcall["function"]["arguments"]
             arguments = json.loads(arguments)
-            blocks = arguments["modify_blocks"]
             file_name = arguments["file_name"]
+            display = arguments[display_key]
 
         except Exception as e:
-            framed_print("ModifyFile error", f'{e}\nRetrying...', "warning")
+            framed_print(f"{tool_name} error", f'{e}\nRetrying...', "warning")
             response = f"parse tool error : {str(e)}"
             call_result = {
                 'role' : 'tool',
@@ -231,21 +580,45 @@ class IFL(ABC):
             allMessages.append(call_result)
             return self.chat_loop(allMessages)
 
-        framed_print(f"Tool (ModifyFile):{file_name}", blocks, "success")
+        try:
+            original = self.file_cache.read(file_name)
+            success, result = edit(original, arguments)
+        except Exception as e:
+            success, result = False, f"Cannot apply change to {file_name}: {str(e)}"
+
+        if not success:
+            framed_print(f"Tool ({tool_name}):{file_name}", display, "success", max_lines=self.review_page_lines())
+            framed_print(f"{tool_name} error", f'{result}', "warning")
+            response = self.config["ChangeFailedTemplate"]
+            response = response.replace("{__USER_RESPOSNE__}", result)
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        diff = self.review_diff(f"Tool ({tool_name}):{file_name}", original, result)
 
         if not self.auto_yes:
-            confirm = confirm_from_input(f"Confirm modification of {file_name}? (y/n)")
+            confirm = self.input_confirm(f"Confirm modification of {file_name} (+{diff.added} -{diff.removed})? (y/n)")
         else:
             confirm = True
         if confirm == True:
-            ## Modify target file based on obtained path/diff string
-            success, msg = apply_patch(file_name, blocks)
-            if success :
-                response = self.config["AcceptTemplate"]
-            else:
+            ## Write the already computed result
+            try:
+                with open(file_name, 'w', encoding='utf-8') as f:
+                    f.write(result)
+                response = self.config["AcceptTemplate"] + f"New file hash: {content_hash(result)}"
+                response += self.verify_changes({file_name: result})
+            except Exception as e:
+                msg = f"Failed to write file {file_name}: {str(e)}"
                 response = self.config["ChangeFailedTemplate"]
                 response = response.replace("{__USER_RESPOSNE__}", msg)
-                framed_print("ModifyFile error", f'{msg}', "warning")
+                framed_print(f"{tool_name} error", f'{msg}', "warning")
+            self.file_cache.invalidate(file_name)
 
             call_result = {
                 'role' : 'tool',
@@ -257,7 +630,7 @@ class IFL(ABC):
             return self.chat_loop(allMessages)
 
         ## User input feedback, continue next round call
-        response = content_from_input("Enter feedback: ")
+        response = self.input_content("Enter feedback: ")
         response = self.config["RefuseTemplate"].replace("{__USER_RESPOSNE__}", response)
         call_result = {
             'role' : 'tool',
@@ -268,15 +641,109 @@ class IFL(ABC):
         allMessages.append(call_result)
         return self.chat_loop(allMessages)
 
-    def handle_write_file(self, fcall, new_message, allMessages):
+    def handle_modify_files(self, fcall, new_message, allMessages):
         try:
             callid = fcall["id"]
             arguments = fcall["function"]["arguments"]
             arguments = json.loads(arguments)
-            file_content = arguments["file_content"]
-            file_name = arguments['file_name']
+            edits = arguments["edits"]
+            for edit in edits:
+                if "file_name" not in edit or "modify_blocks" not in edit:
+                    raise ValueError("every edit needs file_name and modify_blocks")
+            if len(edits) == 0:
+                raise ValueError("edits is empty")
 
         except Exception as e:
+            framed_print("ModifyFiles error", f'{e}\nRetrying...', "warning")
+            response = f"parse tool error : {str(e)}"
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        ## All files are matched before anything is shown or written
+        changes, errors = plan_edits(edits, self.file_cache.read)
+        if errors:
+            msg = "\n".join(f"{file_name}: {error}" for file_name, error in errors)
+            framed_print("ModifyFiles error", msg, "warning")
+            response = self.config["ChangeFailedTemplate"]
+            response = response.replace("{__USER_RESPOSNE__}", msg + "\nNo file was changed.")
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        added, removed = 0, 0
+        for file_name, original, result in changes:
+            diff = self.review_diff(f"Tool (ModifyFiles):{file_name}", original, result)
+            added += diff.added
+            removed += diff.removed
+
+        if not self.auto_yes:
+            confirm = self.input_confirm(f"Confirm modification of {len(changes)} files (+{added} -{removed})? (y/n)")
+        else:
+            confirm = True
+        if confirm == True:
+            error = commit_edits(changes)
+            for file_name, _, _ in changes:
+                self.file_cache.invalidate(file_name)
+            if error is None:
+                response = self.config["AcceptTemplate"] + "\n".join(
+                    f"New file hash of {file_name}: {content_hash(result)}" for file_name, _, result in changes)
+                response += self.verify_changes({file_name: result for file_name, _, result in changes})
+            else:
+                framed_print("ModifyFiles error", error, "warning")
+                response = self.config["ChangeFailedTemplate"].replace("{__USER_RESPOSNE__}", error)
+
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        ## User input feedback, continue next round call
+        response = self.input_content("Enter feedback: ")
+        response = self.config["RefuseTemplate"].replace("{__USER_RESPOSNE__}", response)
+        call_result = {
+            'role' : 'tool',
+            'tool_call_id': callid,
+            'content': response
+        }
+        allMessages.append(new_message)
+        allMessages.append(call_result)
+        return self.chat_loop(allMessages)
+
+    def handle_write_file(self, fcall, new_message, allMessages):
+        ## Content streamed into a staged file needs no second decode of the arguments
+        staged, self.staged = self.staged, None
+        try:
+            callid = fcall["id"]
+            if staged is not None and staged.complete and "file_name" in staged.fields:
+                file_name = staged.fields["file_name"]
+                file_content = staged.read()
+            else:
+                if staged is not None:
+                    staged.discard()
+                    staged = None
+                arguments = fcall["function"]["arguments"]
+                arguments = json.loads(arguments)
+                file_content = arguments["file_content"]
+                file_name = arguments['file_name']
+
+        except Exception as e:
+            if staged is not None:
+                staged.discard()
             framed_print("Writefile error", f'{e}\nRetrying...', "warning")
             response = f"Parse tool call error: {str(e)}"
             call_result = {
@@ -288,16 +755,32 @@ class IFL(ABC):
             allMessages.append(call_result)
             return self.chat_loop(allMessages)
 
-        framed_print(f"Tool (WriteFile):{file_name}", file_content, "success")
+        try:
+            original = self.file_cache.read(file_name) if os.path.exists(file_name) else ""
+        except Exception:
+            ## Not a utf-8 text file, show the new content as a whole
+            original = ""
+        diff = self.review_diff(f"Tool (WriteFile):{file_name}", original, file_content)
 
         if not self.auto_yes:
-            confirm = confirm_from_input(f"Confirm writing file {file_name}? (y/n)")
+            confirm = self.input_confirm(f"Confirm writing file {file_name} (+{diff.added} -{diff.removed})? (y/n)")
         else:
             confirm = True
         if confirm == True:
-            with open(file_name, 'w', encoding='utf-8') as f:
-                f.write(file_content)
-            response = self.config["AcceptTemplate"]
+            try:
+                if staged is not None:
+                    staged.commit(file_name)
+                else:
+                    with open(file_name, 'w', encoding='utf-8') as f:
+                        f.write(file_content)
+                response = self.config["AcceptTemplate"] + self.verify_changes({file_name: file_content}).lstrip("\n")
+            except Exception as e:
+                msg = f"Failed to write file {file_name}: {str(e)}"
+                response = self.config["ChangeFailedTemplate"].replace("{__USER_RESPOSNE__}", msg)
+                framed_print("WriteFile error", msg, "warning")
+            if staged is not None:
+                staged.discard()
+            self.file_cache.invalidate(file_name)
             call_result = {
                 'role' : 'tool',
                 'tool_call_id': callid,
@@ -307,8 +790,11 @@ class IFL(ABC):
             allMessages.append(call_result)
             return self.chat_loop(allMessages)
 
+        if staged is not None:
+            staged.discard()
+
         ## User input feedback, continue next round call
-        response = content_from_input("Enter feedback: ")
+        response = self.input_content("Enter feedback: ")
         response = self.config["RefuseTemplate"].replace("{__USER_RESPOSNE__}", response)
         call_result = {
             'role' : 'tool',
@@ -345,7 +831,16 @@ class IFL(ABC):
             print(f"Cannot open file: {file_name}, exiting")
             sys.exit(0)
 
-        response = readfile_with_linenumber(file_name, False)
+        self.prefetcher.record_read(file_name)
+        response = self.read_file_view(file_name)
+        ## Other files named in the last message come along, saving their rounds
+        offers = [f for f in self.prefetcher.take_offers() if os.path.isfile(f)]
+        if offers:
+            views = [self.read_file_view(f) for f in offers]
+            if not response.endswith("\n"):
+                response += "\n"
+            response += "\nAlso named in your last message, read ahead:\n" + "\n".join(
+                view if view.endswith("\n") else view + "\n" for view in views)
         call_result = {
             'role' : 'tool',
             'tool_call_id': callid,
@@ -355,20 +850,225 @@ class IFL(ABC):
         allMessages.append(call_result)
         return self.chat_loop(allMessages)
 
-def get_args_from_command():
+    def handle_search_code(self, fcall, new_message, allMessages):
+        try:
+            callid = fcall["id"]
+            arguments = fcall["function"]["arguments"]
+            arguments = json.loads(arguments)
+            pattern = arguments["pattern"]
+            is_regex = arguments.get("is_regex", False)
+            path = arguments.get("path") or "."
+        except Exception as e:
+            framed_print("SearchCode error", f'{e}\nRetrying...', "warning")
+            response = f"parse tool error : {str(e)}"
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        framed_print(f"Tool (SearchCode):{pattern}", f"path: {path}", "success")
+
+        settings = self.config.get("SearchCode", {})
+        abs_path = os.path.abspath(path)
+        abs_cwd = os.path.abspath(os.getcwd())
+        if not (abs_path == abs_cwd or abs_path.startswith(abs_cwd + os.sep)):
+            response = f"Error: search path must be within current directory: {path}"
+        elif not os.path.isdir(abs_path):
+            response = f"Error: search path is not a directory: {path}"
+        else:
+            try:
+                response = search_code(pattern, abs_path, is_regex,
+                                       max_results=settings.get("max_results", 50),
+                                       context=settings.get("context_lines", 1),
+                                       file_cache=self.file_cache)
+            except Exception as e:
+                response = f"Error: invalid search pattern: {str(e)}"
+
+        call_result = {
+            'role' : 'tool',
+            'tool_call_id': callid,
+            'content': response
+        }
+        allMessages.append(new_message)
+        allMessages.append(call_result)
+        return self.chat_loop(allMessages)
+
+    def handle_run_command(self, fcall, new_message, allMessages):
+        try:
+            callid = fcall["id"]
+            arguments = fcall["function"]["arguments"]
+            arguments = json.loads(arguments)
+            command = arguments["command"]
+            background = arguments.get("background", False)
+        except Exception as e:
+            framed_print("RunCommand error", f'{e}\nRetrying...', "warning")
+            response = f"parse tool error : {str(e)}"
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        framed_print("Tool (RunCommand)", f"$ {command}" + ("\n(background)" if background else ""), "success")
+        ## -y confirms edits only, commands need RunCommand.auto_approve
+        if not self.runner.auto_approve:
+            confirm = self.input_confirm(f"Confirm running this command? (y/n)")
+        else:
+            confirm = True
+
+        if confirm == True:
+            if background:
+                job = self.runner.start(command)
+                response = f"Started job {job.job_id}, check it with CommandOutput."
+            else:
+                frame = Frame(f"$ {command}")
+                frame.open()
+                job = self.runner.start(command, echo=lambda line: frame.append(line + "\n"))
+                finished = self.runner.wait(job)
+                job.stop_echo()
+                frame.close()
+                response = self.runner.summary(job)
+                if not finished:
+                    response += f"\nStill running as job {job.job_id}, check it with CommandOutput."
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        ## User input feedback, continue next round call
+        response = self.input_content("Enter feedback: ")
+        response = self.config["RefuseTemplate"].replace("{__USER_RESPOSNE__}", response)
+        call_result = {
+            'role' : 'tool',
+            'tool_call_id': callid,
+            'content': response
+        }
+        allMessages.append(new_message)
+        allMessages.append(call_result)
+        return self.chat_loop(allMessages)
+
+    def handle_command_output(self, fcall, new_message, allMessages):
+        try:
+            callid = fcall["id"]
+            arguments = fcall["function"]["arguments"]
+            arguments = json.loads(arguments)
+            job_id = str(arguments["job_id"])
+        except Exception as e:
+            framed_print("CommandOutput error", f'{e}\nRetrying...', "warning")
+            response = f"parse tool error : {str(e)}"
+            call_result = {
+                'role' : 'tool',
+                'tool_call_id': callid,
+                'content': response
+            }
+            allMessages.append(new_message)
+            allMessages.append(call_result)
+            return self.chat_loop(allMessages)
+
+        job = self.runner.jobs.get(job_id)
+        if job is None:
+            response = f"Error: unknown job id {job_id}"
+        else:
+            ## Saves the model a round of polling a job that is about to finish
+            self.runner.wait(job, self.runner.poll_seconds)
+            response = self.runner.summary(job)
+        framed_print(f"Tool (CommandOutput):{job_id}", response, "success", max_lines=self.review_page_lines())
+
+        call_result = {
+            'role' : 'tool',
+            'tool_call_id': callid,
+            'content': response
+        }
+        allMessages.append(new_message)
+        allMessages.append(call_result)
+        return self.chat_loop(allMessages)
+
+def get_args_from_command(argv=None):
     ## Parse command line arguments
     parser = argparse.ArgumentParser(description="ifl(I'm Feeling Lucky) - Command line coding agent")
-    parser.add_argument('-i', '--inputs', nargs='*', default=[], help='Input files')
+    parser.add_argument('-i', '--inputs', nargs='*', default=[], help='Input files, directories or quoted globs such as "src/**/*.py"')
     parser.add_argument('-t', '--task', type=str, help='Task description')
     parser.add_argument('-ti', '--task_input', type=str, help='Task description from text file')
-    parser.add_argument('-m', '--model', type=str, help='Model provider (SiFlow/GLM/AliYun)')
+    parser.add_argument('-m', '--model', type=str, help='Model provider (SiFlow/GLM/AliYun/Router/Mock)')
     parser.add_argument('-y', '--yes', action='store_true', help='Default yes to all confirmations')
     parser.add_argument('-l', '--list', action='store_true', help='Preload current directory file list')
+    parser.add_argument('-c', '--changed', action='store_true', help='Preload git status, diff and changed files')
     parser.add_argument('-s', '--settings', type=str, help='Path to config.yaml file')
+    parser.add_argument('-r', '--resume', type=str, help='Resume a saved session by id')
+    parser.add_argument('--daemon', action='store_true', help='Run as a warm background daemon on a Unix socket')
+    parser.add_argument('--no-daemon', action='store_true', help='Run in this process even if a daemon is running')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     return args
 
+def load_settings(args):
+    ## Load configuration file
+    if args.settings:
+        lore_path = args.settings
+    else:
+        code_path = os.path.dirname( os.path.abspath(__file__) )
+        lore_path = os.path.join(code_path, "config.yaml")
+
+    config = load_config(lore_path)
+
+    ## If a model provider is specified, update the configuration
+    if args.model:
+        if args.model in config["Model"] :
+            config["Model"]["selected"] = args.model
+        else:
+            print(f"Invalid model provider: {args.model}")
+            print(f"Available providers: {[k for k in config['Model'].keys() if k != 'selected']}")
+            sys.exit(1)
+
+    return config
+
+def read_task(args, agent):
+    if args.task and args.task.strip() != "":
+        task = args.task
+    elif args.task_input and args.task_input.strip() != "":
+        if not os.path.exists(args.task_input):
+            print(f"Task input file not found: {args.task_input}")
+            sys.exit(1)
+        with open(args.task_input, 'r', encoding='utf-8') as f:
+            task = f.read()
+        if task.strip() == "":
+            print("Task description from file cannot be empty")
+            sys.exit(1)
+    else:
+        task = agent.input_content("Enter your programing task: ")
+        if task.strip() == "":
+            print("Task description cannot be empty")
+            sys.exit(0)
+    return task
+
+def run_agent(agent, args):
+    try:
+        if args.resume:
+            ## A task is optional when resuming, it becomes a new user message
+            task = read_task(args, agent) if (args.task or args.task_input) else None
+            agent.resume(args.resume, task)
+            return
+
+        task = read_task(args, agent)
+        inputs = args.inputs.copy()
+        agent.fitter(task, inputs, args.list, args.changed)
+    finally:
+        ## Background commands end with the agent
+        agent.runner.close()
+        agent.prefetcher.close()
+        agent.report_metrics()
+
 def signal_handler(sig, frame):
     print("\nInterrupt signal received, program exiting...")
     sys.exit(0)
@@ -377,51 +1077,27 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
 
     try:
-        ## Load environment variables
-        load_dotenv()
-
-        ## Load configuration file
         args = get_args_from_command()
 
-        if args.settings:
-            lore_path = args.settings
-        else:
-            code_path = os.path.dirname( os.path.abspath(__file__) )
-            lore_path = os.path.join(code_path, "config.yaml")
+        if args.daemon:
+            from IFL.daemon import serve
+            serve()
+            return
 
-        with open(lore_path, "r") as file:
-            config = yaml.safe_load(file)
+        ## Hand the task over to a warm daemon when one is listening
+        if not args.no_daemon:
+            from IFL.daemon import forward
+            code = forward(sys.argv[1:])
+            if code is not None:
+                sys.exit(code)
 
-        ## If a model provider is specified, update the configuration
-        if args.model:
-            if args.model in config["Model"] :
-                config["Model"]["selected"] = args.model
-            else:
-                print(f"Invalid model provider: {args.model}")
-                print(f"Available providers: {[k for k in config['Model'].keys() if k != 'selected']}")
-                sys.exit(1)
+        ## Load environment variables
+        from dotenv import load_dotenv
+        load_dotenv()
 
+        config = load_settings(args)
         agent = IFL(config, auto_yes=args.yes)
-
-        if args.task and args.task.strip() != "":
-            task = args.task
-        elif args.task_input and args.task_input.strip() != "":
-            if not os.path.exists(args.task_input):
-                print(f"Task input file not found: {args.task_input}")
-                sys.exit(1)
-            with open(args.task_input, 'r', encoding='utf-8') as f:
-                task = f.read()
-            if task.strip() == "":
-                print("Task description from file cannot be empty")
-                sys.exit(1)
-        else:
-            task = content_from_input("Enter your programing task: ")
-            if task.strip() == "":
-                print("Task description cannot be empty")
-                sys.exit(0)
-
-        inputs = args.inputs.copy()
-        agent.fitter(task, inputs, args.list)
+        run_agent(agent, args)
     except KeyboardInterrupt:
         print("\nProgram interrupted by user, exiting...")
         sys.exit(0)
@@ -0,0 +1,118 @@
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+
+from IFL.scoring import window_score
+from IFL.utils import find_similar_lines, process_pool, has_line_numbers
+
+"""
+Parallel matching of SEARCH/REPLACE blocks
+
+Every block is matched against the original file in a worker process, the
+file is shared once through shared memory instead of being pickled per block.
+Results come back in block order. Serial matching sees the result of the
+blocks before it, so the parallel result is only taken when it is the one
+serial matching would produce: blocks are applied in block order and each
+match must beat every window an earlier block created (the windows
+overlapping its replacement), without ties. Otherwise, or when a block
+fails or two matches overlap, None is returned and do_search_replace falls
+back to serial matching.
+"""
+
+PARALLEL_MIN_BLOCKS = 2
+## Windows to score times lines per window, summed over blocks. Measured with
+## 8 blocks of 12 lines, cold caches: 2k lines (~100k) 0.10s parallel vs 0.02s
+## serial, 5k lines (~480k) 0.07s vs 0.05-0.11s, 20k lines (~1.9M) 0.14s vs 0.19s
+PARALLEL_MIN_WORK = 1_000_000
+## find_similar_lines' threshold, a match below it went through fallback strategies
+MATCH_THRESHOLD = 0.90
+
+## Original lines of the file, in each worker
+_lines = None
+
+def _attach(name, size):
+    global _lines
+    ## Attaching registers the block with the resource tracker the worker shares with
+    ## the parent, which already tracks it; the parent unlinks it once
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        _lines = bytes(shm.buf[:size]).decode('utf-8').splitlines(keepends=True)
+    finally:
+        shm.close()
+
+def _match_block(search_lines):
+    index, _, score, details = find_similar_lines(search_lines, _lines, strategy='combined')
+    return index, score, bool(details.get("ties"))
+
+def work_estimate(original_lines, parsed):
+    n = len(original_lines)
+    return sum(max(n - len(search) + 1, 0) * len(search) for search, _ in parsed)
+
+def apply_matches(original_lines, parsed, matches):
+    """
+    Apply blocks in block order at their matched positions, as serial matching would
+
+    Args:
+        matches: (index, score, tied) of every block against the original lines
+
+    Returns:
+        new list of lines, None if a block failed, two matches overlap or
+        serial matching could pick another window
+    """
+    if any(index == -1 or score < MATCH_THRESHOLD or tied for index, score, tied in matches):
+        return None
+    spans = sorted((index, index + len(search), k)
+                   for k, ((search, _), (index, _, _)) in enumerate(zip(parsed, matches)))
+    if any(end > next_start for (_, end, _), (next_start, _, _) in zip(spans, spans[1:])):
+        return None
+
+    lines = list(original_lines)
+    ## (start, end) in lines of every replacement applied so far, and the shift
+    ## each applied block adds to the positions after it in the original
+    regions = []
+    applied = []
+    for k, ((search_lines, replace_lines), (index, score, _)) in enumerate(zip(parsed, matches)):
+        start = index + sum(delta for at, delta in applied if at < index)
+        n = len(search_lines)
+        search = tuple(search_lines)
+        for region_start, region_end in regions:
+            ## Windows an earlier block created, none may score as well as the match
+            for i in range(max(0, region_start - n + 1), min(region_end, len(lines) - n + 1)):
+                if window_score(search, tuple(lines[i:i + n]), 'combined') >= score:
+                    return None
+        lines[start:start + n] = replace_lines
+        delta = len(replace_lines) - n
+        regions = [(s + delta, e + delta) if s >= start + n else (s, e) for s, e in regions]
+        regions.append((start, start + len(replace_lines)))
+        applied.append((index, delta))
+    return lines
+
+def match_blocks_parallel(original_lines, parsed, workers=None):
+    """
+    Match all blocks concurrently and apply them
+
+    Returns:
+        new list of lines, or None when the input is too small to be worth a
+        pool or the serial path has to decide
+    """
+    if len(parsed) < PARALLEL_MIN_BLOCKS or work_estimate(original_lines, parsed) < PARALLEL_MIN_WORK:
+        return None
+    ## Copied line numbers are stripped against the file as serial matching sees it
+    if any(has_line_numbers(search) for search, _ in parsed):
+        return None
+    ## Pool workers (e.g. ModifyFiles matching) can't start pools of their own
+    if multiprocessing.current_process().daemon:
+        return None
+
+    data = ''.join(original_lines).encode('utf-8')
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        shm.buf[:len(data)] = data
+        workers = workers or min(len(parsed), os.cpu_count() or 1)
+        with process_pool(workers, _attach, (shm.name, len(data))) as pool:
+            matches = list(pool.map(_match_block, [search for search, _ in parsed]))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return apply_matches(original_lines, parsed, matches)
@@ -0,0 +1,243 @@
+import sys
+import json
+import gzip
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+"""
+Local mock of an OpenAI compatible /chat/completions endpoint
+
+Answers in blocking and SSE mode with a configurable time to first token,
+output speed and error rate, so providers and whole agent sessions can be
+exercised offline. Replies follow a script: the n-th step answers a request
+holding n assistant messages, so any number of concurrent conversations
+walk the script independently. A step has optional "thinking", "content"
+and "tool" with "arguments"; past the script's end the reply is a plain
+answer without a tool call, which ends an IFL session. Thinking is left
+out when the request turns it off and cut to a thinking_budget.
+
+    python -m IFL.mock_server --port 8765 --ttft 0.3 --tps 80 --script steps.json
+"""
+
+DEFAULT_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 0,
+    ## Seconds before the first token, output tokens per second, chars per token
+    "ttft": 0.2,
+    "tokens_per_second": 50,
+    "chars_per_token": 4,
+    ## Share of requests answered with error_status
+    "error_rate": 0.0,
+    "error_status": 500,
+    "seed": None,
+    "script": [],
+    "final": "Done.",
+}
+
+class MockServer:
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.random = random.Random(self.settings["seed"])
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.output_chars = 0
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def step(self, messages):
+        """Script step answering a conversation"""
+        index = sum(1 for m in messages if m.get("role") == "assistant")
+        script = self.settings["script"]
+        if index < len(script):
+            return script[index]
+        return {"content": self.settings["final"]}
+
+    def fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.settings["error_rate"]
+            if failed:
+                self.errors += 1
+        return failed
+
+    def pieces(self, text):
+        size = max(1, self.settings["chars_per_token"])
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def tokens(self, chars):
+        size = max(1, self.settings["chars_per_token"])
+        return -(-chars // size)
+
+    def token_seconds(self):
+        tps = self.settings["tokens_per_second"]
+        return 1.0 / tps if tps else 0.0
+
+    def count(self, chars):
+        with self.lock:
+            self.output_chars += chars
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors, "output_chars": self.output_chars}
+
+    def start(self):
+        """Serve on a background thread, returns the base url"""
+        self.httpd = ThreadingHTTPServer((self.settings["host"], self.settings["port"]), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.1},
+                                       daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+def _tool_call(step):
+    arguments = step.get("arguments", {})
+    if not isinstance(arguments, str):
+        arguments = json.dumps(arguments, ensure_ascii=False)
+    return {"id": "call_" + uuid.uuid4().hex[:8], "type": "function",
+            "function": {"name": step["tool"], "arguments": arguments}}
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        mock = self.server.mock
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            self._send_json(400, {"error": {"message": f"invalid JSON: {str(e)}"}})
+            return
+        if mock.fail():
+            self._send_json(mock.settings["error_status"], {"error": {"message": "mock error"}})
+            return
+
+        step = dict(mock.step(request.get("messages") or []))
+        ## Reasoning follows the request: off, or cut to its budget
+        thinking = request.get("thinking", True)
+        if isinstance(thinking, dict):
+            thinking = thinking.get("type") != "disabled"
+        budget = request.get("thinking_budget")
+        if not thinking:
+            step.pop("thinking", None)
+        elif budget and step.get("thinking"):
+            step["thinking"] = step["thinking"][:budget * max(1, mock.settings["chars_per_token"])]
+        time.sleep(mock.settings["ttft"])
+        if request.get("stream"):
+            self._stream(mock, step, request.get("model"))
+        else:
+            self._blocking(mock, step, request.get("model"))
+
+    def _blocking(self, mock, step, model):
+        message = {"role": "assistant", "content": step.get("content")}
+        if step.get("thinking"):
+            message["reasoning_content"] = step["thinking"]
+        chars = len(step.get("thinking") or "") + len(step.get("content") or "")
+        if step.get("tool"):
+            message["tool_calls"] = [_tool_call(step)]
+            chars += len(message["tool_calls"][0]["function"]["arguments"])
+        ## The whole output is generated before the reply
+        time.sleep(mock.token_seconds() * mock.tokens(chars))
+        mock.count(chars)
+        self._send_json(200, {"id": "mock-" + uuid.uuid4().hex[:8], "object": "chat.completion",
+                              "model": model, "choices": [{"index": 0, "message": message,
+                              "finish_reason": "tool_calls" if step.get("tool") else "stop"}]})
+
+    def _stream(self, mock, step, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        delay = mock.token_seconds()
+        chunk_id = "mock-" + uuid.uuid4().hex[:8]
+
+        def send(delta, finish=None):
+            chunk = {"id": chunk_id, "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            self.wfile.write(b"data: " + json.dumps(chunk, ensure_ascii=False).encode('utf-8') + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            first = True
+            for key, text in (("reasoning_content", step.get("thinking")), ("content", step.get("content"))):
+                for piece in mock.pieces(text or ""):
+                    if not first:
+                        time.sleep(delay)
+                    first = False
+                    send({key: piece})
+                    mock.count(len(piece))
+            if step.get("tool"):
+                call = _tool_call(step)
+                send({"tool_calls": [{"index": 0, "id": call["id"], "type": "function",
+                                      "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                for piece in mock.pieces(call["function"]["arguments"]):
+                    time.sleep(delay)
+                    send({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+                    mock.count(len(piece))
+            send({}, "tool_calls" if step.get("tool") else "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            ## The client cancelled the stream
+            pass
+
+def load_script(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(file)
+        return json.load(file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI compatible chat completions server")
+    parser.add_argument('--host', default=DEFAULT_SETTINGS["host"])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ttft', type=float, default=DEFAULT_SETTINGS["ttft"], help='Seconds to first token')
+    parser.add_argument('--tps', type=float, default=DEFAULT_SETTINGS["tokens_per_second"], help='Tokens per second')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing')
+    parser.add_argument('--script', type=str, help='JSON or YAML list of reply steps')
+    args = parser.parse_args(argv)
+
+    server = MockServer({"host": args.host, "port": args.port, "ttft": args.ttft,
+                         "tokens_per_second": args.tps, "error_rate": args.error_rate,
+                         "script": load_script(args.script) if args.script else []})
+    server.start()
+    print(f"Mock server listening on {server.base_url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
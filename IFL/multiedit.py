@@ -0,0 +1,97 @@
+import os
+
+from IFL.utils import do_search_replace, process_pool
+from IFL.staging import replace_file
+
+## Below this much text, matching in worker processes costs more than it saves
+PARALLEL_MIN_CHARS = 256 * 1024
+
+def _match(item):
+    file_name, original, blocks = item
+    success, result = do_search_replace(original, blocks)
+    return file_name, success, result
+
+def plan_edits(edits, read, workers=None):
+    """
+    Compute the new content of every file touched by edits, without writing
+
+    Args:
+        edits: list of {"file_name", "modify_blocks"}, several entries for the
+               same file, however its path is spelled, are applied in their order
+        read: function returning the current text of a file
+
+    Returns:
+        tuple: (changes, errors), changes is a list of (file_name, original, new)
+        in first-seen file order, errors a list of (file_name, message)
+    """
+    ## Spellings of one path (a.py, ./a.py, sub/../a.py, a symlink to a.py) are one
+    ## file, named as first seen
+    grouped = {}
+    for edit in edits:
+        key = os.path.realpath(edit["file_name"])
+        grouped.setdefault(key, (edit["file_name"], []))[1].append(edit["modify_blocks"])
+
+    items = []
+    errors = []
+    for file_name, blocks in grouped.values():
+        try:
+            original = read(file_name)
+        except Exception as e:
+            errors.append((file_name, f"Cannot read file: {str(e)}"))
+            continue
+        items.append((file_name, original, "\n".join(blocks)))
+
+    total = sum(len(original) for _, original, _ in items)
+    if len(items) < 2 or total < PARALLEL_MIN_CHARS or workers == 1:
+        results = [_match(item) for item in items]
+    else:
+        workers = workers or min(len(items), os.cpu_count() or 1)
+        with process_pool(workers) as pool:
+            results = list(pool.map(_match, items))
+
+    originals = {file_name: original for file_name, original, _ in items}
+    changes = []
+    for file_name, success, result in results:
+        if success:
+            changes.append((file_name, originals[file_name], result))
+        else:
+            errors.append((file_name, result))
+    return changes, errors
+
+def commit_edits(changes):
+    """
+    Write all changes or none of them
+
+    New contents are staged next to the real files behind their targets
+    first, then moved in place by replace_file. If moving fails half way, the
+    files already replaced get their original content back. Returns None on
+    success, otherwise the error message.
+    """
+    staged = []
+    try:
+        for file_name, _, new in changes:
+            real = os.path.realpath(file_name)
+            tmp_name = os.path.join(os.path.dirname(real), f".{os.path.basename(real)}.ifl-tmp")
+            with open(tmp_name, 'w', encoding='utf-8') as f:
+                f.write(new)
+            staged.append((tmp_name, file_name))
+    except Exception as e:
+        for tmp_name, _ in staged:
+            os.unlink(tmp_name)
+        return f"Failed to stage changes: {str(e)}"
+
+    replaced = []
+    try:
+        for tmp_name, file_name in staged:
+            replace_file(tmp_name, file_name)
+            replaced.append(file_name)
+    except Exception as e:
+        originals = {file_name: original for file_name, original, _ in changes}
+        for file_name in replaced:
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write(originals[file_name])
+        for tmp_name, file_name in staged:
+            if file_name not in replaced and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+        return f"Failed to write changes, nothing was changed: {str(e)}"
+    return None
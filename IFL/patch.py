@@ -0,0 +1,154 @@
+import re
+import hashlib
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_LOOSE_HEADER = re.compile(r'^@@.*@@')
+
+def content_hash(text):
+    """Short content hash handed out by ReadFile and checked by ReplaceLines"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+def parse_unified_diff(diff):
+    """
+    Parse unified diff hunks
+
+    Returns:
+        list of (old_start, old_lines, new_lines), old_start is 0-based or None
+        when the hunk header has no line numbers. Lines keep their newline.
+    """
+    hunks = []
+    current = None
+    ## The lists the previous body line went to
+    last = ()
+    for line in diff.splitlines(keepends=True):
+        if line.startswith(('--- ', '+++ ')) and current is None:
+            continue
+        header = _HUNK_HEADER.match(line)
+        if header or _LOOSE_HEADER.match(line):
+            start = int(header.group(1)) - 1 if header else None
+            if header and header.group(2) == '0':
+                ## Pure insertion, the hunk goes after line `start`
+                start += 1
+            current = (start, [], [])
+            hunks.append(current)
+            last = ()
+            continue
+        if current is None:
+            continue
+        if line.startswith('\\'):
+            ## "\ No newline at end of file" applies to the previous line, on its side(s)
+            for target in last:
+                target[-1] = target[-1].rstrip('\r\n')
+            continue
+        if line.startswith('-'):
+            last = (current[1],)
+        elif line.startswith('+'):
+            last = (current[2],)
+        else:
+            last = (current[1], current[2])
+        ## A line without a prefix is context, e.g. an empty line whose leading space
+        ## an editor or model dropped
+        body = line[1:] if line[:1] in (' ', '-', '+') else line
+        for target in last:
+            target.append(body)
+    return hunks
+
+def _find_block(lines, block, expected, lower, normalize):
+    """Nearest position >= lower where block matches, searching outward from expected"""
+    n = len(block)
+    if normalize:
+        block = [l.rstrip() for l in block]
+        def matches(pos):
+            return all(lines[pos + k].rstrip() == block[k] for k in range(n))
+    else:
+        def matches(pos):
+            return lines[pos:pos + n] == block
+
+    last = len(lines) - n
+    expected = min(max(expected, lower), max(last, lower))
+    for delta in range(0, max(last - lower, 0) + 1):
+        for pos in (expected - delta, expected + delta):
+            if lower <= pos <= last and matches(pos):
+                return pos
+        if expected - delta < lower and expected + delta > last:
+            break
+    return -1
+
+def apply_unified_diff(original, diff):
+    """
+    Apply unified diff hunks to original text
+
+    Every hunk is verified against its context and removed lines, exactly
+    first, then ignoring trailing whitespace. A hunk that moved is found by
+    searching outward from the line its header names.
+
+    Returns:
+        tuple: (success, new text or error message)
+    """
+    hunks = parse_unified_diff(diff)
+    if not hunks:
+        return False, "Malformed diff: no @@ hunk found"
+
+    lines = original.splitlines(keepends=True)
+    if lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+        missing_newline = True
+    else:
+        missing_newline = False
+
+    offset = 0
+    lower = 0
+    for number, (start, old, new) in enumerate(hunks, 1):
+        expected = (start if start is not None else lower) + offset
+        if not old:
+            pos = min(max(expected, lower), len(lines))
+        else:
+            old_cmp = [l if l.endswith('\n') else l + '\n' for l in old]
+            pos = _find_block(lines, old_cmp, expected, lower, False)
+            if pos == -1:
+                pos = _find_block(lines, old_cmp, expected, lower, True)
+            if pos == -1:
+                where = f"near line {start + 1}" if start is not None else "after the previous hunk"
+                return False, f"Hunk {number} does not apply: its context and '-' lines were not found {where}"
+
+        new_lines = [l if l.endswith('\n') else l + '\n' for l in new]
+        lines[pos:pos + len(old)] = new_lines
+        lower = pos + len(new_lines)
+        if new and lower == len(lines):
+            ## "\ No newline at end of file" on a side of a hunk ending the file decides
+            ## the final newline, without one the original's is kept
+            if not new[-1].endswith('\n'):
+                missing_newline = True
+            elif old and not old[-1].endswith('\n'):
+                missing_newline = False
+        if start is not None:
+            offset = pos + len(new_lines) - (start + len(old))
+
+    result = ''.join(lines)
+    if missing_newline and result.endswith('\n'):
+        result = result[:-1]
+    return True, result
+
+def replace_lines(original, file_hash, start_line, end_line, content):
+    """
+    Replace lines start_line..end_line (1-based, inclusive) by content
+
+    file_hash must be the hash ReadFile returned for the current file content.
+    end_line = start_line - 1 inserts before start_line, empty content deletes.
+    """
+    current = content_hash(original)
+    if file_hash != current:
+        return False, (f"File hash mismatch: expected {current}, got {file_hash}. "
+                       "The file changed since it was read, read it again.")
+
+    lines = original.splitlines(keepends=True)
+    if not (1 <= start_line <= len(lines) + 1) or not (start_line - 1 <= end_line <= len(lines)):
+        return False, f"Invalid line range {start_line}-{end_line}, the file has {len(lines)} lines"
+
+    new_lines = content.splitlines(keepends=True)
+    if new_lines and not new_lines[-1].endswith('\n') and end_line < len(lines):
+        new_lines[-1] += '\n'
+    if start_line > len(lines) and lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+    lines[start_line - 1:end_line] = new_lines
+    return True, ''.join(lines)
@@ -0,0 +1,88 @@
+"""
+Reasoning budget per round
+
+Rounds differ in how much thinking they need: planning the task or
+recovering from a failed edit needs it, picking the next file after a
+listing or finishing after an accepted write mostly doesn't. The round type
+is read from the end of the conversation, the request options of that type
+(thinking on or off, thinking and output token budgets, temperature) go
+with the request.
+
+Round types:
+    plan     the task or user feedback was just given
+    explore  after ListFile or SearchCode
+    edit     after reading files or command output, a change usually follows
+    retry    after a failed or malformed tool call, or failed checks
+    wrap_up  after an accepted change
+"""
+
+PLAN, EXPLORE, EDIT, RETRY, WRAP_UP = "plan", "explore", "edit", "retry", "wrap_up"
+
+## None leaves a budget to the provider
+DEFAULT_OPTIONS = {
+    PLAN: {"thinking": True, "thinking_budget": None, "max_tokens": None},
+    EXPLORE: {"thinking": False, "thinking_budget": None, "max_tokens": None},
+    EDIT: {"thinking": True, "thinking_budget": 4096, "max_tokens": None},
+    RETRY: {"thinking": True, "thinking_budget": None, "max_tokens": None},
+    WRAP_UP: {"thinking": False, "thinking_budget": None, "max_tokens": None},
+}
+
+EXPLORE_TOOLS = {"ListFile", "SearchCode"}
+
+## Text a verify report adds to an accepted change when checks failed
+CHECKS_FAILED = "checks failed"
+
+def _prefix(template):
+    """Fixed start of a response template"""
+    return (template or "").split("{__USER_RESPOSNE__}")[0].strip()
+
+class RoundPolicy:
+    def __init__(self, settings, config):
+        self.enabled = settings.get("enabled", True)
+        self.temperature = settings.get("temperature", 0.3)
+        self.options_by_type = {kind: dict(options, **(settings.get(kind) or {}))
+                                for kind, options in DEFAULT_OPTIONS.items()}
+        self.accepted = _prefix(config.get("AcceptTemplate"))
+        self.failed = [_prefix(config.get("ChangeFailedTemplate")), "parse tool error", "Error:"]
+        self.refused = _prefix(config.get("RefuseTemplate"))
+        self.preload = config.get("PreloadTemplate")
+        self.counts = {kind: 0 for kind in DEFAULT_OPTIONS}
+
+    def _after_task(self, messages):
+        """No answer of the model since the last user message, simulated preload calls aside"""
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                return True
+            if message.get("role") == "assistant" and message.get("content") != self.preload:
+                return False
+        return True
+
+    def round_type(self, messages):
+        """Type of the round answering messages"""
+        last = messages[-1] if messages else {}
+        if last.get("role") != "tool" or self._after_task(messages):
+            return PLAN
+        content = (last.get("content") or "").strip()
+        if self.refused and content.startswith(self.refused):
+            ## The user said what to do instead
+            return PLAN
+        if any(prefix and content.startswith(prefix) for prefix in self.failed):
+            return RETRY
+        if self.accepted and content.startswith(self.accepted):
+            return RETRY if CHECKS_FAILED in content else WRAP_UP
+
+        tool = None
+        for message in reversed(messages[:-1]):
+            if message.get("role") == "assistant":
+                calls = message.get("tool_calls") or []
+                tool = calls[0]["function"]["name"] if calls else None
+                break
+        return EXPLORE if tool in EXPLORE_TOOLS else EDIT
+
+    def options(self, messages):
+        """Request options for the round answering messages, None when the policy is off"""
+        if not self.enabled:
+            return None
+        kind = self.round_type(messages)
+        self.counts[kind] += 1
+        return dict(self.options_by_type[kind], temperature=self.temperature)
@@ -0,0 +1,124 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Speculative file prefetch driven by the model's stream
+
+While the model thinks and answers it usually names the files it is going
+to read. Streamed text is scanned for path-like tokens, those that are files
+of the project are read into the file cache on a background thread, so the
+ReadFile that follows is served from memory. Optionally files named in a
+round that the model then didn't read are offered along with its next
+ReadFile result, saving the rounds it would spend reading them one by one.
+"""
+
+## A relative path with an extension, e.g. IFL/ifl.py or config.yaml
+_PATH = re.compile(r'(?<![\w./-])(?:\.{0,2}/)?(?:[\w.-]+/)*[\w-][\w.-]*\.[A-Za-z0-9_]+(?![\w/-])')
+
+## Streamed text kept back for a token cut at the end of a chunk
+_TAIL_CHARS = 256
+
+class Prefetcher:
+    def __init__(self, settings, file_cache, root=None):
+        self.enabled = settings.get("enabled", True)
+        self.max_files = settings.get("max_files", 16)
+        self.max_bytes = settings.get("max_bytes", 256 * 1024)
+        self.offer = settings.get("offer", False)
+        self.offer_files = settings.get("offer_files", 3)
+        self.file_cache = file_cache
+        self.root = os.path.abspath(root or os.getcwd())
+        self.pool = None
+        self.pending = ""
+        ## Tokens already looked at, and the files warmed, in this round
+        self.checked = set()
+        self.mentioned = []
+        ## Every file warmed during the session, and every file the model has seen
+        self.warmed = set()
+        self.shown = set()
+        self.reads = 0
+        self.hits = 0
+        self.offered = 0
+
+    def feed(self, text):
+        """Scan a piece of streamed text"""
+        if not self.enabled or not text:
+            return
+        text = self.pending + text
+        ## The last token may continue in the next chunk
+        cut = max(text.rfind(c) for c in ' \n\t`"\'()[]<>,;:')
+        if cut < 0:
+            self.pending = text[-_TAIL_CHARS:]
+            return
+        self.pending = text[cut + 1:][-_TAIL_CHARS:]
+        for match in _PATH.finditer(text, 0, cut + 1):
+            self._candidate(match.group(0))
+
+    def flush(self):
+        """Scan what is left at the end of the stream"""
+        self.feed("\n")
+
+    def _candidate(self, token):
+        token = token.rstrip('.')
+        if token in self.checked or len(self.mentioned) >= self.max_files:
+            return
+        self.checked.add(token)
+        path = os.path.abspath(os.path.join(self.root, token))
+        if os.path.commonpath([self.root, path]) != self.root or "/.git/" in path:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        if not os.path.isfile(path) or stat.st_size > self.max_bytes:
+            return
+        rel_path = os.path.relpath(path, self.root)
+        if rel_path in self.mentioned:
+            return
+        self.mentioned.append(rel_path)
+        self.warmed.add(path)
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self.pool.submit(self._warm, path)
+
+    def _warm(self, path):
+        if self.file_cache.peek(path) is not None:
+            return
+        try:
+            self.file_cache.read(path)
+        except (OSError, UnicodeDecodeError):
+            ## Binary or gone, ReadFile deals with it
+            pass
+
+    def record_read(self, file_name):
+        """Count a ReadFile, a hit when its file was prefetched"""
+        self.reads += 1
+        path = os.path.abspath(os.path.join(self.root, file_name))
+        self.shown.add(os.path.relpath(path, self.root))
+        if path in self.warmed:
+            self.hits += 1
+
+    def take_offers(self):
+        """Files named in the last round to show along with a ReadFile, none shown before"""
+        if not self.offer:
+            return []
+        offers = [f for f in self.mentioned if f not in self.shown][:self.offer_files]
+        self.shown.update(offers)
+        self.offered += len(offers)
+        return offers
+
+    def end_round(self):
+        """Forget what the last round mentioned, files it warmed stay counted"""
+        self.pending = ""
+        self.checked = set()
+        self.mentioned = []
+
+    def metrics(self):
+        rate = f"{100 * self.hits / self.reads:.0f}%" if self.reads else "-"
+        return {"warmed": len(self.warmed), "reads": self.reads, "hits": self.hits,
+                "hit_rate": rate, "offered": self.offered}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
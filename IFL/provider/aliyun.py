@@ -1,8 +1,7 @@
-import json
 import os
-from httpx import Client
 
 from IFL.provider.base import LLMProviderBase
+from IFL.provider.codec import loads
 
 class LLMProvider(LLMProviderBase):
     def __init__(self, config):
@@ -12,16 +11,17 @@ class LLMProvider(LLMProviderBase):
         self.api_key = os.getenv(api_key_env)
         if self.api_key == None:
             raise Exception("从环境变量中，无法获取 API_KEY")
-        self.client = Client()
+        self.compress = config.get("gzip_requests", False)
 
-    def _build_request(self, dialogue, functions = None, stream = True):
+    def _build_request(self, dialogue, functions = None, stream = True, options = None):
         url = self.base_url + "/chat/completions"
+        options = self.request_options(options)
         payload =  {
             "model": self.model_name,
             "messages" : dialogue,
             "stream": stream,
-            "thinking": True,
-            "temperature": 0.3,
+            "thinking": options["thinking"],
+            "temperature": options["temperature"],
             "response_format": {"type": "text"}
         };
         headers = {
@@ -31,18 +31,24 @@ class LLMProvider(LLMProviderBase):
 
         if functions is not None :
             payload["tools"] = functions;
+        if options["thinking"] and options["thinking_budget"] is not None:
+            payload["thinking_budget"] = options["thinking_budget"]
+        if options["max_tokens"] is not None:
+            payload["max_tokens"] = options["max_tokens"]
 
         return url, payload, headers
 
-    def response(self, dialogue, functions=None):
+    def response(self, dialogue, functions=None, options=None):
         try:
-            url, payload, headers = self._build_request(dialogue, functions, False)
-            response = self.client.post(url, headers=headers, json=payload, timeout=300)
+            url, payload, headers = self._build_request(dialogue, functions, False, options)
+            body, extra_headers = self.encoder.encode(payload)
+            headers.update(extra_headers)
+            response = self.client.post(url, headers=headers, content=body, timeout=300)
 
             if response.status_code != 200:
                 raise Exception( f"LLM调用异常：{response.json()}")
 
-            result = response.json()
+            result = loads(response.content)
             thinking = None
             if "reasoning_content" in result["choices"][0]["message"]:
                 thinking = result["choices"][0]["message"]["reasoning_content"]
@@ -60,7 +66,7 @@ class LLMProvider(LLMProviderBase):
         except Exception as e:
             raise Exception(f"LLM调用异常：{str(e)}")
 
-    def response_stream(self, dialogue, functions=None):
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
         tool_call = {
             "type": "function",
             "function": {
@@ -69,8 +75,10 @@ class LLMProvider(LLMProviderBase):
             }
         }
         try:
-            url, payload, headers = self._build_request(dialogue, functions)
-            with self.client.stream('POST', url , headers = headers, json = payload, timeout=300 ) as response:
+            url, payload, headers = self._build_request(dialogue, functions, True, options)
+            body, extra_headers = self.encoder.encode(payload)
+            headers.update(extra_headers)
+            with self.client.stream('POST', url , headers = headers, content = body, timeout=300 ) as response:
                 ## 检查 API 是否 200 OK
                 if response.status_code != 200:
                     response.read()
@@ -80,7 +88,7 @@ class LLMProvider(LLMProviderBase):
                 for line in response.iter_lines():
                     lj = line[6:];
                     if lj.startswith("{"):
-                        lj = json.loads(lj)
+                        lj = loads(lj)
                         thinking = None
                         if "reasoning_content" in lj["choices"][0]["delta"]:
                             thinking = lj["choices"][0]["delta"]["reasoning_content"]
@@ -100,6 +108,9 @@ class LLMProvider(LLMProviderBase):
                                     tool_call["function"]["name"] = fcall["name"]
                                 if "arguments" in fcall and fcall["arguments"] is not None:
                                     tool_call["function"]["arguments"] = tool_call["function"]["arguments"] + fcall["arguments"]
+                                    ## 参数增量实时交给调用方，例如流式写入暂存文件
+                                    if on_arguments is not None:
+                                        on_arguments(tool_call["function"]["name"], fcall["arguments"])
 
                         if (token is not None) or (thinking is not None):
                             yield thinking, token, None
@@ -1,10 +1,39 @@
 from abc import ABC, abstractmethod
 
+## Request options of a round without a policy: full thinking
+DEFAULT_OPTIONS = {"thinking": True, "thinking_budget": None, "max_tokens": None, "temperature": 0.3}
+
 class LLMProviderBase(ABC):
+    _client = None
+    _encoder = None
+    ## gzip request bodies, for endpoints that accept Content-Encoding: gzip
+    compress = False
+
+    @property
+    def client(self):
+        ## httpx is imported with the first request, not at start-up
+        if self._client is None:
+            from httpx import Client
+            self._client = Client()
+        return self._client
+
+    @property
+    def encoder(self):
+        ## Keeps the encoded history between rounds, see IFL.provider.codec
+        if self._encoder is None:
+            from IFL.provider.codec import RequestEncoder
+            self._encoder = RequestEncoder(self.compress)
+        return self._encoder
+
+    def request_options(self, options=None):
+        ## Per-round options, see IFL.policy; None budgets are left to the endpoint
+        return dict(DEFAULT_OPTIONS, **(options or {}))
+
     @abstractmethod
-    def response(self, dialogue, functions=None):
+    def response(self, dialogue, functions=None, options=None):
         pass
 
+    ## on_arguments(tool name, delta) receives tool call arguments while they stream
     @abstractmethod
-    def response_stream(self, dialogue, functions=None):
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
         pass
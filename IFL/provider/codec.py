@@ -0,0 +1,83 @@
+import json
+import gzip
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+JSON encoding of chat requests and decoding of streamed chunks
+
+orjson is used when installed. A chat request repeats the whole history
+every round, RequestEncoder keeps the encoded bytes of every message and
+tool list it has sent and splices them into the next request, so only the
+messages added since are encoded. Messages must not be changed once they
+are in the history, which is how IFL treats allMessages.
+"""
+
+def dumps(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            ## e.g. lone surrogates, which the stdlib escapes
+            pass
+    try:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    except UnicodeEncodeError:
+        return json.dumps(obj, separators=(',', ':')).encode('ascii')
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class RequestEncoder:
+    def __init__(self, compress=False, compress_level=1):
+        self.compress = compress
+        self.compress_level = compress_level
+        self._cache = {}
+        self.encoded = 0
+        self.reused = 0
+
+    def _bytes(self, obj, cache):
+        ## Keyed by identity, the object itself is kept so the id can't be reused
+        entry = self._cache.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            self.reused += 1
+        else:
+            entry = (obj, dumps(obj))
+            self.encoded += 1
+        cache[id(obj)] = entry
+        return entry[1]
+
+    def encode(self, payload):
+        """
+        Request body of payload
+
+        Returns:
+            tuple: (body bytes, extra headers)
+        """
+        cache = {}
+        rest = {k: v for k, v in payload.items() if k not in ("messages", "tools")}
+        head = dumps(rest)[:-1]
+        parts = [head]
+        separator = b',' if len(head) > 1 else b''
+        if "messages" in payload:
+            parts.append(separator + b'"messages":[')
+            parts.append(b','.join(self._bytes(m, cache) for m in payload["messages"]))
+            parts.append(b']')
+            separator = b','
+        if payload.get("tools") is not None:
+            parts.append(separator + b'"tools":' + self._bytes(payload["tools"], cache))
+        parts.append(b'}')
+        ## Only what this request used is kept, dropped history is released
+        self._cache = cache
+
+        body = b''.join(parts)
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, self.compress_level)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
@@ -7,9 +7,12 @@ from IFL.provider.base import LLMProviderBase
 """工厂方法创建实例"""
 def create_provider(config) -> LLMProviderBase:
     try:
-        config = config["Model"]
-        config = config[config["selected"]]
-        
+        models = config["Model"]
+        config = models[models["selected"]]
+        if "backends" in config:
+            ## A router gets the configuration of every backend it routes to
+            config = dict(config, backends={name: models[name] for name in config["backends"]})
+
         module = importlib.import_module(f'{config["import"]}')
         return module.LLMProvider(config)
 
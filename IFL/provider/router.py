@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import importlib
+
+from IFL.provider.base import LLMProviderBase
+from IFL.settings import cache_dir
+
+"""
+Provider routing each round to one of several backends
+
+Every backend keeps rolling averages (EWMA) of its time to first output and
+its output speed. A round goes to the healthy backend with the shortest
+expected time, a backend that has not answered yet is tried first so every
+backend gets measured. Rounds that only explore the project (after ListFile
+or SearchCode) can be sent to a separate cheap tier.
+
+A failing backend sits out a cooldown, doubled on every further failure,
+and the round moves on to the next backend. A stream that already produced
+output can't move, its error is raised.
+
+The statistics are saved in the cache folder, a new process starts warm.
+"""
+
+## Output size assumed before any round was measured
+DEFAULT_CHARS = 2000
+
+class BackendStats:
+    def __init__(self, name):
+        self.name = name
+        self.ttft = None
+        self.chars_per_second = None
+        self.chars = None
+        self.rounds = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def healthy(self, now):
+        return now >= self.down_until
+
+    def expected_seconds(self, chars):
+        """Expected time of a round producing chars, 0 when never measured"""
+        if self.ttft is None:
+            return 0.0
+        if not self.chars_per_second:
+            return self.ttft
+        return self.ttft + chars / self.chars_per_second
+
+    def record(self, ttft, chars, seconds, alpha):
+        """Update the averages with one finished round"""
+        def ewma(old, new):
+            return new if old is None else old + alpha * (new - old)
+
+        self.ttft = ewma(self.ttft, ttft)
+        if chars > 0 and seconds > ttft:
+            self.chars_per_second = ewma(self.chars_per_second, chars / (seconds - ttft))
+        self.chars = ewma(self.chars, chars)
+        self.rounds += 1
+        self.failures = 0
+        self.down_until = 0.0
+
+    def fail(self, cooldown, now):
+        self.failures += 1
+        self.down_until = now + cooldown * 2 ** min(self.failures - 1, 6)
+
+    def to_dict(self):
+        return {"ttft": self.ttft, "chars_per_second": self.chars_per_second,
+                "chars": self.chars, "rounds": self.rounds}
+
+    def load(self, data):
+        self.ttft = data.get("ttft")
+        self.chars_per_second = data.get("chars_per_second")
+        self.chars = data.get("chars")
+        self.rounds = data.get("rounds", 0)
+
+def _output_chars(thinking, content, fcall):
+    chars = len(thinking or "") + len(content or "")
+    if fcall is not None:
+        chars += len(fcall.get("function", {}).get("arguments") or "")
+    return chars
+
+class LLMProvider(LLMProviderBase):
+    def __init__(self, config):
+        ## create_provider hands over the configuration of every backend by name
+        self.backend_configs = config["backends"]
+        self.names = list(self.backend_configs.keys())
+        self.cheap = [name for name in config.get("cheap", []) if name in self.backend_configs]
+        self.cheap_after = set(config.get("cheap_after", ["ListFile", "SearchCode"]))
+        self.alpha = config.get("alpha", 0.3)
+        self.cooldown = config.get("cooldown", 30)
+        self.stats_file = config.get("stats_file") or os.path.join(cache_dir(), "router.json")
+        self.backends = {}
+        self.stats = {name: BackendStats(name) for name in self.names}
+        self.last_backend = None
+        self._load_stats()
+
+    def _load_stats(self):
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return
+        for name, data in saved.items():
+            if name in self.stats and isinstance(data, dict):
+                self.stats[name].load(data)
+
+    def _save_stats(self):
+        ## Best effort, routing works without it
+        try:
+            os.makedirs(os.path.dirname(self.stats_file), exist_ok=True)
+            tmp_file = f"{self.stats_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as file:
+                json.dump({name: s.to_dict() for name, s in self.stats.items()}, file)
+            os.replace(tmp_file, self.stats_file)
+        except OSError:
+            pass
+
+    def _backend(self, name):
+        if name not in self.backends:
+            config = self.backend_configs[name]
+            module = importlib.import_module(config["import"])
+            self.backends[name] = module.LLMProvider(config)
+        return self.backends[name]
+
+    def simple_round(self, dialogue):
+        """True when the last tool call only explored the project"""
+        for message in reversed(dialogue):
+            if message.get("role") == "assistant":
+                calls = message.get("tool_calls") or []
+                return bool(calls) and calls[0]["function"]["name"] in self.cheap_after
+        return False
+
+    def candidates(self, dialogue):
+        """Backends to try in order: healthy first, then by tier and expected time"""
+        tier = {name: 0 for name in self.names}
+        if self.cheap and self.simple_round(dialogue):
+            tier = {name: 0 if name in self.cheap else 1 for name in self.names}
+        elif self.cheap and len(self.cheap) < len(self.names):
+            ## Cheap backends only step in when the strong ones are down
+            tier = {name: 1 if name in self.cheap else 0 for name in self.names}
+
+        now = time.monotonic()
+        chars = [s.chars for s in self.stats.values() if s.chars is not None]
+        chars = sum(chars) / len(chars) if chars else DEFAULT_CHARS
+        order = {name: k for k, name in enumerate(self.names)}
+
+        def rank(name):
+            stats = self.stats[name]
+            return (not stats.healthy(now), tier[name], stats.expected_seconds(chars), order[name])
+        return sorted(self.names, key=rank)
+
+    def _failed(self, name, error):
+        self.stats[name].fail(self.cooldown, time.monotonic())
+        return f"{name}: {str(error)}"
+
+    def response(self, dialogue, functions=None, options=None):
+        errors = []
+        for name in self.candidates(dialogue):
+            try:
+                backend = self._backend(name)
+                start = time.monotonic()
+                result = backend.response(dialogue, functions, options)
+            except Exception as e:
+                errors.append(self._failed(name, e))
+                continue
+            seconds = time.monotonic() - start
+            ## A blocking call shows no first token, the whole call is counted as waiting
+            self.stats[name].record(seconds, _output_chars(*result), seconds, self.alpha)
+            self.last_backend = name
+            self._save_stats()
+            return result
+        raise Exception("所有模型后端调用失败：" + "; ".join(errors))
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        errors = []
+        for name in self.candidates(dialogue):
+            started = None
+            chars = 0
+
+            def begin(name=name):
+                nonlocal started
+                if started is None:
+                    started = time.monotonic()
+                    self.last_backend = name
+
+            ## A tool call streams only argument deltas, the first one starts the response:
+            ## from then on the caller holds partial output and there is no failover
+            def arguments(tool, delta):
+                begin()
+                if on_arguments is not None:
+                    on_arguments(tool, delta)
+
+            try:
+                backend = self._backend(name)
+                start = time.monotonic()
+                for thinking, token, fcall in backend.response_stream(dialogue, functions, arguments, options):
+                    begin()
+                    chars += _output_chars(thinking, token, fcall)
+                    yield thinking, token, fcall
+            except Exception as e:
+                errors.append(self._failed(name, e))
+                if started is not None:
+                    raise
+                continue
+            end = time.monotonic()
+            self.stats[name].record((started or end) - start, chars, end - start, self.alpha)
+            self._save_stats()
+            return
+        raise Exception("所有模型后端调用失败：" + "; ".join(errors))
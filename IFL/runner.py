@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+from collections import deque
+
+"""
+Shell commands run for the model
+
+Commands run in the project directory, in their own process group, with a
+CPU time limit, an output file size limit and a wall clock timeout after
+which the whole group is killed. Output is read line by line as it arrives:
+echoed to the terminal while the agent waits for the command, and kept as
+head and tail lines so a noisy build can't flood the context.
+"""
+
+## Sets the limits and execs the command. A preexec_fn would do it between fork
+## and exec, which is unsafe while other threads (daemon sessions, prefetch and
+## preload pools) are running
+LIMITS = (
+    "import os, sys, resource\n"
+    "cpu, size = int(sys.argv[1]), int(sys.argv[2])\n"
+    "resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))\n"
+    "resource.setrlimit(resource.RLIMIT_FSIZE, (size, size))\n"
+    "resource.setrlimit(resource.RLIMIT_CORE, (0, 0))\n"
+    "os.execv(sys.argv[3], sys.argv[3:])\n"
+)
+
+class Job:
+    def __init__(self, job_id, command, head_lines, tail_lines):
+        self.job_id = job_id
+        self.command = command
+        self.process = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.returncode = None
+        self.timed_out = False
+        self.head = []
+        self.tail = deque(maxlen=tail_lines)
+        self.head_lines = head_lines
+        self.lines = 0
+        self.echo = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def add_line(self, line):
+        with self.lock:
+            self.lines += 1
+            if len(self.head) < self.head_lines:
+                self.head.append(line)
+            else:
+                self.tail.append(line)
+            ## Under the lock, so echo can be switched off without a line half written
+            if self.echo is not None:
+                self.echo(line)
+
+    def stop_echo(self):
+        with self.lock:
+            self.echo = None
+
+    def running(self):
+        return not self.done.is_set()
+
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.monotonic()
+        return end - self.started
+
+    def summary(self, max_line_chars=300):
+        """Status line followed by the head and tail of the output"""
+        with self.lock:
+            head, tail, lines = list(self.head), list(self.tail), self.lines
+        if self.running():
+            status = f"running for {self.elapsed():.1f}s"
+        elif self.timed_out:
+            status = f"killed after timeout of {self.elapsed():.1f}s"
+        else:
+            status = f"exit code {self.returncode}, {self.elapsed():.1f}s"
+        parts = [f"$ {self.command}", f"[job {self.job_id}: {status}, {lines} output lines]"]
+        omitted = lines - len(head) - len(tail)
+        for line in head:
+            parts.append(line if len(line) <= max_line_chars else line[:max_line_chars] + " ...")
+        if omitted > 0:
+            parts.append(f"... {omitted} lines omitted")
+        for line in tail:
+            parts.append(line if len(line) <= max_line_chars else line[:max_line_chars] + " ...")
+        return "\n".join(parts)
+
+class CommandRunner:
+    def __init__(self, settings, root=None):
+        self.root = os.path.abspath(root or os.getcwd())
+        self.timeout = settings.get("timeout", 600)
+        self.wait_seconds = settings.get("wait_seconds", 60)
+        self.poll_seconds = settings.get("poll_seconds", 10)
+        self.cpu_seconds = settings.get("cpu_seconds", 300)
+        self.max_file_bytes = settings.get("max_file_mb", 512) * 1024 * 1024
+        self.head_lines = settings.get("head_lines", 40)
+        self.tail_lines = settings.get("tail_lines", 80)
+        self.max_line_chars = settings.get("max_line_chars", 300)
+        ## Commands run without asking only with this explicit opt-in, -y doesn't cover them
+        self.auto_approve = settings.get("auto_approve", False)
+        self.jobs = {}
+
+    def argv(self, command):
+        return [sys.executable, "-S", "-c", LIMITS, str(self.cpu_seconds), str(self.max_file_bytes),
+                "/bin/sh", "-c", command]
+
+    def start(self, command, echo=None):
+        job = Job(str(len(self.jobs) + 1), command, self.head_lines, self.tail_lines)
+        job.echo = echo
+        self.jobs[job.job_id] = job
+        job.process = subprocess.Popen(
+            self.argv(command), cwd=self.root,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            start_new_session=True)
+        threading.Thread(target=self._read, args=(job,), daemon=True).start()
+        return job
+
+    def _read(self, job):
+        timer = threading.Timer(self.timeout, self._timeout, (job,))
+        timer.daemon = True
+        timer.start()
+        try:
+            for raw in job.process.stdout:
+                job.add_line(raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+            job.returncode = job.process.wait()
+        finally:
+            timer.cancel()
+            job.process.stdout.close()
+            job.finished = time.monotonic()
+            job.done.set()
+
+    def _timeout(self, job):
+        job.timed_out = True
+        self.kill(job)
+
+    def kill(self, job):
+        if job.running():
+            try:
+                os.killpg(job.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def wait(self, job, seconds=None):
+        """Wait for the job, at most seconds (default wait_seconds). True if it finished"""
+        return job.done.wait(self.wait_seconds if seconds is None else seconds)
+
+    def summary(self, job):
+        return job.summary(self.max_line_chars)
+
+    def close(self):
+        """Kill jobs still running, they must not outlive the agent"""
+        for job in self.jobs.values():
+            self.kill(job)
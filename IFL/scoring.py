@@ -0,0 +1,206 @@
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from IFL.utils import normalize_line, calculate_similarity
+
+"""
+Bulk window scoring for fuzzy matching
+
+SequenceMatcher.ratio() is 2 * M / (len(a) + len(b)), M can't exceed the
+number of lines both sides share (multiset intersection). Lines are turned
+into integer ids and that bound is computed for all windows at once, with
+NumPy when available. Windows are then scored exactly, highest bound first,
+until no remaining bound can reach the best score, so the chosen window is
+the one the plain loop over calculate_similarity() would choose.
+
+Line forms, file indexes and exact window scores are kept in bounded LRU
+caches, a retried block mostly reuses what its first attempt computed.
+"""
+
+## Bounds and exact scores are floats computed differently, a bound may round
+## just below the exact score it bounds
+EPSILON = 1e-9
+
+## Cache sizes: distinct lines, exact window scores, indexed file contents.
+## The caches live at module level, so retries, later blocks and later rounds
+## (and every session of a daemon) reuse them. Keys are the texts themselves,
+## a changed file simply misses.
+CACHED_LINES = 65536
+CACHED_SCORES = 4096
+CACHED_FILES = 8
+
+@lru_cache(maxsize=CACHED_LINES)
+def normalized_form(line):
+    """Line as the normalized strategy compares it, None for a blank line it drops"""
+    return normalize_line(line).lower() if line.strip() else None
+
+def _forms(lines):
+    """Line forms compared by each strategy"""
+    structured = [line.rstrip() for line in lines]
+    normalized = [normalized_form(line) for line in lines]
+    return {"original": lines, "structured": structured, "normalized": normalized}
+
+class _Index:
+    """Line forms of one text with their integer ids and running blank line count"""
+    def __init__(self, lines):
+        self.forms = _forms(list(lines))
+        blank = [0]
+        for line in self.forms["normalized"]:
+            blank.append(blank[-1] + (line is None))
+        self.ids = {}
+        if np is not None:
+            self.blank = np.array(blank, dtype=np.int64)
+            ## String hashes as ids: a collision only merges two lines, which
+            ## can raise a bound but never lower it
+            for name, form in self.forms.items():
+                self.ids[name] = np.fromiter(map(hash, form), dtype=np.int64, count=len(form))
+        else:
+            self.blank = blank
+
+    def blank_counts(self, n):
+        """Number of blank lines in every window of n"""
+        blank = self.blank
+        if np is not None:
+            return blank[n:] - blank[:-n]
+        return [blank[i + n] - blank[i] for i in range(len(blank) - n)]
+
+@lru_cache(maxsize=CACHED_FILES)
+def _index(lines):
+    return _Index(lines)
+
+@lru_cache(maxsize=CACHED_SCORES)
+def window_score(search, window, strategy):
+    return calculate_similarity(search, window, strategy)
+
+def cache_info():
+    return {"lines": normalized_form.cache_info(), "scores": window_score.cache_info(),
+            "files": _index.cache_info()}
+
+def clear_caches():
+    normalized_form.cache_clear()
+    window_score.cache_clear()
+    _index.cache_clear()
+
+def _overlap_python(search, content, n):
+    """Shared line count of search and every window of n content lines, in one sliding pass"""
+    need = Counter(line for line in search if line is not None)
+    have = defaultdict(int)
+    total = 0
+    overlaps = []
+    for j, line in enumerate(content):
+        if line in need:
+            have[line] += 1
+            if have[line] <= need[line]:
+                total += 1
+        if j >= n:
+            old = content[j - n]
+            if old in need:
+                if have[old] <= need[old]:
+                    total -= 1
+                have[old] -= 1
+        if j >= n - 1:
+            overlaps.append(total)
+    return overlaps
+
+def _overlap_numpy(search, ids, n):
+    need = Counter(hash(line) for line in search if line is not None)
+    overlaps = np.zeros(len(ids) - n + 1, dtype=np.int64)
+    for k, count in need.items():
+        counts = np.concatenate(([0], np.cumsum(ids == k)))
+        overlaps += np.minimum(counts[n:] - counts[:-n], count)
+    return overlaps
+
+def upper_bounds(search_lines, content_lines, strategy='combined'):
+    """Upper bound of calculate_similarity() for every window of content_lines"""
+    n = len(search_lines)
+    search = _forms(search_lines)
+    index = _index(tuple(content_lines))
+    content = index.forms
+
+    def ratio_bound(form):
+        if np is not None:
+            shared = _overlap_numpy(search[form], index.ids[form], n)
+        else:
+            shared = _overlap_python(search[form], content[form], n)
+        if form != "normalized":
+            if np is not None:
+                return shared / n
+            return [s / n for s in shared]
+        search_count = sum(line is not None for line in search["normalized"])
+        blank = index.blank_counts(n)
+        if np is not None:
+            total = n - blank + search_count
+            ## Two empty lists have a ratio of 1.0
+            return np.where(total == 0, 1.0, 2 * shared / np.maximum(total, 1))
+        return [2 * s / (n - b + search_count) if n - b + search_count else 1.0
+                for s, b in zip(shared, blank)]
+
+    if strategy == 'combined':
+        bounds = [ratio_bound("original"), ratio_bound("normalized"), ratio_bound("structured")]
+        if np is not None:
+            return bounds[0] * 0.4 + bounds[1] * 0.4 + bounds[2] * 0.2
+        return [o * 0.4 + m * 0.4 + s * 0.2 for o, m, s in zip(*bounds)]
+    if strategy == 'normalized':
+        original = ratio_bound("original")
+        if not any(line is not None for line in search["normalized"]):
+            ## calculate_similarity compares the raw lines when a side is all blank
+            return original
+        normalized = ratio_bound("normalized")
+        blank = index.blank_counts(n)
+        if np is not None:
+            return np.where(blank == n, original, normalized)
+        return [o if b == n else m for o, m, b in zip(original, normalized, blank)]
+    if strategy == 'structured':
+        return ratio_bound("structured")
+    return ratio_bound("original")
+
+def rank_windows(search_lines, content_lines, strategy='combined'):
+    """
+    First window with the highest calculate_similarity() score, and its ties
+
+    Every window that could tie was scored exactly, so the ties come for free.
+
+    Returns:
+        tuple: (index, score, other windows with the same score), (-1, 0.0, [])
+        when no window scores above 0
+    """
+    n = len(search_lines)
+    bounds = upper_bounds(search_lines, content_lines, strategy)
+    if np is not None:
+        order = np.lexsort((np.arange(len(bounds)), -bounds)).tolist()
+        bounds = bounds.tolist()
+    else:
+        order = sorted(range(len(bounds)), key=lambda i: (-bounds[i], i))
+
+    search = tuple(search_lines)
+    best_index, best_score = -1, 0.0
+    ties = []
+    for i in order:
+        if bounds[i] + EPSILON < best_score or bounds[i] <= 0:
+            break
+        score = window_score(search, tuple(content_lines[i:i + n]), strategy)
+        if score > best_score:
+            best_index, best_score = i, score
+            ties = []
+        elif score == best_score and score > 0:
+            ties.append(i)
+    if ties:
+        ties.append(best_index)
+        ties.sort()
+        best_index = ties.pop(0)
+    return best_index, best_score, ties
+
+def best_window(search_lines, content_lines, strategy='combined'):
+    """
+    First window with the highest calculate_similarity() score
+
+    Returns:
+        tuple: (index, score), (-1, 0.0) when no window scores above 0
+    """
+    index, score, _ = rank_windows(search_lines, content_lines, strategy)
+    return index, score
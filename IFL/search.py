@@ -0,0 +1,147 @@
+import os
+import re
+
+from IFL.workspace import walk_files
+
+## Below this many files to scan, process start-up costs more than it saves
+PARALLEL_MIN_FILES = 64
+## Files bigger than this are not worth showing to the model
+MAX_FILE_BYTES = 2 * 1024 * 1024
+MAX_LINE_CHARS = 200
+MAX_HITS_PER_FILE = 5
+
+_DEFINITION = re.compile(r'^\s*(?:export\s+|pub\s+|async\s+)*'
+                         r'(?:def|class|function|fn|func|struct|enum|interface|type|impl|trait)\b')
+
+def compile_pattern(pattern, is_regex):
+    """Compile the search pattern, case-insensitive unless it has upper case letters"""
+    flags = 0 if any(c.isupper() for c in pattern) else re.IGNORECASE
+    if not is_regex:
+        pattern = re.escape(pattern)
+    return re.compile(pattern, flags)
+
+def _read_text(path):
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return None
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if b'\0' in data[:8192]:
+        return None
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+def search_text(text, regex, context):
+    """
+    Search one file content
+
+    Returns:
+        list of (line_number, is_definition, [(number, line), ...]) per hit,
+        the snippet holds the hit line with its context lines.
+    """
+    lines = text.splitlines()
+    hits = []
+    for index, line in enumerate(lines):
+        if regex.search(line) is None:
+            continue
+        start = max(0, index - context)
+        end = min(len(lines), index + context + 1)
+        snippet = [(n + 1, lines[n][:MAX_LINE_CHARS]) for n in range(start, end)]
+        hits.append((index + 1, _DEFINITION.match(line) is not None, snippet))
+    return hits
+
+def _search_files(root, paths, pattern, flags, context):
+    ## Runs in worker processes, so it only takes plain picklable arguments
+    regex = re.compile(pattern, flags)
+    results = []
+    for path in paths:
+        text = _read_text(os.path.join(root, path))
+        if text is None:
+            continue
+        hits = search_text(text, regex, context)
+        if hits:
+            results.append((path, hits))
+    return results
+
+def _rank(path, hits, regex):
+    definitions = sum(1 for _, is_def, _ in hits if is_def)
+    name_bonus = 5 if regex.search(os.path.basename(path)) else 0
+    return definitions * 3 + min(len(hits), 20) + name_bonus
+
+def format_results(results, regex, max_results):
+    if not results:
+        return "No matches found."
+
+    ranked = sorted(results, key=lambda r: (-_rank(r[0], r[1], regex), r[0]))
+    total = sum(len(hits) for _, hits in results)
+    output = []
+    shown = 0
+    for path, hits in ranked:
+        if shown >= max_results:
+            break
+        ## Definitions first, then by position
+        ordered = sorted(hits, key=lambda h: (not h[1], h[0]))
+        ordered = ordered[:min(MAX_HITS_PER_FILE, max_results - shown)]
+        ordered.sort(key=lambda h: h[0])
+        output.append(f"{path} ({len(hits)} matches)")
+        last = 0
+        for number, _, snippet in ordered:
+            for n, line in snippet:
+                if n <= last:
+                    continue
+                if last and n > last + 1:
+                    output.append("  ...")
+                sep = ":" if n == number else "-"
+                output.append(f"  {n}{sep} {line}")
+                last = n
+            shown += 1
+        output.append("")
+
+    header = f"Found {total} matches in {len(results)} files"
+    if shown < total:
+        header += f" (showing {shown})"
+    return header + ":\n" + "\n".join(output)
+
+def search_code(pattern, root=".", is_regex=False, max_results=50, context=1,
+                file_cache=None, workers=None):
+    """
+    Search file contents under root, respecting .gitignore
+
+    Cached file contents are searched in process, the rest of the tree is
+    spread over a process pool when it is large enough to pay off.
+    Raises re.error for an invalid regex.
+    """
+    regex = compile_pattern(pattern, is_regex)
+    root = os.path.abspath(root)
+    paths = walk_files(root)
+
+    cached = file_cache.snapshot() if file_cache is not None else {}
+    results = []
+    pending = []
+    for path in paths:
+        text = cached.get(os.path.join(root, path))
+        if text is None:
+            pending.append(path)
+            continue
+        hits = search_text(text, regex, context)
+        if hits:
+            results.append((path, hits))
+
+    if len(pending) < PARALLEL_MIN_FILES or workers == 1:
+        results.extend(_search_files(root, pending, regex.pattern, regex.flags, context))
+    else:
+        from IFL.utils import process_pool
+        workers = workers or min(8, os.cpu_count() or 1)
+        size = max(16, len(pending) // (workers * 4))
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        with process_pool(workers) as pool:
+            futures = [pool.submit(_search_files, root, chunk, regex.pattern, regex.flags, context)
+                       for chunk in chunks]
+            for future in futures:
+                results.extend(future.result())
+
+    return format_results(results, regex, max_results)
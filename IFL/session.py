@@ -0,0 +1,151 @@
+import os
+import re
+import gzip
+import json
+import time
+import uuid
+import zlib
+import hashlib
+
+"""
+Session transcripts
+
+Every session is one append-only gzip JSONL file `<dir>/<id>.jsonl.gz`, each
+sync appends a new gzip member, so nothing already written is rewritten.
+Records:
+    {"t": "meta", ...}                 session information, first record
+    {"t": "blob", "h": sha1, "d": text} large string, stored once per session
+    {"t": "msg", "m": message}         message, large strings replaced by {"$blob": sha1}
+    {"t": "round", "n": round}         round counter at the time of the sync
+    {"t": "metrics", ...}              counters of a finished run, e.g. prefetch hit rate
+"""
+
+_SESSION_ID = re.compile(r'^[0-9a-f]{8,32}$')
+
+class Session:
+    def __init__(self, directory, session_id, blob_min_chars=1024):
+        self.directory = directory
+        self.session_id = session_id
+        self.path = os.path.join(directory, f"{session_id}.jsonl.gz")
+        self.blob_min_chars = blob_min_chars
+        self.saved_messages = 0
+        self.saved_round = None
+        self.blobs = set()
+
+    @classmethod
+    def create(cls, directory, meta, blob_min_chars=1024):
+        os.makedirs(directory, exist_ok=True)
+        ## Keep transcripts out of the user's git status
+        ignore_file = os.path.join(directory, ".gitignore")
+        if not os.path.exists(ignore_file):
+            with open(ignore_file, 'w') as file:
+                file.write("*\n")
+
+        session = cls(directory, uuid.uuid4().hex[:8], blob_min_chars)
+        session._append([{"t": "meta", "created": time.time(), **meta}])
+        return session
+
+    @classmethod
+    def load(cls, directory, session_id, blob_min_chars=1024):
+        """Return (session, messages, last round), raise FileNotFoundError for unknown id"""
+        if not _SESSION_ID.match(session_id):
+            raise FileNotFoundError(f"Invalid session id: {session_id}")
+        session = cls(directory, session_id, blob_min_chars)
+        if not os.path.exists(session.path):
+            raise FileNotFoundError(f"Session not found: {session_id}")
+
+        blobs = {}
+        messages = []
+        last_round = 0
+        lines = []
+        torn = False
+        try:
+            with gzip.open(session.path, 'rt', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True
+                        break
+                    lines.append(line)
+                    kind = record.get("t")
+                    if kind == "blob":
+                        blobs[record["h"]] = record["d"]
+                    elif kind == "msg":
+                        messages.append(_restore(record["m"], blobs))
+                    elif kind == "round":
+                        last_round = record["n"]
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            torn = True
+        if torn:
+            ## A write torn by a crash, everything before it is still valid. The file is
+            ## rewritten without it, or syncs appended after the broken member couldn't be read
+            session._rewrite(lines)
+
+        session.blobs = set(blobs.keys())
+        session.saved_messages = len(messages)
+        session.saved_round = last_round
+        return session, messages, last_round
+
+    def _append(self, records):
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with gzip.open(self.path, 'at', encoding='utf-8') as file:
+            file.write(data)
+
+    def _rewrite(self, lines):
+        temp = self.path + ".tmp"
+        with gzip.open(temp, 'wt', encoding='utf-8') as file:
+            file.write("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+        os.replace(temp, self.path)
+
+    def _ref(self, text, records):
+        if not isinstance(text, str) or len(text) < self.blob_min_chars:
+            return text
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        if digest not in self.blobs:
+            self.blobs.add(digest)
+            records.append({"t": "blob", "h": digest, "d": text})
+        return {"$blob": digest}
+
+    def _pack(self, message, records):
+        packed = dict(message)
+        packed["content"] = self._ref(message.get("content"), records)
+        if message.get("tool_calls"):
+            packed["tool_calls"] = []
+            for call in message["tool_calls"]:
+                call = dict(call)
+                function = dict(call.get("function") or {})
+                function["arguments"] = self._ref(function.get("arguments"), records)
+                call["function"] = function
+                packed["tool_calls"].append(call)
+        return packed
+
+    def sync(self, allMessages, current_round):
+        """Append messages added since the last sync, together with the round counter"""
+        if self.saved_messages >= len(allMessages) and self.saved_round == current_round:
+            return
+        records = []
+        for message in allMessages[self.saved_messages:]:
+            packed = self._pack(message, records)
+            records.append({"t": "msg", "m": packed})
+        records.append({"t": "round", "n": current_round})
+        self._append(records)
+        self.saved_messages = len(allMessages)
+        self.saved_round = current_round
+
+    def record(self, kind, data):
+        """Append a record the loader skips, such as the metrics of a run"""
+        self._append([{"t": kind, "time": time.time(), **data}])
+
+def _restore(message, blobs):
+    def value(v):
+        if isinstance(v, dict) and "$blob" in v:
+            return blobs[v["$blob"]]
+        return v
+
+    message["content"] = value(message.get("content"))
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        if "arguments" in function:
+            function["arguments"] = value(function["arguments"])
+    return message
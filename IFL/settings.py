@@ -0,0 +1,57 @@
+import os
+import sys
+import marshal
+import hashlib
+
+## Bump when the cached layout changes
+CACHE_VERSION = 1
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ifl")
+
+def _cache_file(path, directory):
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, f"config-{digest}.marshal")
+
+def parse_yaml(text):
+    ## yaml is only imported when the cache misses, prefer the libyaml loader
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(text, Loader=loader)
+
+def load_config(path, directory=None):
+    """
+    Load config.yaml, reusing a marshalled copy while the file is unchanged
+
+    The cache is keyed on the absolute path, mtime, size and Python version,
+    so an edited config or a different interpreter always re-parses.
+    """
+    path = os.path.abspath(path)
+    directory = directory or cache_dir()
+    stat = os.stat(path)
+    key = (CACHE_VERSION, sys.version, path, stat.st_mtime_ns, stat.st_size)
+    cache_file = _cache_file(path, directory)
+
+    try:
+        with open(cache_file, 'rb') as file:
+            cached_key, config = marshal.load(file)
+        if cached_key == key:
+            return config
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(path, "r", encoding='utf-8') as file:
+        config = parse_yaml(file.read())
+
+    ## Best effort, a read-only cache folder only costs the re-parse
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as file:
+            marshal.dump((key, config), file)
+        os.replace(tmp_file, cache_file)
+    except (OSError, ValueError):
+        pass
+
+    return config
@@ -0,0 +1,250 @@
+import os
+import re
+import uuid
+import shutil
+
+"""
+Streaming tool call arguments to disk
+
+ArgumentStream decodes the JSON arguments of a tool call while their deltas
+arrive. The string value of one top-level key is handed to a sink piece by
+piece, other top-level string values are collected. StagedFile uses it to
+write WriteFile's file_content into a temporary file while the model is
+still generating it, confirming the write then only moves that file.
+"""
+
+_SPECIAL = re.compile(r'[\\"]')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+## Roles of the string being read
+KEY, TARGET, FIELD, OTHER = range(4)
+
+class ArgumentStream:
+    def __init__(self, key, sink):
+        self.key = key
+        self.sink = sink
+        self.fields = {}
+        self.depth = 0
+        self.expect_key = False
+        self.current_key = None
+        self.after_colon = False
+        self.role = None
+        self.buffer = []
+        self.escape = ""
+        self.high = None
+        self.found = False
+        self.error = None
+
+    @property
+    def complete(self):
+        """The target value was read to its end and the arguments object is closed"""
+        return self.found and self.depth == 0 and self.error is None
+
+    def feed(self, text):
+        if self.error is not None:
+            return
+        try:
+            i, n = 0, len(text)
+            while i < n:
+                if self.role is not None:
+                    i = self._string(text, i)
+                    continue
+                char = text[i]
+                i += 1
+                self._structure(char)
+        except ValueError as e:
+            self.error = str(e)
+
+    def _structure(self, char):
+        if char == '"':
+            if self.depth == 1 and self.expect_key:
+                self.role = KEY
+            elif self.depth == 1 and self.after_colon:
+                self.role = TARGET if self.current_key == self.key else FIELD
+            else:
+                self.role = OTHER
+            self.buffer = []
+        elif char in '{[':
+            self.depth += 1
+            self.expect_key = self.depth == 1 and char == '{'
+            self.after_colon = False
+        elif char in '}]':
+            self.depth -= 1
+            if self.depth < 0:
+                raise ValueError("unbalanced arguments")
+        elif self.depth == 1:
+            if char == ',':
+                self.expect_key = True
+                self.current_key = None
+                self.after_colon = False
+            elif char == ':':
+                self.after_colon = True
+            elif not char.isspace():
+                ## A number, true, false or null value
+                self.after_colon = False
+
+    def _string(self, text, i):
+        n = len(text)
+        while i < n:
+            if self.escape:
+                self.escape += text[i]
+                i += 1
+                if self.escape[1] == 'u':
+                    if len(self.escape) < 6:
+                        continue
+                    code = int(self.escape[2:], 16)
+                    self.escape = ""
+                    self._code_point(code)
+                else:
+                    char = self.escape[1]
+                    self.escape = ""
+                    if char not in _ESCAPES:
+                        raise ValueError(f"invalid escape \\{char}")
+                    self._emit(_ESCAPES[char])
+                continue
+            match = _SPECIAL.search(text, i)
+            if match is None:
+                self._emit(text[i:])
+                return n
+            j = match.start()
+            if j > i:
+                self._emit(text[i:j])
+            if text[j] == '"':
+                self._end_string()
+                return j + 1
+            self.escape = "\\"
+            i = j + 1
+        return i
+
+    def _code_point(self, code):
+        if 0xD800 <= code < 0xDC00:
+            self._emit("")
+            self.high = code
+        elif 0xDC00 <= code < 0xE000 and self.high is not None:
+            code = 0x10000 + ((self.high - 0xD800) << 10) + (code - 0xDC00)
+            self.high = None
+            self._emit(chr(code))
+        else:
+            self._emit(chr(code) if not 0xDC00 <= code < 0xE000 else '\ufffd')
+
+    def _emit(self, text):
+        if self.high is not None:
+            ## A high surrogate without its low half
+            self.high = None
+            text = '\ufffd' + text
+        if not text:
+            return
+        if self.role == TARGET:
+            self.sink(text)
+        elif self.role != OTHER:
+            self.buffer.append(text)
+
+    def _end_string(self):
+        self._emit("")
+        role, self.role = self.role, None
+        if role == KEY:
+            self.current_key = "".join(self.buffer)
+            self.expect_key = False
+        elif role == TARGET:
+            self.found = True
+            self.after_colon = False
+        elif role == FIELD:
+            self.fields[self.current_key] = "".join(self.buffer)
+            self.after_colon = False
+        self.buffer = []
+
+class StagedFile:
+    """Temporary file receiving one streamed string argument"""
+    def __init__(self, directory, key="file_content"):
+        os.makedirs(directory, exist_ok=True)
+        ## Keep staged files out of the user's git status
+        ignore_file = os.path.join(directory, ".gitignore")
+        if not os.path.exists(ignore_file):
+            with open(ignore_file, 'w') as file:
+                file.write("*\n")
+        ## Created like any new file, so a committed file gets the usual permissions
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.tmp")
+        self.file = open(self.path, 'x', encoding='utf-8')
+        self.stream = ArgumentStream(key, self.file.write)
+
+    @property
+    def complete(self):
+        return self.stream.complete
+
+    @property
+    def fields(self):
+        return self.stream.fields
+
+    def feed(self, delta):
+        self.stream.feed(delta)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def read(self):
+        self.close()
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def commit(self, target):
+        """Move the staged content to target, see replace_file"""
+        self.close()
+        replace_file(self.path, target)
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+def _copy_xattrs(source, target):
+    if not hasattr(os, "listxattr"):
+        return
+    for name in os.listxattr(source, follow_symlinks=False):
+        try:
+            os.setxattr(target, name, os.getxattr(source, name))
+        except OSError:
+            ## e.g. security.* attributes only root may set
+            pass
+
+def replace_file(source, target):
+    """
+    Give target the content of source, consuming source
+
+    A symlink is followed, the file it points to gets the content. A file
+    with several hard links, or whose owner the new file cannot get, is
+    rewritten in place so its links, owner and attributes stay. Any other
+    file is replaced atomically by a rename, after source took over its
+    mode, owner and extended attributes. Returns the path written.
+    """
+    real = os.path.realpath(target)
+    directory = os.path.dirname(real)
+    if os.stat(source).st_dev != os.stat(directory).st_dev:
+        ## A rename only works within one file system, copy next to the target first
+        moved = os.path.join(directory, f".{os.path.basename(real)}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(source, moved)
+        os.unlink(source)
+        source = moved
+    try:
+        if os.path.exists(real):
+            info = os.stat(real)
+            in_place = info.st_nlink > 1
+            if not in_place:
+                shutil.copymode(real, source)
+                _copy_xattrs(real, source)
+                own = os.stat(source)
+                if (own.st_uid, own.st_gid) != (info.st_uid, info.st_gid):
+                    try:
+                        os.chown(source, info.st_uid, info.st_gid)
+                    except OSError:
+                        in_place = True
+            if in_place:
+                shutil.copyfile(source, real)
+                os.unlink(source)
+                return real
+        os.replace(source, real)
+    except BaseException:
+        if os.path.exists(source):
+            os.unlink(source)
+        raise
+    return real
@@ -1,14 +1,19 @@
+import re
 import sys
 from difflib import SequenceMatcher
 import html
 
-from prompt_toolkit import prompt, print_formatted_text, HTML
-from prompt_toolkit.styles import Style
-from prompt_toolkit.shortcuts import choice
 import shutil
-import wcwidth
 
+from IFL.render import text_width, framed_print
+from IFL.patch import content_hash
+from IFL.diffview import line_opcodes, diff_lines
+
+## prompt_toolkit is heavy to import, it is only loaded when we really prompt
 def content_from_input(info):
+    from prompt_toolkit import prompt, print_formatted_text, HTML
+    from prompt_toolkit.styles import Style
+
     style = Style.from_dict({
         "frame.border": "#884444",
     })
@@ -21,6 +26,10 @@ def content_from_input(info):
             return ""
 
 def confirm_from_input(info, byExit = True):
+    from prompt_toolkit import HTML
+    from prompt_toolkit.styles import Style
+    from prompt_toolkit.shortcuts import choice
+
     style = Style.from_dict({
         "frame.border": "#884444",
     })
@@ -44,12 +53,7 @@ def confirm_from_input(info, byExit = True):
     return result
 
 def printed_length(s):
-    length = 0
-    for char in s:
-        width = wcwidth.wcwidth(char)
-        if width > 0:  # Exclude zero-width characters
-            length += width
-    return length
+    return text_width(s)
 
 def lined_print(info ):
     terminal_width = shutil.get_terminal_size().columns
@@ -59,76 +63,19 @@ def lined_print(info ):
     # Adjust for odd terminal width to ensure full width line
     if printed_length(line) < terminal_width:
         line += '─'
-    print("\n\n")
-
-    print(f"\033[90m{line}\033[0m")
-
-def framed_print(title, content, style="default"):
-    """Print content in a styled frame, wrapping long lines instead of truncating"""
-    lines = content.split('\n')
-    frame_width = shutil.get_terminal_size().columns
-
-    # Define ANSI color codes
-    colors = {
-        "default": {"frame": "\033[90m", "title": "\033[1m", "reset": "\033[0m"},
-        "info": {"frame": "\033[94m", "title": "\033[1;94m", "reset": "\033[0m"},
-        "warning": {"frame": "\033[93m", "title": "\033[1;93m", "reset": "\033[0m"},
-        "error": {"frame": "\033[91m", "title": "\033[1;91m", "reset": "\033[0m"},
-        "success": {"frame": "\033[92m", "title": "\033[1;92m", "reset": "\033[0m"}
-    }
-
-    color = colors.get(style, colors["default"])
+    sys.stdout.write(f"\n\n\n\033[90m{line}\033[0m\n")
 
-    # Draw top border with title
-    top_border_with_title = f"┌───── {title} "
-    top_border_with_title += "─" * (frame_width - printed_length(top_border_with_title) - 1)
-    top_border_with_title += "┐"
+def process_pool(workers, initializer=None, initargs=()):
+    """Process pool that is safe to start from a threaded process (e.g. the daemon)"""
+    import threading
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
 
-    # Print frame
-    print(f"{color['frame']}{''.join(top_border_with_title)}{color['reset']}")
-
-    # Print content lines with wrapping
-    display_width = frame_width - 4  # 2 spaces on each side
-
-    for line in lines:
-        if line.strip() == "":
-            # Empty line - just print spaces
-            print(f"{color['frame']}│ {' ' * display_width} │{color['reset']}")
-            continue
-
-        # Wrap long lines
-        current_pos = 0
-        while current_pos < len(line):
-            wrapped_line = ""
-            current_width = 0
-            start_pos = current_pos
-
-            # Build wrapped line character by character
-            while current_pos < len(line):
-                char = line[current_pos]
-                char_width = wcwidth.wcwidth(char)
-
-                if current_width + char_width <= display_width:
-                    wrapped_line += char
-                    current_width += char_width
-                    current_pos += 1
-                else:
-                    break
-
-            # If we didn't add any characters (shouldn't happen), advance by 1
-            if current_pos == start_pos:
-                wrapped_line = line[current_pos]
-                current_pos += 1
-
-            # Pad with spaces to fill the line
-            while current_width < display_width:
-                wrapped_line += " "
-                current_width += 1
-
-            print(f"{color['frame']}│ {wrapped_line} │{color['reset']}")
-
-    # Print bottom border
-    print(f"{color['frame']}└" + "─" * (frame_width - 2) + f"┘{color['reset']}")
+    context = None
+    if threading.active_count() > 1 and "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=initializer, initargs=initargs)
 
 def readfile_with_linenumber(file_path, with_number=True):
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -143,6 +90,51 @@ def readfile_with_linenumber(file_path, with_number=True):
 
     return ''.join(result)
 
+def file_view(file_name, text, with_number=True):
+    """ReadFile result: a header with line count and content hash, then the content"""
+    lines = text.splitlines(keepends=True)
+    header = f"[file: {file_name} | lines: {len(lines)} | hash: {content_hash(text)}]\n"
+    if not with_number:
+        return header + text
+    return header + ''.join(f"{i}\t{line}" for i, line in enumerate(lines, 1))
+
+## Models sometimes copy the ReadFile line number prefixes into SEARCH blocks
+_NUMBER_PREFIX = re.compile(r'^(\d+)\t')
+
+def has_line_numbers(lines):
+    """Lines numbered the way file_view numbers them: every line, consecutive numbers"""
+    numbers = []
+    for line in lines:
+        match = _NUMBER_PREFIX.match(line)
+        if match is None:
+            return False
+        numbers.append(int(match.group(1)))
+    return bool(numbers) and numbers == list(range(numbers[0], numbers[0] + len(numbers)))
+
+def strip_line_numbers(lines):
+    return [_NUMBER_PREFIX.sub('', line, count=1) for line in lines]
+
+def contains_lines(lines, part):
+    """True if part occurs in lines as consecutive lines"""
+    n = len(part)
+    return any(lines[i:i + n] == part for i in range(len(lines) - n + 1) if lines[i] == part[0])
+
+def strip_copied_numbers(search_lines, replace_lines, content_lines):
+    """
+    Drop line numbers copied from a ReadFile view into a block
+
+    Only when the SEARCH lines are numbered like file_view and don't occur
+    verbatim in the file, lines of TSV or data files starting with digits
+    and a tab stay as they are. REPLACE lines lose their numbers when every
+    non blank one has a number.
+    """
+    if not has_line_numbers(search_lines) or contains_lines(content_lines, search_lines):
+        return search_lines, replace_lines
+    non_empty = [line for line in replace_lines if line.strip()]
+    if non_empty and all(_NUMBER_PREFIX.match(line) for line in non_empty):
+        replace_lines = strip_line_numbers(replace_lines)
+    return strip_line_numbers(search_lines), replace_lines
+
 def normalize_line(line):
     """Normalize single line text, remove extra spaces and unify indentation"""
     # Remove leading and trailing whitespace
@@ -235,25 +227,22 @@ def find_similar_lines(search_lines, content_lines, threshold=0.90, strategy='co
         'details': {}
     }
 
-    # Iterate through all possible match positions
-    for i in range(len(content_lines) - len(search_lines) + 1):
-        chunk = content_lines[i:i + len(search_lines)]
-
-        # Calculate similarity
-        similarity = calculate_similarity(search_lines, chunk, strategy)
-
-        # If a better match is found
-        if similarity > best_match['score']:
-            best_match.update({
-                'index': i,
-                'lines': chunk,
-                'score': similarity,
-                'details': {
-                    'chunk_start': i,
-                    'chunk_end': i + len(search_lines) - 1,
-                    'line_count': len(search_lines)
-                }
-            })
+    ## Windows are scored in bulk, only the ones that can still win are compared exactly
+    from IFL.scoring import best_window, rank_windows
+
+    i, similarity, ties = rank_windows(search_lines, content_lines, strategy)
+    if i != -1:
+        best_match.update({
+            'index': i,
+            'lines': content_lines[i:i + len(search_lines)],
+            'score': similarity,
+            'details': {
+                'chunk_start': i,
+                'chunk_end': i + len(search_lines) - 1,
+                'line_count': len(search_lines),
+                'ties': ties
+            }
+        })
 
     # Check if threshold requirement is met
     if best_match['score'] >= threshold:
@@ -272,22 +261,19 @@ def find_similar_lines(search_lines, content_lines, threshold=0.90, strategy='co
                 'strategy_used': fallback_strategy
             }
 
-            for i in range(len(content_lines) - len(search_lines) + 1):
-                chunk = content_lines[i:i + len(search_lines)]
-                similarity = calculate_similarity(search_lines, chunk, fallback_strategy)
-
-                if similarity > fallback_match['score']:
-                    fallback_match.update({
-                        'index': i,
-                        'lines': chunk,
-                        'score': similarity,
-                        'details': {
-                            'chunk_start': i,
-                            'chunk_end': i + len(search_lines) - 1,
-                            'line_count': len(search_lines),
-                            'fallback_strategy': True
-                        }
-                    })
+            i, similarity = best_window(search_lines, content_lines, fallback_strategy)
+            if i != -1:
+                fallback_match.update({
+                    'index': i,
+                    'lines': content_lines[i:i + len(search_lines)],
+                    'score': similarity,
+                    'details': {
+                        'chunk_start': i,
+                        'chunk_end': i + len(search_lines) - 1,
+                        'line_count': len(search_lines),
+                        'fallback_strategy': True
+                    }
+                })
 
             if fallback_match['score'] >= threshold * 0.8:  # Fallback strategy uses slightly lower threshold
                 return fallback_match['index'], fallback_match['lines'], fallback_match['score'], fallback_match['details']
@@ -297,6 +283,7 @@ def find_similar_lines(search_lines, content_lines, threshold=0.90, strategy='co
             "error": f"Cannot find matching context in original file. Best score: {best_match['score']:.3f}",
             "best_match_index": best_match['index'],
             "best_score": best_match['score'],
+            "ties": ties,
             "strategy_used": strategy,
             "threshold": threshold
         }
@@ -307,36 +294,98 @@ def find_next(lines, start_index, target):
             return i
     return -1
 
-def do_search_replace(original, blocks):
-    original_lines = original.splitlines(keepends=True)
+def parse_blocks(blocks):
+    """
+    Split SEARCH/REPLACE text into blocks
+
+    Returns:
+        tuple: (list of (search_lines, replace_lines), None) or (parsed so far, error message)
+    """
     blocks_lines = blocks.splitlines(keepends=True)
+    parsed = []
 
     i = 0
     while i < len(blocks_lines):
         search_start = find_next(blocks_lines, i, "<<<<<<< SEARCH")
         if search_start == -1:
-            return False, "Malformed block: missing <<<<<<< SEARCH"
+            return parsed, "Malformed block: missing <<<<<<< SEARCH"
 
         # Find the starting position of the SEARCH block
         search_start = search_start + 1
         search_end = find_next(blocks_lines, search_start, "=======")
         if search_end == -1:
-            return False, "Malformed block: missing ======="
+            return parsed, "Malformed block: missing ======="
         if search_end == search_start:
-            return False, "Malformed block: empty SEARCH section"
+            return parsed, "Malformed block: empty SEARCH section"
         replace_end = find_next(blocks_lines, search_end + 1, ">>>>>>> REPLACE")
         if replace_end == -1:
-            return False, "Malformed block: missing >>>>>>> REPLACE"
+            return parsed, "Malformed block: missing >>>>>>> REPLACE"
 
         search_lines = blocks_lines[search_start:search_end]
         replace_lines = blocks_lines[search_end + 1:replace_end]
+        parsed.append((search_lines, replace_lines))
+        i = replace_end + 1
+
+    return parsed, None
 
+## Diff lines shown for the closest region of a failed block
+REPORT_DIFF_LINES = 24
+
+def match_report(search_lines, content_lines, details, number, shifted=False):
+    """
+    Explain a failed block from what the matcher computed: the closest
+    region, how the block differs from it and other regions scoring the same
+    """
+    start = details["best_match_index"]
+    end = start + len(search_lines)
+    report = [f"Block {number}: closest region is lines {start + 1}-{end}"
+              + (", numbered after the blocks before it were applied" if shifted else "")]
+
+    search = [line.rstrip('\r\n') for line in search_lines]
+    region = [line.rstrip('\r\n') for line in content_lines[start:end]]
+    diff = [line for line in diff_lines(search, region, line_opcodes(search, region), context=1)
+            if not line.startswith("@@")]
+    if len(diff) > REPORT_DIFF_LINES:
+        diff = diff[:REPORT_DIFF_LINES] + [f"... {len(diff) - REPORT_DIFF_LINES} more diff lines"]
+    report.append("Differences ('-' your SEARCH lines, '+' the file):")
+    report.extend(diff)
+
+    ## Windows shifted by a line or two over the same region are not ambiguity
+    ties = [i for i in details.get("ties") or [] if i >= end or i + len(search_lines) <= start]
+    if ties:
+        regions = ", ".join(f"{i + 1}-{i + len(search_lines)}" for i in ties[:5])
+        others = "1 other region matches" if len(ties) == 1 else f"{len(ties)} other regions match"
+        report.append(f"Warning: {others} equally well (lines {regions}), "
+                      "include more surrounding lines to make the block unique")
+    if shifted:
+        report.append("Copy the SEARCH lines exactly from the file.")
+    else:
+        report.append("Copy the SEARCH lines exactly from the file, or use ReplaceLines with these line numbers.")
+    return "\n".join(report)
+
+def do_search_replace(original, blocks):
+    original_lines = original.splitlines(keepends=True)
+    parsed, parse_error = parse_blocks(blocks)
+
+    ## Independent blocks of a big edit are matched concurrently, see IFL.matcher
+    if parse_error is None:
+        from IFL.matcher import match_blocks_parallel
+        result = match_blocks_parallel(original_lines, parsed)
+        if result is not None:
+            return True, ''.join(result)
+
+    ## Serial matching, each block against the result of the previous ones
+    shifted = False
+    for number, (search_lines, replace_lines) in enumerate(parsed, 1):
+        search_lines, replace_lines = strip_copied_numbers(search_lines, replace_lines, original_lines)
         # Find the most similar lines in original
         match_index, matched_lines, similarity_score, details = find_similar_lines(
             search_lines, original_lines, strategy='combined'
         )
         if match_index == -1:
             error_msg = details.get("error", "Cannot find matching context in original file")
+            if details.get("best_match_index", -1) != -1:
+                error_msg += "\n" + match_report(search_lines, original_lines, details, number, shifted)
             return False, error_msg  # Return error message
 
         # Perform replacement, skip processed blocks
@@ -345,9 +394,12 @@ def do_search_replace(original, blocks):
             replace_lines +
             original_lines[match_index + len(search_lines):]
         )
-        i = replace_end + 1
+        shifted = shifted or len(replace_lines) != len(search_lines)
 
+    if parse_error is not None:
+        return False, parse_error
     return True, ''.join(original_lines)
+
 def apply_patch(file_path, blocks):
     ## Apply search_replace to the file specified by file_path
     with open(file_path, 'r', encoding='utf-8') as file:
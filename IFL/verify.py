@@ -0,0 +1,117 @@
+import sys
+import shlex
+import fnmatch
+import subprocess
+from collections import OrderedDict
+
+from IFL.patch import content_hash
+from IFL.render import truncate_lines
+
+"""
+Checks run on changed files after an accepted edit
+
+Every check has a file pattern and a command, `{files}` in the command is
+replaced by the changed files matching the pattern and `{python}` by the
+running interpreter. Results are cached by command and file contents, an
+unchanged file is not checked twice.
+"""
+
+## Cached check results, keyed by (command, ((file, content hash), ...))
+MAX_CACHED = 256
+
+class Verifier:
+    def __init__(self, settings):
+        self.enabled = settings.get("enabled", True)
+        self.timeout = settings.get("timeout", 30)
+        self.max_output_lines = settings.get("max_output_lines", 40)
+        self.checks = [(check["pattern"], check["command"]) for check in settings.get("checks") or []]
+        self.results = OrderedDict()
+        self.runs = 0
+
+    def _run(self, command, files):
+        args = []
+        for token in shlex.split(command):
+            if token == "{files}":
+                args.extend(files)
+            else:
+                args.append(token.replace("{python}", sys.executable))
+        self.runs += 1
+        try:
+            done = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  stdin=subprocess.DEVNULL, timeout=self.timeout,
+                                  text=True, errors='replace')
+        except subprocess.TimeoutExpired:
+            return False, f"Timed out after {self.timeout}s"
+        except OSError as e:
+            return False, f"Cannot run check: {str(e)}"
+        output = done.stdout.rstrip()
+        return done.returncode == 0, output
+
+    def check(self, command, files, contents):
+        """Run one check on files, or reuse the result for the same contents"""
+        key = (command, tuple((f, content_hash(contents[f])) for f in files))
+        result = self.results.get(key)
+        if result is None:
+            ## Files that passed alone before don't need to run again
+            passed = [(command, ((f, h),)) for f, h in key[1]]
+            if all(self.results.get(k, (False,))[0] for k in passed):
+                result = (True, "")
+            else:
+                result = self._run(command, files)
+                if result[0]:
+                    for k in passed:
+                        self.results[k] = result
+            self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > MAX_CACHED:
+            self.results.popitem(last=False)
+        return result
+
+    def verify(self, contents):
+        """
+        Check changed files
+
+        Args:
+            contents: dict of file name to its new content
+
+        Returns:
+            tuple: (passed, report), report is empty when nothing was checked
+        """
+        if not self.enabled or not self.checks:
+            return True, ""
+        passed = True
+        report = []
+        for pattern, command in self.checks:
+            files = [f for f in contents if fnmatch.fnmatch(f, pattern) or fnmatch.fnmatch(f.rsplit('/', 1)[-1], pattern)]
+            if not files:
+                continue
+            ok, output = self.check(command, files, contents)
+            shown = command.replace("{python}", "python")
+            if ok:
+                report.append(f"Check passed: {shown.replace('{files}', '').strip()}")
+                continue
+            passed = False
+            shown = shown.replace("{files}", " ".join(shlex.quote(f) for f in files))
+            lines = truncate_lines(output.splitlines(), self.max_output_lines)
+            report.append(f"Check failed: {shown}\n" + "\n".join(lines))
+        return passed, "\n".join(report)
+
+def compile_files(files):
+    """Syntax check of Python files without writing .pyc files into the project"""
+    failed = 0
+    for file_name in files:
+        try:
+            with open(file_name, 'rb') as file:
+                compile(file.read(), file_name, 'exec', dont_inherit=True)
+        except (SyntaxError, ValueError, OSError) as e:
+            failed += 1
+            if isinstance(e, SyntaxError):
+                print(f"{file_name}:{e.lineno}:{e.offset}: {e.msg}")
+                if e.text:
+                    print("    " + e.text.rstrip())
+            else:
+                print(f"{file_name}: {str(e)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(compile_files(sys.argv[1:]))
@@ -0,0 +1,290 @@
+import os
+import re
+import subprocess
+
+def _translate(pattern):
+    """Translate a gitignore glob into a regex matching a '/' separated path"""
+    i, n = 0, len(pattern)
+    result = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 3] == '**/':
+                result.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                result.append('.*')
+                i += 2
+                continue
+            result.append('[^/]*')
+        elif c == '?':
+            result.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                result.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                result.append(f'[{body}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(c))
+        i += 1
+    return ''.join(result)
+
+class GitIgnore:
+    """Rules of one .gitignore file, relative to the directory holding it"""
+    def __init__(self, base, lines):
+        ## Each rule: (regex, negated, dir_only)
+        self.base = base
+        self.rules = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if line == "" or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if line == "":
+                continue
+            if '/' in line:
+                ## Anchored to the .gitignore directory
+                regex = _translate(line.lstrip('/'))
+            else:
+                regex = '(?:.*/)?' + _translate(line)
+            self.rules.append((re.compile(regex + '$'), negated, dir_only))
+
+    @classmethod
+    def load(cls, base, directory):
+        path = os.path.join(directory, ".gitignore")
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                return cls(base, file.readlines())
+        except OSError:
+            return None
+
+    def match(self, rel_path, is_dir):
+        """Return True/False when a rule decides, None when no rule applies"""
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        decision = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                decision = not negated
+        return decision
+
+def is_ignored(rel_path, is_dir, ignores):
+    decision = False
+    for ignore in ignores:
+        result = ignore.match(rel_path, is_dir)
+        if result is not None:
+            decision = result
+    return decision
+
+def walk_files(root="."):
+    """
+    List files under root as '/' separated relative paths, respecting .gitignore
+
+    Every .gitignore met on the way down is honoured for its own subtree, the
+    .git folder is always skipped. Returned paths are sorted.
+    """
+    root = os.path.abspath(root)
+    files = []
+    ## Stack of (directory, relative path, active ignore rules)
+    stack = [(root, "", [])]
+    while stack:
+        directory, rel_dir, ignores = stack.pop()
+        local = GitIgnore.load(rel_dir, directory)
+        if local is not None:
+            ignores = ignores + [local]
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name == ".git":
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_ignored(rel_path, is_dir, ignores):
+                continue
+            if is_dir:
+                stack.append((entry.path, rel_path, ignores))
+            elif entry.is_file():
+                files.append(rel_path)
+    files.sort()
+    return files
+
+def _has_magic(pattern):
+    return any(c in pattern for c in '*?[')
+
+def resolve_inputs(patterns, root="."):
+    """
+    Files named by patterns: paths, directories or globs, as '/' separated paths relative to root
+
+    Directories and globs are resolved against a single walk of root, which
+    respects .gitignore, a file named by its path is taken even when ignored.
+    Globs match whole paths, `**` spans directories; a pattern naming an
+    existing file or directory is taken as a path. Duplicates are dropped,
+    files keep the order of the patterns naming them.
+    Raises ValueError for a pattern outside root or matching nothing.
+    """
+    root = os.path.abspath(root)
+    walked = None
+    files = {}
+    for pattern in patterns:
+        path = os.path.abspath(os.path.join(root, pattern))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"File must be within current directory: {pattern}")
+        rel_path = os.path.relpath(path, root).replace(os.sep, '/')
+        ## An existing path wins over glob syntax, e.g. pages/[id].tsx
+        if os.path.isfile(path):
+            files.setdefault(rel_path, None)
+            continue
+        is_glob = not os.path.isdir(path) and _has_magic(pattern)
+        if not is_glob and not os.path.isdir(path):
+            raise ValueError(f"Cannot open file: {pattern}")
+        if walked is None:
+            walked = walk_files(root)
+        if is_glob:
+            regex = re.compile(_translate(rel_path) + '$')
+            matched = [f for f in walked if regex.match(f)]
+        elif rel_path == '.':
+            matched = walked
+        else:
+            matched = [f for f in walked if f.startswith(rel_path + '/')]
+        if not matched:
+            raise ValueError(f"No files match: {pattern}")
+        for f in matched:
+            files.setdefault(f, None)
+    return list(files)
+
+def _git(args, root):
+    """Output of a git command, None when it fails or git is missing"""
+    try:
+        done = subprocess.run(["git", *args], cwd=root, capture_output=True)
+    except OSError:
+        return None
+    if done.returncode != 0:
+        return None
+    return done.stdout.decode('utf-8', errors='replace')
+
+def git_files(root="."):
+    """
+    Files git knows under root: tracked ones from the index and untracked ones
+    not ignored, as sorted '/' separated paths relative to root. None outside
+    a git checkout.
+    """
+    output = _git(["ls-files", "-z", "--cached", "--others", "--exclude-standard"], root)
+    if output is None:
+        return None
+    return sorted(set(path for path in output.split('\0') if path))
+
+def git_changes(root="."):
+    """
+    Changed files under root from git status, as [(status, path)] with the two
+    letter porcelain status and paths relative to root. None outside a git checkout.
+    """
+    prefix = _git(["rev-parse", "--show-prefix"], root)
+    output = _git(["status", "--porcelain=v1", "-z", "--untracked-files=all", "--", "."], root)
+    if prefix is None or output is None:
+        return None
+    ## Porcelain paths are relative to the top of the checkout
+    prefix = prefix.strip()
+    entries = output.split('\0')
+    changes = []
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+        status, path = entry[:2], entry[3:]
+        if status[0] in 'RC':
+            ## The original path of a rename or copy follows
+            i += 1
+        if path.startswith(prefix):
+            changes.append((status, path[len(prefix):]))
+    return changes
+
+def git_diff(root="."):
+    """Diff of the work tree under root against HEAD, or against the index before the first commit"""
+    diff = _git(["diff", "--no-color", "HEAD", "--", "."], root)
+    if diff is None:
+        diff = _git(["diff", "--no-color", "--", "."], root)
+    return diff or ""
+
+def format_tree(paths, marks=None):
+    """Render '/' separated file paths like the tree command, marks: {path: label}"""
+    marks = marks or {}
+    root = {}
+    for path in paths:
+        node = root
+        parts = path.split('/')
+        for part in parts[:-1]:
+            node = node.setdefault(part + '/', {})
+        node[parts[-1]] = None
+
+    lines = ["."]
+    directories = 0
+    ## Stack of (node, indent, relative path of node, names left to render)
+    stack = [(root, "", "", sorted(root, key=lambda name: name.rstrip('/')))]
+    while stack:
+        node, indent, rel_dir, names = stack[-1]
+        if not names:
+            stack.pop()
+            continue
+        name = names.pop(0)
+        last = not names
+        child = node[name]
+        branch = "└── " if last else "├── "
+        if child is None:
+            mark = marks.get(rel_dir + name)
+            lines.append(indent + branch + name + (f"  [{mark}]" if mark else ""))
+            continue
+        directories += 1
+        lines.append(indent + branch + name.rstrip('/'))
+        stack.append((child, indent + ("    " if last else "│   "), rel_dir + name,
+                      sorted(child, key=lambda name: name.rstrip('/'))))
+    lines.append("")
+    lines.append(f"{directories} directories, {len(paths)} files")
+    return "\n".join(lines) + "\n"
+
+def list_files(root="."):
+    """
+    Project listing for ListFile
+
+    In a git checkout the file set comes from the index, changed files are
+    marked with their git status and deleted ones are still shown. Elsewhere
+    `tree --gitignore` is used, or a walk when tree isn't installed.
+    """
+    files = git_files(root)
+    if files is not None:
+        changes = git_changes(root) or []
+        marks = {path: status.strip() for status, path in changes}
+        text = format_tree(sorted(set(files) | set(marks)), marks)
+        if changes:
+            text += f"{len(changes)} changed files, marked with their git status\n"
+        return text
+    try:
+        result = subprocess.run(['tree', '--gitignore'], cwd=root, capture_output=True, text=True)
+        if result.returncode == 0:
+            return result.stdout
+    except OSError:
+        pass
+    return format_tree(walk_files(root))
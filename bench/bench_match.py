@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from IFL import scoring
+from IFL.scoring import best_window
+from IFL.utils import calculate_similarity
+
+"""
+Fuzzy matching of one SEARCH block against a big file:
+plain loop over calculate_similarity vs bulk scoring (NumPy and pure Python),
+each followed by a retry of the same block on warm caches
+"""
+
+def plain(search_lines, content_lines):
+    best_index, best_score = -1, 0.0
+    for i in range(len(content_lines) - len(search_lines) + 1):
+        score = calculate_similarity(search_lines, content_lines[i:i + len(search_lines)])
+        if score > best_score:
+            best_index, best_score = i, score
+    return best_index, best_score
+
+def timed(name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{name:<14} {time.perf_counter() - start:8.3f}s  {result}")
+    return result
+
+def main(lines=5000, block=12):
+    rng = random.Random(1)
+    content = [f"    value_{rng.randint(0, lines)} = compute({i}, {rng.randint(0, 9)})\n" for i in range(lines)]
+    start = lines * 2 // 3
+    search = content[start:start + block]
+    search[block // 2] = "    changed = True\n"
+
+    expected = timed("plain loop", plain, search, content)
+    if scoring.np is not None:
+        assert timed("bulk numpy", best_window, search, content) == expected
+        assert timed("  retry", best_window, search, content) == expected
+    saved = scoring.np
+    scoring.np = None
+    scoring.clear_caches()
+    try:
+        assert timed("bulk python", best_window, search, content) == expected
+        assert timed("  retry", best_window, search, content) == expected
+    finally:
+        scoring.np = saved
+
+if __name__ == "__main__":
+    main()
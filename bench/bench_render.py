@@ -0,0 +1,96 @@
+"""
+Frame renderer benchmark
+
+Renders a large source file, long CJK lines that wrap and CJK lines that
+fit with the previous per-character framed_print and with IFL.render, both
+into memory.
+
+    python bench/bench_render.py
+"""
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("COLUMNS", "120")
+
+import wcwidth
+from IFL.render import framed_print
+
+def legacy_printed_length(s):
+    length = 0
+    for char in s:
+        width = wcwidth.wcwidth(char)
+        if width > 0:
+            length += width
+    return length
+
+def legacy_framed_print(title, content, style="default"):
+    ## framed_print as it was before IFL.render, kept as the baseline
+    import shutil
+    lines = content.split('\n')
+    frame_width = shutil.get_terminal_size().columns
+    color = {"frame": "\033[90m", "title": "\033[1m", "reset": "\033[0m"}
+    top_border_with_title = f"┌───── {title} "
+    top_border_with_title += "─" * (frame_width - legacy_printed_length(top_border_with_title) - 1)
+    top_border_with_title += "┐"
+    print(f"{color['frame']}{''.join(top_border_with_title)}{color['reset']}")
+    display_width = frame_width - 4
+    for line in lines:
+        if line.strip() == "":
+            print(f"{color['frame']}│ {' ' * display_width} │{color['reset']}")
+            continue
+        current_pos = 0
+        while current_pos < len(line):
+            wrapped_line = ""
+            current_width = 0
+            start_pos = current_pos
+            while current_pos < len(line):
+                char = line[current_pos]
+                char_width = wcwidth.wcwidth(char)
+                if current_width + char_width <= display_width:
+                    wrapped_line += char
+                    current_width += char_width
+                    current_pos += 1
+                else:
+                    break
+            if current_pos == start_pos:
+                wrapped_line = line[current_pos]
+                current_pos += 1
+            while current_width < display_width:
+                wrapped_line += " "
+                current_width += 1
+            print(f"{color['frame']}│ {wrapped_line} │{color['reset']}")
+    print(f"{color['frame']}└" + "─" * (frame_width - 2) + f"┘{color['reset']}")
+
+def timed(func, content, runs):
+    best = None
+    for _ in range(runs):
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buffer):
+            func("bench", content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, buffer.getvalue()
+
+def main():
+    source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "IFL", "ifl.py")
+    with open(source_path, encoding='utf-8') as f:
+        source = f.read().replace("\t", "    ")
+    cases = {
+        "source x20": source * 20,
+        "cjk text": ("本地 CLI + LLM，半自动读、改、写文件，每一步可确认。" * 8 + "\n") * 500,
+        "cjk lines": "这是一个中等长度的中文段落，包含一些 English 单词和标点，接近一行的宽度。\n" * 3000,
+    }
+    for name, content in cases.items():
+        legacy, legacy_out = timed(legacy_framed_print, content, 3)
+        fast, fast_out = timed(framed_print, content, 3)
+        same = "identical" if legacy_out == fast_out else "DIFFERENT"
+        print(f"{name:12s} {len(content):>9d} chars  legacy {legacy * 1000:8.1f} ms  "
+              f"render {fast * 1000:7.1f} ms  x{legacy / fast:6.1f}  output {same}")
+
+if __name__ == "__main__":
+    main()
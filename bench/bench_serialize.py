@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from IFL.provider import codec
+from IFL.provider.codec import RequestEncoder
+
+"""
+Cost of encoding one chat request against history size:
+stdlib json.dumps of the whole payload (what httpx json= did) vs RequestEncoder
+(orjson when installed) with the history already encoded by the previous round
+"""
+
+FILE_TEXT = "".join(f"{i}\tdef function_{i}(value):\n{i}\t    return value * {i}  # 中文注释\n" for i in range(400))
+
+def history(rounds):
+    messages = [{"role": "system", "content": "system prompt " * 200}]
+    for i in range(rounds):
+        messages.append({"role": "assistant", "content": None, "reasoning_content": "reasoning " * 50,
+                         "tool_calls": [{"id": f"c{i}", "type": "function",
+                                         "function": {"name": "ReadFile", "arguments": '{"file_name": "a.py"}'}}]})
+        messages.append({"role": "tool", "tool_call_id": f"c{i}", "content": FILE_TEXT})
+    return messages
+
+def timed(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    print(f"{'rounds':>6} {'MB':>6} {'stdlib ms':>10} {'encoder cold':>13} {'encoder next round':>19}")
+    for rounds in (5, 20, 80):
+        messages = history(rounds)
+        payload = {"model": "m", "messages": messages, "stream": True}
+        size = len(json.dumps(payload).encode()) / 1e6
+        stdlib = timed(lambda: json.dumps(payload).encode())
+        cold = timed(lambda: RequestEncoder().encode(payload))
+
+        encoder = RequestEncoder()
+        encoder.encode(payload)
+        def next_round():
+            messages.append({"role": "user", "content": "next"})
+            encoder.encode(payload)
+        warm = timed(next_round)
+        print(f"{rounds:>6} {size:>6.2f} {stdlib:>10.2f} {cold:>13.2f} {warm:>19.2f}")
+
+if __name__ == "__main__":
+    print(f"orjson: {'yes' if codec.orjson is not None else 'no'}")
+    main()
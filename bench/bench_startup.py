@@ -0,0 +1,60 @@
+"""
+Start-up benchmark
+
+Measures import cost of the ifl entry module with `python -X importtime`
+and the config load time, cold (yaml parse) versus warm (marshal cache).
+
+    python bench/bench_startup.py
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IFL.settings import load_config
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "IFL", "config.yaml")
+
+def import_times(module, runs=5):
+    """Return (best cumulative us of module, heaviest imports of the best run)"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True)
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, cumulative_us, name = [x.strip() for x in line.split(":", 1)[1].split("|")]
+            rows.append((int(cumulative_us), int(self_us), name))
+        total = next(c for c, _, n in rows if n == module)
+        if best is None or total < best[0]:
+            best = (total, sorted(rows, reverse=True)[:10])
+    return best
+
+def config_times(runs=20):
+    with tempfile.TemporaryDirectory() as cache:
+        start = time.perf_counter()
+        load_config(CONFIG, cache)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            load_config(CONFIG, cache)
+        warm = (time.perf_counter() - start) / runs
+    return cold, warm
+
+def main():
+    total, heaviest = import_times("IFL.ifl")
+    print(f"import IFL.ifl: {total / 1000:.1f} ms cumulative")
+    for cumulative, _, name in heaviest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    cold, warm = config_times()
+    print(f"config load: cold {cold * 1000:.2f} ms, warm {warm * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
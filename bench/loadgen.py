@@ -0,0 +1,145 @@
+"""
+Load generator for agent sessions against the local mock server
+
+Starts IFL.mock_server with a scripted session (ListFile, ReadFile,
+SearchCode, ModifyFile, answer) and runs complete IFL sessions against it,
+each in its own process and scratch project, at rising concurrency levels.
+Reports throughput and session latency, so the agent's own overhead and its
+scaling can be measured offline. Runs with the per-round reasoning policy
+off and on show what skipping thinking in simple rounds saves.
+
+    python bench/loadgen.py --sessions 32 --concurrency 1,4,16 --ttft 0.2 --tps 80
+    python bench/loadgen.py --reasoning on
+    python bench/loadgen.py --url http://127.0.0.1:8765/v1   # a server started separately
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from IFL.settings import load_config
+from IFL.mock_server import MockServer
+
+CONFIG = os.path.join(ROOT, "IFL", "config.yaml")
+
+TASK = "Make compute() return twice its value and add a docstring."
+
+FILES = {
+    "main.py": "from util import compute\n\n\ndef main():\n    print(compute(21))\n\n\nif __name__ == '__main__':\n    main()\n",
+    "util.py": "".join(f"def helper_{i}(value):\n    return value + {i}\n\n\n" for i in range(200))
+               + "def compute(value):\n    return value\n",
+    "README.md": "Sample project for the load generator\n",
+}
+
+SCRIPT = [
+    {"thinking": "Let me look at the project layout first.", "tool": "ListFile", "arguments": {}},
+    {"thinking": "compute() is probably in util.py, reading it.", "tool": "ReadFile",
+     "arguments": {"file_name": "util.py"}},
+    {"thinking": "Checking where compute is used.", "tool": "SearchCode",
+     "arguments": {"pattern": "compute", "is_regex": False}},
+    {"thinking": "Now the change.", "tool": "ModifyFile",
+     "arguments": {"file_name": "util.py", "modify_blocks":
+                   "<<<<<<< SEARCH\ndef compute(value):\n    return value\n=======\n"
+                   "def compute(value):\n    \"\"\"Twice the value\"\"\"\n    return value * 2\n>>>>>>> REPLACE\n"}},
+    {"content": "compute() now returns twice its value."},
+]
+
+def run_session(base_url, reasoning=True):
+    """One complete session in a scratch project, returns (seconds, rounds, error)"""
+    from IFL.ifl import IFL
+    folder = tempfile.mkdtemp(prefix="ifl-load-")
+    try:
+        for name, text in FILES.items():
+            with open(os.path.join(folder, name), 'w', encoding='utf-8') as file:
+                file.write(text)
+        os.chdir(folder)
+        os.environ.setdefault("MOCK_API_KEY", "mock")
+        ## The Verify check runs `python -m IFL.verify` inside the scratch project
+        os.environ["PYTHONPATH"] = ROOT
+        config = load_config(CONFIG)
+        config["Model"]["selected"] = "Mock"
+        config["Model"]["Mock"]["base_url"] = base_url
+        config["Session"]["enabled"] = False
+        config["MaxRounds"] = len(SCRIPT) + 2
+        config.setdefault("Reasoning", {})["enabled"] = reasoning
+
+        error = None
+        start = time.perf_counter()
+        agent = IFL(config, auto_yes=True)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            try:
+                agent.fitter(TASK, [])
+            except SystemExit:
+                pass
+            except Exception as e:
+                error = str(e)
+            finally:
+                agent.runner.close()
+                agent.prefetcher.close()
+        return time.perf_counter() - start, agent.current_round, error
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(folder, ignore_errors=True)
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run_level(base_url, sessions, concurrency, reasoning):
+    from IFL.utils import process_pool
+    start = time.perf_counter()
+    with process_pool(concurrency) as pool:
+        results = list(pool.map(run_session, [base_url] * sessions, [reasoning] * sessions))
+    wall = time.perf_counter() - start
+    latencies = [seconds for seconds, _, error in results if error is None]
+    rounds = sum(r for _, r, error in results if error is None)
+    errors = [error for _, _, error in results if error is not None]
+    return wall, latencies, rounds, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent IFL sessions against the mock server")
+    parser.add_argument('--sessions', type=int, default=16, help='Sessions per concurrency level')
+    parser.add_argument('--concurrency', type=str, default="1,4,8", help='Comma separated levels')
+    parser.add_argument('--ttft', type=float, default=0.2)
+    parser.add_argument('--tps', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--url', type=str, help='Use a running server instead of starting one')
+    parser.add_argument('--reasoning', choices=["on", "off", "both"], default="both",
+                        help='Per-round reasoning policy (off: thinking in every round)')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = MockServer({"ttft": args.ttft, "tokens_per_second": args.tps,
+                             "error_rate": args.error_rate, "script": SCRIPT})
+        base_url = server.start()
+
+    print(f"{len(SCRIPT)} rounds per session, ttft {args.ttft}s, {args.tps} tokens/s, server {base_url}")
+    print(f"{'policy':>6} {'concurrency':>11} {'sessions':>8} {'wall s':>7} {'sessions/s':>10} {'rounds/s':>8} "
+          f"{'p50 s':>6} {'p95 s':>6} {'failed':>6}")
+    try:
+        policies = {"on": [True], "off": [False], "both": [False, True]}[args.reasoning]
+        levels = [int(c) for c in args.concurrency.split(",")]
+        for level, reasoning in ((level, reasoning) for level in levels for reasoning in policies):
+            wall, latencies, rounds, errors = run_level(base_url, args.sessions, level, reasoning)
+            print(f"{'on' if reasoning else 'off':>6} {level:>11} {args.sessions:>8} {wall:>7.2f} "
+                  f"{len(latencies) / wall:>10.2f} {rounds / wall:>8.2f} {percentile(latencies, 0.5):>6.2f} "
+                  f"{percentile(latencies, 0.95):>6.2f} {len(errors):>6}")
+            for error in sorted(set(errors))[:3]:
+                print(f"    {error}")
+    finally:
+        if server is not None:
+            print(f"server: {server.stats()}")
+            server.stop()
+
+if __name__ == "__main__":
+    main()
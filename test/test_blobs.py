@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from IFL.blobs import BlobStore, message_texts
+from IFL.filecache import FileCache
+
+class TestBlobs(unittest.TestCase):
+    def test_intern(self):
+        store = BlobStore(min_chars=8)
+        first = "".join(["line\n"] * 100)
+        second = "".join(["line\n"] * 100)
+        self.assertIsNot(first, second)
+        self.assertIs(store.intern(first), first)
+        self.assertIs(store.intern(second), first)
+        self.assertEqual((store.hits, store.saved_chars, len(store)), (1, 500, 1))
+
+        ## Small and missing contents are left alone
+        self.assertEqual(store.intern("short"), "short")
+        self.assertIsNone(store.intern(None))
+        self.assertEqual(len(store), 1)
+
+    def test_intern_message(self):
+        store = BlobStore(min_chars=8)
+        text = "".join(["x = 1\n"] * 20)
+        arguments = '{"file_name": "a.py", "file_content": "' + "y" * 50 + '"}'
+        store.intern(text)
+        store.intern(arguments)
+        message = {"role": "assistant", "content": "".join(["x = 1\n"] * 20),
+                   "tool_calls": [{"id": "1", "function": {"name": "WriteFile",
+                                                           "arguments": arguments[:10] + arguments[10:]}}]}
+        store.intern_message(message)
+        self.assertIs(message["content"], text)
+        self.assertEqual(store.hits, 2)
+        self.assertIs(message["tool_calls"][0]["function"]["arguments"], arguments)
+
+    def test_prune(self):
+        store = BlobStore(min_chars=8)
+        kept = store.intern("".join(["kept\n"] * 10))
+        arguments = store.intern("".join(["arguments\n"] * 10))
+        dropped = store.intern("".join(["dropped\n"] * 10))
+        messages = [{"role": "user", "content": kept},
+                    {"role": "assistant", "content": None,
+                     "tool_calls": [{"id": "1", "function": {"name": "x", "arguments": arguments}}]}]
+        ## Owned by content but not by object doesn't keep a string
+        self.assertEqual(store.prune(list(message_texts(messages)) + [dropped[:8] + dropped[8:]]), 1)
+        self.assertEqual(len(store), 2)
+        self.assertIs(store.intern("".join(["kept\n"] * 10)), kept)
+        self.assertEqual(store.prune([]), 2)
+
+    def test_file_cache_shares_contents(self):
+        store = BlobStore(min_chars=8)
+        cache = FileCache(blobs=store)
+        with tempfile.TemporaryDirectory() as folder:
+            file_name = os.path.join(folder, "a.txt")
+            with open(file_name, 'w', encoding='utf-8') as file:
+                file.write("".join(["hello\n"] * 10))
+            first = cache.read(file_name)
+            message = store.intern("".join(["hello\n"] * 10))
+            self.assertIs(message, first)
+            self.assertIs(cache.read(file_name), first)
+
+if __name__ == "__main__":
+    unittest.main()
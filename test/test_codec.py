@@ -0,0 +1,54 @@
+import gzip
+import json
+import unittest
+
+from IFL.provider import codec
+from IFL.provider.codec import RequestEncoder
+
+def payload(messages, tools=None):
+    result = {"model": "m", "messages": messages, "stream": True}
+    if tools is not None:
+        result["tools"] = tools
+    return result
+
+class TestCodec(unittest.TestCase):
+    def check(self):
+        tools = [{"type": "function", "function": {"name": "ReadFile"}}]
+        messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "你好 \"quoted\"\n"}]
+        encoder = RequestEncoder()
+        body, headers = encoder.encode(payload(messages, tools))
+        self.assertEqual(json.loads(body), payload(messages, tools))
+        self.assertEqual(headers["Content-Type"], "application/json")
+
+        messages.append({"role": "assistant", "content": None, "tool_calls": None})
+        body, _ = encoder.encode(payload(messages, tools))
+        self.assertEqual(json.loads(body), payload(messages, tools))
+        self.assertEqual((encoder.encoded, encoder.reused), (4, 3))
+
+        body, _ = encoder.encode({"messages": []})
+        self.assertEqual(json.loads(body), {"messages": []})
+
+    def test_encode_reuses_history(self):
+        self.check()
+
+    def test_stdlib_fallback(self):
+        saved = codec.orjson
+        codec.orjson = None
+        try:
+            self.check()
+            self.assertEqual(codec.loads('{"a": [1]}'), {"a": [1]})
+        finally:
+            codec.orjson = saved
+
+    def test_gzip(self):
+        encoder = RequestEncoder(compress=True)
+        body, headers = encoder.encode(payload([{"role": "user", "content": "x" * 1000}]))
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body))["messages"][0]["content"], "x" * 1000)
+
+    def test_lone_surrogate(self):
+        body, _ = RequestEncoder().encode(payload([{"role": "user", "content": "a\ud800b"}]))
+        self.assertEqual(json.loads(body)["messages"][0]["content"], "a\ud800b")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import io
+import os
+import time
+import signal
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+from IFL import daemon, utils
+from IFL.daemon import Daemon, forward
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def response(self, dialogue, functions=None, options=None):
+        self.calls += 1
+        return None, f"echo: {dialogue[-1]['content']} key: {os.environ.get('FAKE_API_KEY')}", None
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        yield self.response(dialogue, functions)
+
+class SlowProvider:
+    """Streams a long answer slowly, notes whether it ran to its end"""
+    def __init__(self):
+        self.finished = None
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        self.finished = False
+        for i in range(100):
+            time.sleep(0.02)
+            yield None, f"word {i} ", None
+        self.finished = True
+
+class StalledProvider:
+    """Waits for its first token until released, notes whether its stream was closed"""
+    def __init__(self):
+        self.release = threading.Event()
+        self.closed = threading.Event()
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        try:
+            self.release.wait(10)
+            yield None, "too late", None
+        finally:
+            self.closed.set()
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.tmp.name, "cache")
+        self.settings = os.path.join(self.tmp.name, "config.yaml")
+        with open(self.settings, 'w') as f:
+            f.write("Model:\n  selected: Fake\n  Fake:\n    import: fake\n    api_key: FAKE_API_KEY\n"
+                    "MaxRounds: 3\nSystemPrompt: test\nAllTools: []\n"
+                    "Session:\n  enabled: false\n")
+        self.path = os.path.join(self.tmp.name, "ifl.sock")
+        self.daemon = Daemon(self.path)
+        self.provider = FakeProvider()
+        self.daemon.provider = lambda config: self.provider
+        threading.Thread(target=self.daemon.serve, daemon=True).start()
+        for _ in range(100):
+            if os.path.exists(self.path):
+                break
+            threading.Event().wait(0.01)
+
+    def tearDown(self):
+        os.environ.pop("XDG_CACHE_HOME", None)
+        self.tmp.cleanup()
+
+    def run_client(self, task):
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            code = forward(["-y", "-t", task, "-s", self.settings], self.path)
+        return code, buffer.getvalue()
+
+    def test_forward_streams_output_and_reuses_provider(self):
+        code, output = self.run_client("first")
+        self.assertEqual(code, 0)
+        self.assertIn("echo: first", output)
+        code, output = self.run_client("second")
+        self.assertEqual(code, 0)
+        self.assertIn("echo: second", output)
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_session_uses_client_env(self):
+        client = os.path.join(self.tmp.name, "client")
+        os.makedirs(client)
+        with open(os.path.join(client, ".env"), 'w') as f:
+            f.write("FAKE_API_KEY=from-client-dotenv\n")
+        cwd = os.getcwd()
+        os.chdir(client)
+        try:
+            code, output = self.run_client("first")
+        finally:
+            os.chdir(cwd)
+        self.assertIn("key: from-client-dotenv", output)
+        self.assertNotIn("FAKE_API_KEY", os.environ)
+
+        ## A key only the daemon has is not used for a client without one
+        os.environ["FAKE_API_KEY"] = "daemon"
+        saved = daemon.client_env
+        daemon.client_env = lambda: {}
+        try:
+            code, output = self.run_client("second")
+        finally:
+            daemon.client_env = saved
+        self.assertIn("key: None", output)
+        self.assertEqual(os.environ.pop("FAKE_API_KEY"), "daemon")
+
+    def test_client_interrupt_stops_stream(self):
+        provider = SlowProvider()
+        self.daemon.provider = lambda config: provider
+        prompts = []
+        saved = utils.content_from_input
+        ## Empty feedback ends the session after the stopped response
+        utils.content_from_input = lambda info: prompts.append(info) or ""
+        timer = threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGINT))
+        timer.start()
+        try:
+            code, output = self.run_client("long")
+        finally:
+            timer.cancel()
+            utils.content_from_input = saved
+        self.assertEqual(code, 0)
+        self.assertIn("interrupted by the user", output)
+        self.assertEqual(prompts, ["Enter feedback: "])
+        self.assertFalse(provider.finished)
+
+    def test_client_interrupt_stops_stalled_stream(self):
+        provider = StalledProvider()
+        self.daemon.provider = lambda config: provider
+        saved = utils.content_from_input
+        utils.content_from_input = lambda info: ""
+        timer = threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGINT))
+        timer.start()
+        started = time.monotonic()
+        try:
+            code, output = self.run_client("stalled")
+        finally:
+            timer.cancel()
+            utils.content_from_input = saved
+            provider.release.set()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(code, 0)
+        self.assertIn("interrupted by the user", output)
+        self.assertNotIn("too late", output)
+        self.assertTrue(provider.closed.wait(2))
+
+    def test_forward_without_daemon(self):
+        self.assertIsNone(forward(["-t", "x"], os.path.join(self.tmp.name, "missing.sock")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import difflib
+import unittest
+
+from IFL.diffview import TextDiff, line_opcodes
+
+class TestDiffView(unittest.TestCase):
+    def test_opcodes_reconstruct_new_text(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            old = [f"line {rng.randint(0, 20)}" for _ in range(rng.randint(0, 40))]
+            new = list(old)
+            for _ in range(rng.randint(0, 6)):
+                pos = rng.randint(0, len(new))
+                if new and rng.random() < 0.5:
+                    del new[min(pos, len(new) - 1)]
+                else:
+                    new.insert(pos, f"new {rng.randint(0, 5)}")
+            rebuilt = []
+            for tag, i1, i2, j1, j2 in line_opcodes(old, new):
+                rebuilt.extend(old[i1:i2] if tag == 'equal' else new[j1:j2])
+            self.assertEqual(rebuilt, new)
+
+    def test_hunks_match_difflib(self):
+        old = "\n".join(f"line {i}" for i in range(200)) + "\n"
+        new = old.replace("line 10\n", "line ten\n").replace("line 150\n", "")
+        diff = TextDiff(old, new)
+        self.assertEqual((diff.added, diff.removed), (1, 2))
+        ours = [l for page in diff.pages(1000) for l in page if not l.startswith("@@")]
+        expected = [l for l in difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="")
+                    if not l.startswith(("@@", "---", "+++"))]
+        self.assertEqual(ours, expected)
+
+    def test_pages_are_bounded(self):
+        old = ""
+        new = "\n".join(str(i) for i in range(25))
+        pages = list(TextDiff(old, new).pages(10))
+        self.assertEqual([len(p) for p in pages], [10, 10, 6])
+        self.assertEqual(pages[0][0], "@@ -0,0 +1,25 @@")
+
+    def test_empty_side_headers(self):
+        new = "\n".join(str(i) for i in range(25))
+        self.assertEqual(next(TextDiff(new, "").pages(10))[0], "@@ -1,25 +0,0 @@")
+        ## An empty side names the line before it, as in difflib's "@@ -6 +5,0 @@"
+        old = "".join(f"{i}\n" for i in range(10))
+        pages = list(TextDiff(old, old.replace("5\n", ""), context=0).pages(10))
+        self.assertEqual(pages[0][0], "@@ -6,1 +5,0 @@")
+
+    def test_unchanged(self):
+        self.assertTrue(TextDiff("a\nb\n", "a\nb").unchanged())
+        self.assertEqual(list(TextDiff("a\n", "a\n").pages(10)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
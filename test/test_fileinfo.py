@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from IFL.filecache import FileCache
+from IFL.fileinfo import FileInspector, is_binary
+
+class TestFileInfo(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.inspector = FileInspector({"max_bytes": 4096, "max_lines": 100, "max_line_chars": 80,
+                                        "head_lines": 5, "tail_lines": 3, "sample_bytes": 512})
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.folder.name, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_is_binary(self):
+        self.assertTrue(is_binary(b"ab\0cd"))
+        self.assertTrue(is_binary(b"\xff\xfe text"))
+        self.assertFalse(is_binary("你好".encode('utf-8')))
+        ## A character cut by the block end is not binary, unless the file ends there
+        self.assertFalse(is_binary("你好".encode('utf-8')[:-1]))
+        self.assertTrue(is_binary("你好".encode('utf-8')[:-1], final=True))
+
+    def test_small_file(self):
+        path = self.write("a.py", b"x = 1\ny = 2\n")
+        view = self.inspector.view(path, FileCache())
+        self.assertIn("| lines: 2 | hash:", view)
+        self.assertIn("1\tx = 1\n2\ty = 2\n", view)
+
+    def test_binary_file(self):
+        path = self.write("a.bin", bytes(range(256)) * 10)
+        cache = FileCache()
+        view = self.inspector.view(path, cache)
+        self.assertIn("bytes: 2560", view)
+        self.assertIn("not a UTF-8 text file", view)
+        self.assertEqual(cache.misses, 0)
+
+    def test_oversized_file(self):
+        lines = [f"line {i}" for i in range(1, 2001)]
+        path = self.write("big.log", "\n".join(lines).encode('utf-8') + b"\n")
+        cache = FileCache()
+        reads = []
+        real_open = open
+
+        class Counted:
+            def __init__(self, file):
+                self.file = file
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.file.close()
+
+            def __getattr__(self, name):
+                return getattr(self.file, name)
+
+            def read(self, size=-1):
+                data = self.file.read(size)
+                reads.append(len(data))
+                return data
+
+        with mock.patch("IFL.fileinfo.open", lambda *a, **k: Counted(real_open(*a, **k)), create=True):
+            view = self.inspector.view(path, cache).splitlines()
+        ## Only the sniffed block and the two samples are read, not the middle of the file
+        self.assertLessEqual(sum(reads), 8192 + 2 * 512)
+        self.assertEqual(cache.misses, 0)
+        ## The line count is estimated, the tail is numbered from the end
+        total = int(view[0].split("lines: ~")[1].split(" ")[0])
+        self.assertTrue(1800 <= total <= 2200, total)
+        self.assertEqual(view[1:6], [f"{i}\tline {i}" for i in range(1, 6)])
+        self.assertEqual(view[6], "... lines omitted, the last 3 lines follow, numbered from the end ...")
+        self.assertEqual(view[7:10], ["-3\tline 1998", "-2\tline 1999", "-1\tline 2000"])
+        self.assertIn("SearchCode", view[-1])
+
+    def test_limit_counts_bytes(self):
+        ## 1549 chars, 4549 bytes in UTF-8
+        text = "\n".join("汉字" * 15 for _ in range(50))
+        self.assertEqual(self.inspector.check_text(text), f"{len(text.encode('utf-8'))} bytes, over the limit of 4096")
+
+    def test_too_many_lines(self):
+        path = self.write("many.txt", "".join(f"{i}\n" for i in range(1, 201)).encode('utf-8'))
+        view = self.inspector.view(path, FileCache()).splitlines()
+        self.assertIn("lines: 200 | sampled: 200 lines", view[0])
+        self.assertEqual(view[5], "5\t5")
+        self.assertEqual(view[7:10], ["198\t198", "199\t199", "200\t200"])
+
+    def test_long_line(self):
+        path = self.write("bundle.min.js", b"var a=1;" * 100)
+        view = self.inspector.view(path, FileCache()).splitlines()
+        self.assertIn("a line of 800 chars", view[0])
+        self.assertTrue(view[1].startswith("1\tvar a=1;"))
+        self.assertTrue(view[1].endswith("... [720 more chars]"))
+        self.assertNotIn("... lines omitted ...", view)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import io
+import os
+import time
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+from IFL.guards import StreamGuard, Aborted, repeated_period, watch
+from IFL.ifl import IFL
+
+CONFIG = {
+    "MaxRounds": 4,
+    "AllTools": [],
+    "InterruptTemplate": "User has stopped your response.\nResponse: {__USER_RESPOSNE__}\n",
+    "GuardTemplate": "Your response was stopped: {__REASON__}.\n",
+}
+
+class FakeProvider:
+    """First response streams chunks then stops, later ones answer done"""
+    def __init__(self, chunks, interrupt=False):
+        self.chunks = chunks
+        self.interrupt = interrupt
+        self.calls = 0
+        self.closed = False
+        self.dialogues = []
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        self.calls += 1
+        self.dialogues.append([dict(m) for m in dialogue])
+        if self.calls > 1:
+            yield None, "done", None
+            return
+        try:
+            for chunk in self.chunks:
+                yield None, chunk, None
+            if self.interrupt:
+                raise KeyboardInterrupt
+            yield None, None, {"id": "call_1", "type": "function",
+                               "function": {"name": "ListFile", "arguments": "{}"}}
+        finally:
+            self.closed = True
+
+class TestStreamGuard(unittest.TestCase):
+    def test_repetition(self):
+        guard = StreamGuard({"repeats": 5, "min_span": 100, "check_every": 64})
+        guard.feed("Answer", "Let me think about the layout first.\n")
+        with self.assertRaises(Aborted) as caught:
+            for _ in range(50):
+                guard.feed("Answer", "I will read main.py again.\n")
+        self.assertIn("repeated 5 times", caught.exception.reason)
+
+    def test_normal_text_and_blanks_pass(self):
+        guard = StreamGuard({})
+        path = os.path.join(os.path.dirname(__file__), "..", "IFL", "ifl.py")
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        for i in range(0, len(source), 7):
+            guard.feed("Answer", source[i:i + 7])
+        guard.feed("Answer", " " * 2000 + "\n" * 2000)
+        ## Repeated tool arguments are file contents, not a loop
+        guard.feed("Arguments", "row,1\n" * 1000)
+        self.assertEqual(repeated_period("abcd" * 20, 10, 4, 40, 400), 0)
+
+    def test_length_limits(self):
+        guard = StreamGuard({"max_chars": 100, "max_thinking_chars": 50})
+        guard.feed("Answer", "x" * 40)
+        with self.assertRaises(Aborted):
+            guard.feed("Thinking", "y" * 51)
+        guard.reset()
+        guard.feed("Answer", "z" * 90)
+        with self.assertRaisesRegex(Aborted, "longer than 100"):
+            guard.feed("Answer", "w" * 20)
+        StreamGuard({"enabled": False, "max_chars": 1}).feed("Answer", "long enough")
+
+        ## A written file is not output to stop at max_chars, it has a limit of its own
+        guard = StreamGuard({"max_chars": 100, "max_arguments_chars": 1000})
+        guard.feed("Answer", "x" * 90)
+        guard.feed("Arguments", "y" * 900)
+        guard.feed("Answer", "x" * 10)
+        with self.assertRaisesRegex(Aborted, "tool arguments longer than 1000"):
+            guard.feed("Arguments", "y" * 101)
+
+    def test_watch_cancels_a_stalled_stream(self):
+        release = threading.Event()
+        closed = threading.Event()
+
+        def stalled():
+            try:
+                release.wait(5)
+                yield "late"
+            finally:
+                closed.set()
+
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+        started = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            for item in watch(stalled(), cancel, poll=0.02):
+                pass
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertFalse(cancel.is_set())
+        ## The stream left behind is closed with its next item
+        release.set()
+        self.assertTrue(closed.wait(2))
+        self.assertEqual(list(watch((i for i in (1, 2)), cancel)), [1, 2])
+
+class TestStoppedResponse(unittest.TestCase):
+    def run_agent(self, provider, feedback=None):
+        agent = IFL(dict(CONFIG, Guards={"repeats": 5, "min_span": 100, "check_every": 64}),
+                    auto_yes=True, llm=provider)
+        if feedback is not None:
+            agent.input_content = lambda info: feedback
+        messages = [{"role": "system", "content": "test"}, {"role": "user", "content": "task"}]
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                agent.chat_loop(messages)
+        agent.prefetcher.close()
+        return provider.dialogues[-1]
+
+    def test_guard_aborts_runaway_response(self):
+        provider = FakeProvider(["Start. "] + ["Checking again.\n"] * 100)
+        messages = self.run_agent(provider)
+        self.assertTrue(provider.closed)
+        self.assertEqual(provider.calls, 2)
+        partial, note = messages[-2], messages[-1]
+        self.assertEqual(partial["role"], "assistant")
+        self.assertTrue(partial["content"].startswith("Start. Checking again.\n"))
+        self.assertIsNone(partial["tool_calls"])
+        self.assertEqual(note["role"], "user")
+        self.assertIn("repeated 5 times", note["content"])
+
+    def test_ctrl_c_keeps_partial_output_and_asks_for_feedback(self):
+        provider = FakeProvider(["Half an ", "answer"], interrupt=True)
+        messages = self.run_agent(provider, feedback="try the other file")
+        self.assertEqual(messages[-2]["content"], "Half an answer")
+        self.assertIsNone(messages[-2]["tool_calls"])
+        self.assertEqual(messages[-1]["content"],
+                         "User has stopped your response.\nResponse: try the other file\n")
+
+    def test_provider_error_discards_staged_file(self):
+        class FailingProvider:
+            def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+                yield None, "Writing. ", None
+                on_arguments("WriteFile", '{"file_name": "a.py", "file_content": "half')
+                raise ConnectionError("connection reset")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            staging = os.path.join(tmp, "staging")
+            agent = IFL(dict(CONFIG, WriteFile={"staging_dir": staging}), auto_yes=True, llm=FailingProvider())
+            with redirect_stdout(io.StringIO()):
+                with self.assertRaises(ConnectionError):
+                    agent.call_llm([{"role": "user", "content": "task"}])
+            agent.prefetcher.close()
+            self.assertIsNone(agent.staged)
+            self.assertEqual(os.listdir(staging), [".gitignore"])
+
+if __name__ == "__main__":
+    unittest.main()
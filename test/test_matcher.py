@@ -0,0 +1,66 @@
+import unittest
+
+from IFL import matcher
+from IFL.matcher import apply_matches, match_blocks_parallel
+from IFL.utils import do_search_replace
+
+def block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+ORIGINAL = "".join(f"def func_{i}(a, b):\n    return a + b * {i}\n\n" for i in range(40))
+
+class TestMatcher(unittest.TestCase):
+    def setUp(self):
+        self.min_work = matcher.PARALLEL_MIN_WORK
+
+    def tearDown(self):
+        matcher.PARALLEL_MIN_WORK = self.min_work
+
+    def search_replace(self, blocks, parallel):
+        matcher.PARALLEL_MIN_WORK = 0 if parallel else 10 ** 12
+        return do_search_replace(ORIGINAL, blocks)
+
+    def test_parallel_equals_serial(self):
+        ## Blocks given out of file order are applied by position
+        blocks = "\n".join(block(f"def func_{i}(a, b):\n    return a + b * {i}",
+                                 f"def func_{i}(a, b):\n    return a - b * {i}")
+                           for i in (30, 2, 17))
+        parallel = self.search_replace(blocks, True)
+        serial = self.search_replace(blocks, False)
+        self.assertEqual(parallel, serial)
+        self.assertTrue(parallel[0])
+        self.assertIn("return a - b * 17\n", parallel[1])
+
+    def test_failure_keeps_serial_error(self):
+        blocks = block("def func_1(a, b):", "def func_1(a):") + "\n" + block("no such line", "x")
+        self.assertEqual(self.search_replace(blocks, True), self.search_replace(blocks, False))
+        self.assertFalse(self.search_replace(blocks, True)[0])
+
+    def test_block_seeing_earlier_replacement_falls_back(self):
+        ## The second block's line only exists in func_30, until the first block writes it into func_5
+        blocks = (block("    return a + b * 5", "    return a + b * 30") + "\n"
+                  + block("    return a + b * 30", "    return 0"))
+        parsed = [(["    return a + b * 5\n"], ["    return a + b * 30\n"]),
+                  (["    return a + b * 30\n"], ["    return 0\n"])]
+        lines = ORIGINAL.splitlines(keepends=True)
+        matches = [(lines.index(search[0]), 1.0, False) for search, _ in parsed]
+        self.assertIsNone(apply_matches(lines, parsed, matches))
+        self.assertEqual(self.search_replace(blocks, True), self.search_replace(blocks, False))
+
+    def test_small_input_stays_serial(self):
+        parsed = [(["a\n"], ["b\n"]), (["c\n"], ["d\n"])]
+        self.assertIsNone(match_blocks_parallel(["a\n", "c\n"], parsed))
+
+    def test_overlap_falls_back(self):
+        lines = ["a\n", "b\n", "c\n"]
+        parsed = [(["a\n", "b\n"], ["x\n"]), (["b\n", "c\n"], ["y\n"])]
+        exact = lambda *indexes: [(index, 1.0, False) for index in indexes]
+        self.assertIsNone(apply_matches(lines, parsed, exact(0, 1)))
+        self.assertIsNone(apply_matches(lines, parsed, exact(0, -1)))
+        parsed = [(["c\n"], ["z\n"]), (["a\n"], ["x\n"])]
+        self.assertEqual(apply_matches(lines, parsed, exact(2, 0)), ["x\n", "b\n", "z\n"])
+        ## Fuzzy matches with ties are left to serial matching
+        self.assertIsNone(apply_matches(lines, parsed, [(2, 1.0, True), (0, 1.0, False)]))
+
+if __name__ == '__main__':
+    unittest.main()
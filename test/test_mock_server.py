@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from IFL.mock_server import MockServer
+from IFL.provider.siflow import LLMProvider
+
+SCRIPT = [
+    {"thinking": "先看看文件", "tool": "ReadFile", "arguments": {"file_name": "main.py"}},
+    {"content": "All good"},
+]
+
+class TestMockServer(unittest.TestCase):
+    def setUp(self):
+        self.server = MockServer({"ttft": 0, "tokens_per_second": 0, "script": SCRIPT, "seed": 1})
+        os.environ["IFL_TEST_MOCK_KEY"] = "key"
+        self.config = {"model_name": "mock", "base_url": self.server.start(), "api_key": "IFL_TEST_MOCK_KEY"}
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_blocking(self):
+        llm = LLMProvider(self.config)
+        thinking, content, fcall = llm.response([{"role": "user", "content": "hi"}])
+        self.assertEqual(thinking, "先看看文件")
+        self.assertEqual(fcall["function"]["name"], "ReadFile")
+        self.assertEqual(fcall["function"]["arguments"], '{"file_name": "main.py"}')
+
+        ## The second step answers a conversation holding one assistant message
+        dialogue = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": None}]
+        self.assertEqual(llm.response(dialogue), (None, "All good", None))
+
+    def test_stream(self):
+        llm = LLMProvider(dict(self.config, gzip_requests=True))
+        deltas = []
+        chunks = list(llm.response_stream([{"role": "user", "content": "hi"}],
+                                          on_arguments=lambda name, delta: deltas.append((name, delta))))
+        self.assertEqual("".join(t for t, _, _ in chunks if t), "先看看文件")
+        fcall = chunks[-1][2]
+        self.assertEqual(fcall["function"]["arguments"], '{"file_name": "main.py"}')
+        self.assertEqual("".join(d for _, d in deltas), fcall["function"]["arguments"])
+        self.assertTrue(all(name == "ReadFile" for name, _ in deltas))
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual(self.server.stats()["requests"], 1)
+
+    def test_thinking_options(self):
+        llm = LLMProvider(self.config)
+        dialogue = [{"role": "user", "content": "hi"}]
+        thinking, _, fcall = llm.response(dialogue, options={"thinking": False})
+        self.assertIsNone(thinking)
+        self.assertEqual(fcall["function"]["name"], "ReadFile")
+        chunks = list(llm.response_stream(dialogue, options={"thinking_budget": 1}))
+        self.assertEqual("".join(t for t, _, _ in chunks if t), "先看看文")
+
+    def test_errors(self):
+        self.server.settings["error_rate"] = 1.0
+        llm = LLMProvider(self.config)
+        with self.assertRaises(Exception):
+            llm.response([{"role": "user", "content": "hi"}])
+        with self.assertRaises(Exception):
+            list(llm.response_stream([{"role": "user", "content": "hi"}]))
+        self.assertEqual(self.server.stats()["errors"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from IFL import multiedit
+from IFL.multiedit import plan_edits, commit_edits
+
+def block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+class TestMultiEdit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i in range(3):
+            path = os.path.join(self.tmp.name, f"f{i}.py")
+            with open(path, 'w') as f:
+                f.write(f"a = {i}\nb = {i}\n")
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plan_and_commit_all(self):
+        edits = [{"file_name": p, "modify_blocks": block(f"b = {i}", f"b = {i * 10}")}
+                 for i, p in enumerate(self.files)]
+        edits.append({"file_name": self.files[0], "modify_blocks": block("a = 0", "a = -1")})
+        changes, errors = plan_edits(edits, read)
+        self.assertEqual(errors, [])
+        self.assertEqual([c[0] for c in changes], self.files)
+        self.assertIsNone(commit_edits(changes))
+        self.assertEqual(read(self.files[0]), "a = -1\nb = 0\n")
+        self.assertEqual(read(self.files[2]), "a = 2\nb = 20\n")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["f0.py", "f1.py", "f2.py"])
+
+    def test_commit_through_symlink_and_hard_link(self):
+        link = os.path.join(self.tmp.name, "link.py")
+        os.symlink("f0.py", link)
+        other = os.path.join(self.tmp.name, "other.py")
+        os.link(self.files[1], other)
+        edits = [{"file_name": link, "modify_blocks": block("a = 0", "a = 5")},
+                 {"file_name": self.files[0], "modify_blocks": block("b = 0", "b = 5")},
+                 {"file_name": other, "modify_blocks": block("a = 1", "a = 6")}]
+        changes, errors = plan_edits(edits, read)
+        self.assertEqual(errors, [])
+        self.assertEqual([c[0] for c in changes], [link, other])
+        self.assertIsNone(commit_edits(changes))
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(read(self.files[0]), "a = 5\nb = 5\n")
+        self.assertEqual(os.stat(other).st_ino, os.stat(self.files[1]).st_ino)
+        self.assertEqual(read(self.files[1]), "a = 6\nb = 1\n")
+
+    def test_paths_spelled_differently_are_one_file(self):
+        path = self.files[0]
+        other = os.path.join(os.path.dirname(path), "sub", "..", ".", os.path.basename(path))
+        edits = [{"file_name": path, "modify_blocks": block("a = 0", "a = 1")},
+                 {"file_name": other, "modify_blocks": block("b = 0", "b = 2")}]
+        changes, errors = plan_edits(edits, read)
+        self.assertEqual(errors, [])
+        self.assertEqual([(name, new) for name, _, new in changes], [(path, "a = 1\nb = 2\n")])
+
+    def test_one_failure_reports_without_changes(self):
+        edits = [{"file_name": self.files[0], "modify_blocks": block("b = 0", "b = 1")},
+                 {"file_name": self.files[1], "modify_blocks": block("zzz", "b = 1")},
+                 {"file_name": os.path.join(self.tmp.name, "missing.py"), "modify_blocks": block("x", "y")}]
+        changes, errors = plan_edits(edits, read)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual([e[0] for e in errors][0], os.path.join(self.tmp.name, "missing.py"))
+        self.assertEqual(len(errors), 2)
+
+    def test_parallel_matches_serial(self):
+        saved = multiedit.PARALLEL_MIN_CHARS
+        multiedit.PARALLEL_MIN_CHARS = 0
+        try:
+            edits = [{"file_name": p, "modify_blocks": block("a = 1", "a = 100")} for p in self.files]
+            parallel = plan_edits(edits, read, workers=2)
+            serial = plan_edits(edits, read, workers=1)
+            self.assertEqual(parallel, serial)
+        finally:
+            multiedit.PARALLEL_MIN_CHARS = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from IFL.patch import apply_unified_diff, replace_lines, content_hash
+
+ORIGINAL = "".join(f"line{i}\n" for i in range(1, 21))
+
+class TestUnifiedDiff(unittest.TestCase):
+    def test_apply_hunks(self):
+        diff = """--- a/f
++++ b/f
+@@ -2,3 +2,3 @@
+ line2
+-line3
++LINE3
+ line4
+@@ -10,2 +10,3 @@
+ line10
++inserted
+ line11
+"""
+        success, result = apply_unified_diff(ORIGINAL, diff)
+        self.assertTrue(success, result)
+        lines = result.splitlines()
+        self.assertEqual(lines[2], "LINE3")
+        self.assertEqual(lines[10], "inserted")
+        self.assertEqual(len(lines), 21)
+
+    def test_moved_hunk_is_found(self):
+        diff = "@@ -15,2 +15,1 @@\n line5\n-line6\n"
+        success, result = apply_unified_diff(ORIGINAL, diff)
+        self.assertTrue(success, result)
+        self.assertNotIn("line6\n", result)
+
+    def test_trailing_whitespace_tolerated(self):
+        diff = "@@ -1,1 +1,1 @@\n-line1   \n+first\n"
+        success, result = apply_unified_diff(ORIGINAL, diff)
+        self.assertTrue(success, result)
+        self.assertTrue(result.startswith("first\nline2\n"))
+
+    def test_pure_insertion_and_no_newline(self):
+        success, result = apply_unified_diff("a\nb", "@@ -1,0 +2,1 @@\n+x\n")
+        self.assertTrue(success, result)
+        self.assertEqual(result, "a\nx\nb")
+
+    def test_no_newline_marker_follows_its_line(self):
+        ## The marker ends the removed line, not the added ones listed before it
+        diff = "@@ -1,2 +1,2 @@\n+A\n+B\n-a\n-b\n\\ No newline at end of file\n"
+        self.assertEqual(apply_unified_diff("a\nb", diff), (True, "A\nB\n"))
+        diff = "@@ -1,2 +1,2 @@\n-a\n+A\n b\n\\ No newline at end of file\n"
+        self.assertEqual(apply_unified_diff("a\nb", diff), (True, "A\nb"))
+
+    def test_whitespace_only_lines_are_kept(self):
+        ## A whitespace-only context line is not an empty one, a bare empty line is context
+        diff = "@@ -1,4 +1,4 @@\n a\n \t\n\n-b\n+B\n"
+        self.assertEqual(apply_unified_diff("a\n\t\n\nb\n", diff), (True, "a\n\t\n\nB\n"))
+
+    def test_failure(self):
+        success, msg = apply_unified_diff(ORIGINAL, "@@ -3,1 +3,1 @@\n-missing\n+x\n")
+        self.assertFalse(success)
+        self.assertIn("Hunk 1 does not apply", msg)
+        self.assertFalse(apply_unified_diff(ORIGINAL, "no hunks")[0])
+
+class TestReplaceLines(unittest.TestCase):
+    def test_replace_insert_delete(self):
+        h = content_hash(ORIGINAL)
+        success, result = replace_lines(ORIGINAL, h, 2, 3, "two\nthree")
+        self.assertTrue(success)
+        self.assertTrue(result.startswith("line1\ntwo\nthree\nline4\n"))
+
+        success, result = replace_lines(ORIGINAL, h, 1, 0, "head\n")
+        self.assertTrue(result.startswith("head\nline1\n"))
+
+        success, result = replace_lines(ORIGINAL, h, 20, 20, "")
+        self.assertTrue(result.endswith("line19\n"))
+
+    def test_rejects_stale_hash_and_bad_range(self):
+        success, msg = replace_lines(ORIGINAL, "000000000000", 1, 1, "x")
+        self.assertFalse(success)
+        self.assertIn("hash mismatch", msg)
+        success, msg = replace_lines(ORIGINAL, content_hash(ORIGINAL), 5, 30, "x")
+        self.assertFalse(success)
+        self.assertIn("Invalid line range", msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from IFL.policy import RoundPolicy, PLAN, EXPLORE, EDIT, RETRY, WRAP_UP
+
+CONFIG = {
+    "PreloadTemplate": "This tools is called implicitly, preload context about task.\n\n",
+    "AcceptTemplate": "User has accepted the modify or create files.\n",
+    "ChangeFailedTemplate": "I'm sorry, the change can't apply to the file.\nResponse: {__USER_RESPOSNE__}\n",
+    "RefuseTemplate": "I'm sorry, user has refuse to modify or create files.\nResponse: {__USER_RESPOSNE__}\n",
+}
+
+def call(tool, preload=False):
+    content = CONFIG["PreloadTemplate"] if preload else None
+    return {"role": "assistant", "content": content,
+            "tool_calls": [{"id": "1", "function": {"name": tool, "arguments": "{}"}}]}
+
+def result(content):
+    return {"role": "tool", "tool_call_id": "1", "content": content}
+
+class TestRoundPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = RoundPolicy({}, CONFIG)
+        self.task = [{"role": "system", "content": "s"}, {"role": "user", "content": "task"}]
+
+    def test_round_types(self):
+        round_type = self.policy.round_type
+        self.assertEqual(round_type(self.task), PLAN)
+        ## Preloaded files are part of the task
+        self.assertEqual(round_type(self.task + [call("ReadFile", True), result("[file: a.py]")]), PLAN)
+        self.assertEqual(round_type(self.task + [call("ListFile"), result(".")]), EXPLORE)
+        self.assertEqual(round_type(self.task + [call("ReadFile"), result("[file: a.py]")]), EDIT)
+        self.assertEqual(round_type(self.task + [call("ModifyFile"), result(CONFIG["AcceptTemplate"])]), WRAP_UP)
+        failed_checks = CONFIG["AcceptTemplate"] + "\nThe change was written, but checks failed, fix ..."
+        self.assertEqual(round_type(self.task + [call("ModifyFile"), result(failed_checks)]), RETRY)
+        failed = CONFIG["ChangeFailedTemplate"].replace("{__USER_RESPOSNE__}", "no match")
+        self.assertEqual(round_type(self.task + [call("ModifyFile"), result(failed)]), RETRY)
+        self.assertEqual(round_type(self.task + [call("ReadFile"), result("parse tool error : x")]), RETRY)
+        refused = CONFIG["RefuseTemplate"].replace("{__USER_RESPOSNE__}", "use tabs")
+        self.assertEqual(round_type(self.task + [call("WriteFile"), result(refused)]), PLAN)
+
+    def test_options(self):
+        policy = RoundPolicy({"temperature": 0.5, "edit": {"thinking_budget": 100, "max_tokens": 2000}}, CONFIG)
+        messages = self.task + [call("ReadFile"), result("[file: a.py]")]
+        self.assertEqual(policy.options(messages), {"thinking": True, "thinking_budget": 100,
+                                                    "max_tokens": 2000, "temperature": 0.5})
+        self.assertFalse(policy.options(self.task + [call("SearchCode"), result("Found")])["thinking"])
+        self.assertEqual(policy.counts[EDIT], 1)
+        self.assertEqual(policy.counts[EXPLORE], 1)
+        self.assertIsNone(RoundPolicy({"enabled": False}, CONFIG).options(messages))
+
+if __name__ == "__main__":
+    unittest.main()
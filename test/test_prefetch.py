@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from IFL.filecache import FileCache
+from IFL.prefetch import Prefetcher
+
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for name in ("main.py", "pkg/util.py", "README.md"):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"# {name}\n")
+        self.cache = FileCache()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def prefetcher(self, **settings):
+        return Prefetcher(settings, self.cache, self.root)
+
+    def wait(self, prefetcher):
+        if prefetcher.pool is not None:
+            prefetcher.pool.shutdown(wait=True)
+            prefetcher.pool = None
+
+    def test_paths_in_stream_are_warmed(self):
+        prefetcher = self.prefetcher()
+        ## A path cut between chunks, one that doesn't exist and one outside the project
+        for chunk in ["Let me check `pkg/ut", "il.py` and missing.py, ", "also ../secret.txt and main.py"]:
+            prefetcher.feed(chunk)
+        prefetcher.flush()
+        self.wait(prefetcher)
+        self.assertEqual(prefetcher.mentioned, ["pkg/util.py", "main.py"])
+        self.assertEqual(self.cache.peek(os.path.join(self.root, "pkg/util.py")), "# pkg/util.py\n")
+        self.assertIsNone(self.cache.peek(os.path.join(self.root, "README.md")))
+
+        prefetcher.record_read("pkg/util.py")
+        prefetcher.record_read("README.md")
+        self.assertEqual(prefetcher.metrics(), {"warmed": 2, "reads": 2, "hits": 1,
+                                                "hit_rate": "50%", "offered": 0})
+
+    def test_offers(self):
+        prefetcher = self.prefetcher(offer=True, offer_files=1)
+        prefetcher.feed("Read README.md, then main.py and pkg/util.py.\n")
+        self.wait(prefetcher)
+        prefetcher.record_read("README.md")
+        self.assertEqual(prefetcher.take_offers(), ["main.py"])
+
+        ## A later round doesn't offer what the model has already seen
+        prefetcher.end_round()
+        prefetcher.feed("Now main.py and pkg/util.py\n")
+        self.assertEqual(prefetcher.take_offers(), ["pkg/util.py"])
+        self.assertEqual(prefetcher.take_offers(), [])
+        self.assertEqual(prefetcher.metrics()["offered"], 2)
+        self.wait(prefetcher)
+
+    def test_disabled(self):
+        prefetcher = self.prefetcher(enabled=False)
+        prefetcher.feed("main.py\n")
+        self.assertEqual(prefetcher.mentioned, [])
+        self.assertEqual(self.prefetcher().take_offers(), [])
+
+if __name__ == "__main__":
+    unittest.main()
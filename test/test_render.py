@@ -0,0 +1,75 @@
+import io
+import os
+import re
+import random
+import unittest
+from contextlib import redirect_stdout
+
+import wcwidth
+
+from IFL.render import Frame, framed_print, text_width, wrap_line, _line_widths
+
+ANSI = re.compile(r'\033\[[0-9;]*m')
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        self.columns = os.environ.get("COLUMNS")
+        os.environ["COLUMNS"] = "24"
+
+    def tearDown(self):
+        if self.columns is None:
+            os.environ.pop("COLUMNS", None)
+        else:
+            os.environ["COLUMNS"] = self.columns
+
+    def render(self, content, **kwargs):
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            framed_print("T", content, **kwargs)
+        return [ANSI.sub("", row) for row in buffer.getvalue().splitlines()]
+
+    def test_rows_keep_frame_width(self):
+        content = "short\n" + "x" * 50 + "\n中文字符" * 6 + "\n\tindented\né combining\n\n   "
+        rows = self.render(content)
+        self.assertTrue(rows[0].startswith("┌───── T "))
+        self.assertTrue(rows[-1].startswith("└"))
+        for row in rows:
+            self.assertEqual(text_width(row), 24, row)
+        self.assertEqual(rows[1], "│ short                │")
+
+    def test_wrap_line_keeps_wide_characters_whole(self):
+        rows = wrap_line("ab中文cd", 3)
+        self.assertEqual(rows, [("ab", 2), ("中", 2), ("文c", 3), ("d", 1)])
+        self.assertEqual("".join(text for text, _ in rows), "ab中文cd")
+
+    def test_widths_match_wcwidth(self):
+        rng = random.Random(3)
+        pieces = ["a", " ", "中", "文", "，", "é", "e\u0301", "😀", "\u200b", "ｱ", "한", "\x1b", "x" * 5]
+        for _ in range(300):
+            line = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 30)))
+            expected = [max(wcwidth.wcwidth(c), 0) for c in line]
+            self.assertEqual(list(_line_widths(line)), expected, repr(line))
+            self.assertEqual(text_width(line), sum(expected), repr(line))
+            rows = wrap_line(line, 7)
+            self.assertEqual("".join(text for text, _ in rows), line)
+            self.assertTrue(all(width <= 7 for _, width in rows))
+
+    def test_streamed_append_matches_framed_print(self):
+        content = "first line\nsecond 中文 line that wraps around\nlast"
+        buffer = io.StringIO()
+        frame = Frame("T", out=buffer)
+        for i in range(0, len(content), 5):
+            frame.append(content[i:i + 5])
+        frame.close()
+        streamed = [ANSI.sub("", row) for row in buffer.getvalue().splitlines()]
+        self.assertEqual(streamed, self.render(content))
+
+    def test_truncation(self):
+        rows = self.render("\n".join(str(i) for i in range(100)), max_lines=9)
+        self.assertEqual(len(rows), 2 + 9)
+        self.assertIn("... 92 lines omitted", rows[6])
+        self.assertIn("99", rows[-2])
+
+
+if __name__ == '__main__':
+    unittest.main()
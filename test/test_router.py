@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from IFL.provider import router
+from IFL.provider.modules_factory import create_provider
+
+class Backend:
+    """Scripted backend, fails while failing is set"""
+    registry = {}
+    fail_all = False
+    fail_after_arguments = False
+
+    def __init__(self, config):
+        self.name = config["model_name"]
+        self.failing = False
+        self.calls = 0
+        Backend.registry[self.name] = self
+
+    def response(self, dialogue, functions=None, options=None):
+        self.calls += 1
+        if self.failing or Backend.fail_all:
+            raise Exception("unavailable")
+        return None, f"from {self.name}", None
+
+    def response_stream(self, dialogue, functions=None, on_arguments=None, options=None):
+        self.calls += 1
+        if Backend.fail_after_arguments:
+            on_arguments("WriteFile", f"from {self.name}")
+            raise Exception("connection lost")
+        if self.failing or Backend.fail_all:
+            raise Exception("unavailable")
+        yield None, f"from {self.name}", None
+
+## create_provider imports backends by module name
+LLMProvider = Backend
+
+def backend_config(name):
+    return {"import": __name__, "model_name": name}
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        Backend.registry = {}
+        Backend.fail_all = False
+        Backend.fail_after_arguments = False
+        self.config = {"Model": {
+            "selected": "Router",
+            "Fast": backend_config("Fast"),
+            "Slow": backend_config("Slow"),
+            "Cheap": backend_config("Cheap"),
+            "Router": {"import": "IFL.provider.router", "backends": ["Slow", "Fast", "Cheap"],
+                       "cheap": ["Cheap"], "stats_file": os.path.join(self.tmp.name, "router.json")},
+        }}
+        self.router = create_provider(self.config)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fastest_healthy_backend(self):
+        self.router.stats["Slow"].record(3.0, 2000, 10.0, 0.3)
+        self.router.stats["Fast"].record(0.5, 2000, 2.0, 0.3)
+        self.assertEqual(self.router.response([{"role": "user", "content": "x"}])[1], "from Fast")
+        self.assertEqual(self.router.candidates([])[:2], ["Fast", "Slow"])
+
+    def test_failover_and_cooldown(self):
+        ## Backends never measured are tried first, Slow answers and Fast is next
+        self.router.response([])
+        self.assertEqual(self.router.candidates([])[0], "Fast")
+        self.router._backend("Fast").failing = True
+        result = list(self.router.response_stream([]))
+        self.assertEqual(result, [(None, "from Slow", None)])
+        self.assertFalse(self.router.stats["Fast"].healthy(router.time.monotonic()))
+        self.assertEqual(self.router.candidates([]), ["Slow", "Cheap", "Fast"])
+
+    def test_no_failover_after_argument_deltas(self):
+        ## The first backend already streamed part of a WriteFile, another one can't continue it
+        first = self.router.candidates([])[0]
+        Backend.fail_after_arguments = True
+        deltas = []
+        with self.assertRaises(Exception):
+            list(self.router.response_stream([], on_arguments=lambda tool, delta: deltas.append(delta)))
+        self.assertEqual(deltas, [f"from {first}"])
+        self.assertEqual(sum(backend.calls for backend in Backend.registry.values()), 1)
+
+    def test_cheap_tier_for_exploring_rounds(self):
+        explored = [{"role": "assistant", "content": None,
+                     "tool_calls": [{"function": {"name": "SearchCode", "arguments": "{}"}}]},
+                    {"role": "tool", "content": "..."}]
+        self.assertEqual(self.router.candidates(explored)[0], "Cheap")
+        self.assertEqual(self.router.candidates([])[-1], "Cheap")
+
+    def test_stats_persisted(self):
+        self.router.response([])
+        again = create_provider(self.config)
+        self.assertEqual(again.stats["Slow"].rounds, 1)
+
+    def test_all_failing_raises(self):
+        Backend.fail_all = True
+        with self.assertRaises(Exception):
+            self.router.response([])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from IFL.runner import CommandRunner
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.runner = CommandRunner({"head_lines": 3, "tail_lines": 2, "timeout": 5}, root=self.tmp.name)
+
+    def tearDown(self):
+        self.runner.close()
+        self.tmp.cleanup()
+
+    def test_output_capped_and_streamed(self):
+        echoed = []
+        job = self.runner.start("seq 1 100; echo err >&2; exit 3", echo=echoed.append)
+        self.assertTrue(self.runner.wait(job, 5))
+        self.assertEqual(len(echoed), 101)
+        summary = self.runner.summary(job)
+        self.assertIn("exit code 3", summary)
+        self.assertIn("101 output lines", summary)
+        self.assertIn("1\n2\n3\n... 96 lines omitted\n100\nerr", summary)
+
+    def test_runs_in_root(self):
+        job = self.runner.start("pwd")
+        self.runner.wait(job, 5)
+        self.assertEqual(os.path.realpath(job.head[0]), os.path.realpath(self.tmp.name))
+
+    def test_limits_applied(self):
+        self.runner.cpu_seconds = 7
+        job = self.runner.start("ulimit -t; ulimit -c")
+        self.runner.wait(job, 5)
+        self.assertEqual(job.head, ["7", "0"])
+
+    def test_timeout_kills_process_group(self):
+        self.runner.timeout = 0.5
+        job = self.runner.start("sleep 30 & sleep 30; echo never")
+        self.assertTrue(self.runner.wait(job, 5))
+        self.assertTrue(job.timed_out)
+        self.assertIn("killed after timeout", self.runner.summary(job))
+
+    def test_background_job(self):
+        job = self.runner.start("sleep 0.2; echo finished")
+        self.assertTrue(job.running())
+        self.assertIn("running for", self.runner.summary(job))
+        self.runner.wait(job, 5)
+        self.assertEqual(job.returncode, 0)
+        self.assertEqual(job.head, ["finished"])
+
+if __name__ == '__main__':
+    unittest.main()
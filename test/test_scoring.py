@@ -0,0 +1,88 @@
+import random
+import unittest
+
+from IFL import scoring
+from IFL.scoring import best_window
+from IFL.utils import calculate_similarity
+
+STRATEGIES = ('combined', 'original', 'normalized', 'structured')
+
+def reference(search_lines, content_lines, strategy):
+    ## The plain loop find_similar_lines used before bulk scoring
+    best_index, best_score = -1, 0.0
+    for i in range(len(content_lines) - len(search_lines) + 1):
+        score = calculate_similarity(search_lines, content_lines[i:i + len(search_lines)], strategy)
+        if score > best_score:
+            best_index, best_score = i, score
+    return best_index, best_score
+
+def random_lines(rng, count):
+    words = ["x = 1", "return x", "if a:", "    pass", "def f():", "", "  ", "Y  =  2", "y = 2", "# note"]
+    lines = []
+    for _ in range(count):
+        line = rng.choice(words)
+        line = " " * rng.choice((0, 0, 4)) + line + " " * rng.choice((0, 0, 1))
+        lines.append(line + "\n")
+    return lines
+
+class TestScoring(unittest.TestCase):
+    def check_equivalence(self):
+        rng = random.Random(7)
+        for _ in range(150):
+            content = random_lines(rng, rng.randint(1, 40))
+            n = rng.randint(1, min(6, len(content)))
+            if rng.random() < 0.5:
+                start = rng.randint(0, len(content) - n)
+                search = list(content[start:start + n])
+                search[rng.randrange(n)] = rng.choice(["    pass\n", "changed\n", "\n"])
+            else:
+                search = random_lines(rng, n)
+            for strategy in STRATEGIES:
+                self.assertEqual(best_window(search, content, strategy),
+                                 reference(search, content, strategy), (search, content, strategy))
+
+    def test_equivalent_to_plain_loop(self):
+        self.check_equivalence()
+
+    def test_pure_python_fallback(self):
+        saved = scoring.np
+        scoring.np = None
+        scoring.clear_caches()
+        try:
+            self.check_equivalence()
+        finally:
+            scoring.np = saved
+            scoring.clear_caches()
+
+    def test_bounds_cover_scores(self):
+        content = random_lines(random.Random(3), 60)
+        search = content[10:15]
+        for strategy in STRATEGIES:
+            bounds = scoring.upper_bounds(search, content, strategy)
+            for i, bound in enumerate(bounds):
+                score = calculate_similarity(search, content[i:i + 5], strategy)
+                self.assertLessEqual(score, bound + scoring.EPSILON)
+
+    def test_first_of_equal_windows(self):
+        content = ["a\n", "b\n", "c\n", "a\n", "b\n"]
+        self.assertEqual(best_window(["a\n", "b\n"], content), (0, 1.0))
+        self.assertEqual(best_window(["z\n"], content), (-1, 0.0))
+
+    def test_retry_reuses_caches(self):
+        scoring.clear_caches()
+        content = random_lines(random.Random(5), 80)
+        search = content[20:26]
+        first = best_window(search, content)
+        info = scoring.cache_info()
+        self.assertEqual(best_window(search, content), first)
+        after = scoring.cache_info()
+        self.assertEqual(after["files"].hits, info["files"].hits + 1)
+        self.assertEqual(after["scores"].misses, info["scores"].misses)
+
+        ## A changed file is indexed again
+        changed = content[:40] + ["new line\n"] + content[40:]
+        best_window(search, changed)
+        self.assertEqual(scoring.cache_info()["files"].misses, after["files"].misses + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from IFL.filecache import FileCache
+from IFL.search import search_code
+from IFL.workspace import walk_files, resolve_inputs
+
+class TestSearchCode(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write(".gitignore", "build/\n*.log\n!keep.log\n")
+        self.write("main.py", "import util\n\ndef main():\n    util.helper()\n")
+        self.write("util.py", "def helper():\n    return 1\n")
+        self.write("build/out.py", "def helper():\n    pass\n")
+        self.write("debug.log", "helper\n")
+        self.write("keep.log", "helper\n")
+        self.write("data.bin", "helper\0\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_walk_files_respects_gitignore(self):
+        files = walk_files(self.root)
+        self.assertIn("main.py", files)
+        self.assertIn("keep.log", files)
+        self.assertNotIn("debug.log", files)
+        self.assertNotIn("build/out.py", files)
+
+    def test_resolve_inputs(self):
+        self.write("pkg/a.py", "a = 1\n")
+        self.write("pkg/sub/b.py", "b = 2\n")
+        resolve = lambda *patterns: resolve_inputs(patterns, self.root)
+        self.assertEqual(resolve("*.py"), ["main.py", "util.py"])
+        self.assertEqual(resolve("**/*.py"), ["main.py", "pkg/a.py", "pkg/sub/b.py", "util.py"])
+        self.assertEqual(resolve("pkg", "pkg/a.py", "util.py"), ["pkg/a.py", "pkg/sub/b.py", "util.py"])
+        ## Named files are taken even when ignored, directories and globs follow .gitignore
+        self.assertEqual(resolve("debug.log", "*.log"), ["debug.log", "keep.log"])
+        self.assertEqual(resolve("build/out.py"), ["build/out.py"])
+        ## An existing file is no glob
+        self.write("pages/[id].tsx", "export default 1\n")
+        self.assertEqual(resolve("pages/[id].tsx"), ["pages/[id].tsx"])
+        with self.assertRaises(ValueError):
+            resolve("missing.py")
+        with self.assertRaises(ValueError):
+            resolve("*.rs")
+        with self.assertRaises(ValueError):
+            resolve("../*.py")
+
+    def test_search_ranks_definitions_first(self):
+        result = search_code("helper", self.root)
+        self.assertIn("Found 3 matches in 3 files", result)
+        self.assertLess(result.index("util.py"), result.index("main.py"))
+        self.assertIn("  1: def helper():", result)
+        self.assertNotIn("data.bin", result)
+
+    def test_search_regex_and_no_match(self):
+        result = search_code(r"def \w+\(\)", self.root, is_regex=True)
+        self.assertIn("main.py", result)
+        self.assertEqual(search_code("nothing_here", self.root), "No matches found.")
+
+    def test_search_uses_cached_content(self):
+        cache = FileCache()
+        path = os.path.join(self.root, "util.py")
+        cache.read(path)
+        ## A fresh cache entry is searched without reading the file again
+        stat = os.stat(path)
+        cache.put(path, "def cached_only():\n", stat)
+        self.assertIn("cached_only", search_code("cached_only", self.root, file_cache=cache))
+
+    def test_search_parallel_matches_serial(self):
+        for i in range(80):
+            self.write(f"pkg/mod{i}.py", f"value = {i}\ndef helper_{i}():\n    pass\n")
+        serial = search_code("helper_", self.root, workers=1, max_results=500)
+        parallel = search_code("helper_", self.root, workers=2, max_results=500)
+        self.assertEqual(serial, parallel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -72,6 +72,71 @@ y\n=======
         self.assertTrue(success)
         self.assertEqual(result, "int main() {\n    printf(\"HELLO\\n\");\n    return 0;\n}\n")
 
+    def test_do_search_replace_strips_copied_line_numbers(self):
+        original = "a\nb\nc\n"
+        blocks = """<<<<<<< SEARCH
+2	b
+=======
+2	B\n>>>>>>> REPLACE"""
+        success, result = do_search_replace(original, blocks)
+        self.assertTrue(success)
+        self.assertEqual(result, "a\nB\nc\n")
+
+    def test_do_search_replace_keeps_numbered_data(self):
+        ## TSV rows starting with numbers are content, not copied line numbers
+        original = "1\ta\n2\tb\n7\tc\n"
+        blocks = """<<<<<<< SEARCH
+2	b
+7	c
+=======
+2	B
+7	C\n>>>>>>> REPLACE"""
+        success, result = do_search_replace(original, blocks)
+        self.assertTrue(success)
+        self.assertEqual(result, "1\ta\n2\tB\n7\tC\n")
+
+        original = "id\tname\n1\ta\n2\tb\n"
+        blocks = """<<<<<<< SEARCH
+2	1	a
+3	2	b
+=======
+2	1	x
+3	2	b\n>>>>>>> REPLACE"""
+        success, result = do_search_replace(original, blocks)
+        self.assertTrue(success)
+        self.assertEqual(result, "id\tname\n1\tx\n2\tb\n")
+
+    def test_do_search_replace_sees_earlier_blocks(self):
+        ## The second block targets a line the first one inserted, not its older copy
+        original = "keep\nmarker\nhead\n"
+        blocks = """<<<<<<< SEARCH
+head
+=======
+marker
+head\n>>>>>>> REPLACE
+<<<<<<< SEARCH
+marker
+head
+=======
+done\n>>>>>>> REPLACE"""
+        success, result = do_search_replace(original, blocks)
+        self.assertTrue(success)
+        self.assertEqual(result, "keep\nmarker\ndone\n")
+
+    def test_do_search_replace_failure_report(self):
+        original = "a\nb\nc\nx\ny\nz\na\nb\nc\n"
+        blocks = """<<<<<<< SEARCH
+a
+q
+c
+=======
+z\n>>>>>>> REPLACE"""
+        success, result = do_search_replace(original, blocks)
+        self.assertFalse(success)
+        self.assertIn("Block 1: closest region is lines 1-3", result)
+        self.assertIn("-q\n+b", result)
+        self.assertIn("1 other region matches equally well (lines 7-9)", result)
+
 
 if __name__ == '__main__':
     unittest.main()
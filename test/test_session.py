@@ -0,0 +1,82 @@
+import os
+import gzip
+import tempfile
+import unittest
+
+from IFL.session import Session
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "sessions")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sync_and_load_roundtrip(self):
+        big = "x = 1\n" * 500
+        messages = [
+            {'role': "system", 'content': "system"},
+            {'role': "user", 'content': "task"},
+        ]
+        session = Session.create(self.dir, {"task": "task"})
+        session.sync(messages, 0)
+
+        call = {"type": "function", "id": "c1",
+                "function": {"name": "WriteFile", "arguments": '{"file_content": "%s"}' % ("y" * 2000)}}
+        messages.append({'role': "assistant", 'content': None, 'tool_calls': [call]})
+        messages.append({'role': "tool", 'tool_call_id': "c1", 'content': big})
+        messages.append({'role': "tool", 'tool_call_id': "c2", 'content': big})
+        session.sync(messages, 1)
+
+        loaded, restored, last_round = Session.load(self.dir, session.session_id)
+        self.assertEqual(restored, messages)
+        self.assertEqual(last_round, 1)
+        self.assertEqual(loaded.saved_messages, len(messages))
+
+        ## The repeated file content is stored only once
+        with gzip.open(session.path, 'rt') as f:
+            self.assertEqual(f.read().count('"t": "blob"'), 2)
+
+    def test_resume_appends_to_same_file(self):
+        session = Session.create(self.dir, {})
+        messages = [{'role': "user", 'content': "a"}]
+        session.sync(messages, 0)
+        loaded, restored, _ = Session.load(self.dir, session.session_id)
+        restored.append({'role': "user", 'content': "b"})
+        loaded.sync(restored, 1)
+        _, final, last_round = Session.load(self.dir, session.session_id)
+        self.assertEqual([m['content'] for m in final], ["a", "b"])
+        self.assertEqual(last_round, 1)
+
+    def test_load_torn_last_member(self):
+        session = Session.create(self.dir, {})
+        messages = [{'role': "user", 'content': "a"}]
+        session.sync(messages, 0)
+        size = os.path.getsize(session.path)
+        messages.append({'role': "assistant", 'content': "b" * 5000})
+        session.sync(messages, 1)
+        ## A crash in the middle of the second sync's gzip member
+        with open(session.path, 'r+b') as f:
+            f.truncate(size + (os.path.getsize(session.path) - size) // 2)
+
+        loaded, restored, last_round = Session.load(self.dir, session.session_id)
+        self.assertEqual(restored, messages[:1])
+        self.assertEqual(last_round, 0)
+
+        ## Syncs after the recovery load again
+        restored.append({'role': "user", 'content': "c"})
+        loaded.sync(restored, 1)
+        _, final, last_round = Session.load(self.dir, session.session_id)
+        self.assertEqual([m['content'] for m in final], ["a", "c"])
+        self.assertEqual(last_round, 1)
+
+    def test_load_rejects_unknown_or_invalid_id(self):
+        with self.assertRaises(FileNotFoundError):
+            Session.load(self.dir, "../../etc")
+        with self.assertRaises(FileNotFoundError):
+            Session.load(self.dir, "deadbeef")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from IFL.settings import load_config
+
+class TestLoadConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.path = os.path.join(self.tmp.name, "config.yaml")
+        self.write("MaxRounds: 3\nAllTools: []\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text, mtime_ns=None):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_cache_is_written_and_reused(self):
+        self.assertEqual(load_config(self.path, self.cache)["MaxRounds"], 3)
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+        self.assertEqual(load_config(self.path, self.cache), {"MaxRounds": 3, "AllTools": []})
+
+    def test_changed_file_is_reparsed(self):
+        load_config(self.path, self.cache)
+        self.write("MaxRounds: 7\n", mtime_ns=os.stat(self.path).st_mtime_ns + 10**9)
+        self.assertEqual(load_config(self.path, self.cache)["MaxRounds"], 7)
+
+    def test_corrupt_cache_is_ignored(self):
+        load_config(self.path, self.cache)
+        cache_file = os.path.join(self.cache, os.listdir(self.cache)[0])
+        with open(cache_file, 'wb') as f:
+            f.write(b"garbage")
+        self.assertEqual(load_config(self.path, self.cache)["MaxRounds"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import json
+import random
+import tempfile
+import unittest
+
+from IFL.staging import ArgumentStream, StagedFile
+
+def feed_in_pieces(stream, text, rng):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        stream.feed(text[i:i + size])
+        i += size
+
+class TestArgumentStream(unittest.TestCase):
+    def test_matches_json_loads(self):
+        rng = random.Random(0)
+        pieces = ['a', '\n', '"', '\\', 'é', '😀', '\t', '{', '}', ',', ':', ' ', 'xxxxx']
+        for _ in range(500):
+            content = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+            if rng.random() < 0.5:
+                arguments = {"file_name": 'd/"f".py', "file_content": content, "n": [1, {"file_content": "no"}]}
+            else:
+                arguments = {"file_content": content, "file_name": "a"}
+            text = json.dumps(arguments, ensure_ascii=rng.random() < 0.5)
+            out = []
+            stream = ArgumentStream("file_content", out.append)
+            feed_in_pieces(stream, text, rng)
+            self.assertEqual(''.join(out), content)
+            self.assertTrue(stream.complete)
+            self.assertEqual(stream.fields["file_name"], arguments["file_name"])
+
+    def test_incomplete_and_invalid(self):
+        stream = ArgumentStream("file_content", lambda text: None)
+        stream.feed('{"file_name": "a", "file_content": "abc')
+        self.assertFalse(stream.complete)
+        stream = ArgumentStream("file_content", lambda text: None)
+        stream.feed('{"file_content": "\\q"}')
+        self.assertFalse(stream.complete)
+        self.assertIsNotNone(stream.error)
+
+class TestStagedFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.staging = os.path.join(self.tmp.name, "staging")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_commit_and_discard(self):
+        target = os.path.join(self.tmp.name, "out.txt")
+        staged = StagedFile(self.staging)
+        staged.feed('{"file_name": "out.txt", "file_content": "line 1\\nline 2\\n"}')
+        self.assertTrue(staged.complete)
+        self.assertEqual(staged.read(), "line 1\nline 2\n")
+        staged.commit(target)
+        with open(target) as f:
+            self.assertEqual(f.read(), "line 1\nline 2\n")
+
+        staged = StagedFile(self.staging)
+        staged.feed('{"file_content": "x"}')
+        staged.discard()
+        self.assertEqual(os.listdir(self.staging), [".gitignore"])
+
+    def commit_text(self, target, text):
+        staged = StagedFile(self.staging)
+        staged.feed(json.dumps({"file_content": text}))
+        staged.commit(target)
+
+    def test_commit_writes_through_links(self):
+        real = os.path.join(self.tmp.name, "real.txt")
+        with open(real, 'w') as f:
+            f.write("old\n")
+        os.chmod(real, 0o750)
+        link = os.path.join(self.tmp.name, "link.txt")
+        os.symlink("real.txt", link)
+        self.commit_text(link, "through the symlink\n")
+        self.assertTrue(os.path.islink(link))
+        with open(real) as f:
+            self.assertEqual(f.read(), "through the symlink\n")
+        self.assertEqual(os.stat(real).st_mode & 0o777, 0o750)
+
+        other = os.path.join(self.tmp.name, "other.txt")
+        os.link(real, other)
+        inode = os.stat(real).st_ino
+        self.commit_text(other, "through the hard link\n")
+        self.assertEqual(os.stat(other).st_ino, inode)
+        with open(real) as f:
+            self.assertEqual(f.read(), "through the hard link\n")
+        self.assertEqual(sorted(os.listdir(self.staging)), [".gitignore"])
+
+if __name__ == '__main__':
+    unittest.main()
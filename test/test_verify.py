@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from IFL.verify import Verifier
+
+SETTINGS = {
+    "timeout": 30,
+    "checks": [{"pattern": "*.py", "command": "{python} -m IFL.verify {files}"}],
+}
+
+class TestVerify(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.verifier = Verifier(SETTINGS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_syntax_error_reported(self):
+        path = self.write("bad.py", "def f(:\n    pass\n")
+        passed, report = self.verifier.verify({path: "def f(:\n    pass\n"})
+        self.assertFalse(passed)
+        self.assertIn("Check failed", report)
+        self.assertIn("bad.py:1", report)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "__pycache__")))
+
+    def test_results_cached_by_content(self):
+        text = "x = 1\n"
+        path = self.write("good.py", text)
+        self.assertEqual(self.verifier.verify({path: text}), (True, "Check passed: python -m IFL.verify"))
+        self.assertTrue(self.verifier.verify({path: text})[0])
+        self.assertEqual(self.verifier.runs, 1)
+
+        text = "x = 2\n"
+        self.write("good.py", text)
+        self.verifier.verify({path: text})
+        self.assertEqual(self.verifier.runs, 2)
+
+    def test_unmatched_files_not_checked(self):
+        path = self.write("notes.txt", "def f(:\n")
+        self.assertEqual(self.verifier.verify({path: "def f(:\n"}), (True, ""))
+        self.assertEqual(self.verifier.runs, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+from IFL.workspace import format_tree, git_files, git_changes, git_diff, list_files
+from IFL.ifl import IFL
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class TestGitWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.git("init", "-q")
+        self.write(".gitignore", "*.log\n")
+        self.write("main.py", "print(1)\n")
+        self.write("pkg/util.py", "x = 1\n")
+        self.write("pkg/old.py", "y = 1\n")
+        self.git("add", ".")
+        self.git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.root, check=True, capture_output=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_files_and_changes(self):
+        self.write("main.py", "print(2)\n")
+        self.write("new.py", "z = 1\n")
+        self.write("debug.log", "ignored\n")
+        os.unlink(os.path.join(self.root, "pkg/old.py"))
+
+        self.assertEqual(git_files(self.root), [".gitignore", "main.py", "new.py", "pkg/old.py", "pkg/util.py"])
+        self.assertEqual(sorted(git_changes(self.root)),
+                         [(" D", "pkg/old.py"), (" M", "main.py"), ("??", "new.py")])
+        diff = git_diff(self.root)
+        self.assertIn("-print(1)\n+print(2)", diff)
+
+        ## Paths are relative to a sub folder
+        self.write("pkg/util.py", "x = 2\n")
+        self.assertEqual(git_files(os.path.join(self.root, "pkg")), ["old.py", "util.py"])
+        self.assertEqual(sorted(git_changes(os.path.join(self.root, "pkg"))), [(" D", "old.py"), (" M", "util.py")])
+
+    def test_list_files(self):
+        self.write("main.py", "print(2)\n")
+        listing = list_files(self.root)
+        self.assertIn("├── main.py  [M]\n", listing)
+        self.assertIn("└── pkg\n    ├── old.py\n    └── util.py\n", listing)
+        self.assertIn("1 directories, 4 files\n1 changed files", listing)
+
+    def test_changed_messages(self):
+        ## A changed file whose name looks like a glob, and more changes than max_files
+        self.write("pages/[id].tsx", "export default 1\n")
+        self.write("main.py", "print(2)\n")
+        config = {"AllTools": [], "PreloadTemplate": "preload", "Preload": {"max_files": 1}}
+        agent = IFL(config, llm=object())
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            messages = agent.changed_messages()
+        finally:
+            os.chdir(cwd)
+            agent.prefetcher.close()
+        self.assertIn("[1 more changed files not preloaded, over the limit of 1]", messages[1]["content"])
+        self.assertEqual(len(messages), 4)
+        self.assertIn("main.py", messages[3]["content"])
+
+    def test_outside_git(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertIsNone(git_files(folder))
+            self.assertIsNone(git_changes(folder))
+
+class TestFormatTree(unittest.TestCase):
+    def test_format_tree(self):
+        text = format_tree(["b.py", "a/x.py", "a/b/y.py"], {"b.py": "??"})
+        self.assertEqual(text, ".\n"
+                               "├── a\n"
+                               "│   ├── b\n"
+                               "│   │   └── y.py\n"
+                               "│   └── x.py\n"
+                               "└── b.py  [??]\n"
+                               "\n"
+                               "2 directories, 3 files\n")
+
+if __name__ == "__main__":
+    unittest.main()